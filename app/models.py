@@ -3,7 +3,7 @@ from main import db  # Import depuis main
 
 class TradingSnapshot(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     equity = db.Column(db.Float)
     net_profit = db.Column(db.Float)
     open_positions = db.Column(db.Integer)
@@ -15,12 +15,14 @@ class TradingSnapshot(db.Model):
 
 class TradeHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     symbol = db.Column(db.String(10))
     side = db.Column(db.String(10))
     quantity = db.Column(db.Float)
     price = db.Column(db.Float)
     status = db.Column(db.String(20))
     
+    __table_args__ = (db.Index('ix_trade_history_symbol_timestamp', 'symbol', 'timestamp'),)
+    
     def __repr__(self):
         return f'<Trade {self.symbol} {self.side} {self.quantity}>'
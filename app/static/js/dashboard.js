@@ -8,11 +8,15 @@ document.addEventListener('DOMContentLoaded', function() {
     setInterval(updateCurrentTime, 1000);
     updateCurrentTime();
 
-    // Charger les données initiales
-    fetchDashboardData();
+    // Nombre maximal de points conservés sur le graphique
+    const MAX_CHART_POINTS = 300;
     
-    // Configurer le rafraîchissement automatique
-    setInterval(fetchDashboardData, 30000); // Rafraîchir toutes les 30 secondes
+    // État incrémental : curseur et ETag de la dernière réponse
+    let cursor = null;
+    let etag = null;
+    let history = [];
+    let trades = [];
+    let prices = {};
 
     // Initialiser le graphique
     const ctx = document.getElementById('performance-chart').getContext('2d');
@@ -40,13 +44,78 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // Fonction pour récupérer les données du dashboard
+    // Charger les données initiales
+    fetchDashboardData();
+
+    // Configurer le rafraîchissement automatique
+    const POLL_INTERVAL = 30000; // Rafraîchir toutes les 30 secondes sans flux SSE
+    const SAFETY_POLL_INTERVAL = 300000; // Vérification lente quand le flux est actif
+    let pollTimer = setInterval(fetchDashboardData, POLL_INTERVAL);
+
+    function setPollInterval(interval) {
+        clearInterval(pollTimer);
+        pollTimer = setInterval(fetchDashboardData, interval);
+    }
+
+    // Mises à jour poussées par le serveur (Server-Sent Events)
+    if (window.EventSource) {
+        const stream = new EventSource('/api/dashboard/stream');
+        stream.onopen = () => setPollInterval(SAFETY_POLL_INTERVAL);
+        stream.onerror = () => setPollInterval(POLL_INTERVAL);
+
+        stream.addEventListener('snapshot', event => {
+            const snapshot = JSON.parse(event.data);
+            const point = { timestamp: snapshot.timestamp, equity: snapshot.equity, net_profit: snapshot.net_profit };
+            history = history.concat([point]).slice(-MAX_CHART_POINTS);
+            appendChart([point]);
+            updateKpis(snapshot);
+        });
+        stream.addEventListener('trade', event => {
+            const trade = JSON.parse(event.data);
+            trades = [trade].concat(trades).slice(0, 50);
+            patchTable('recent-trades', trades.slice(0, 5), renderTrade);
+        });
+        stream.addEventListener('positions', event => {
+            const data = JSON.parse(event.data);
+            prices = data.prices;
+            patchTable('positions-table', data.positions, renderPosition);
+            patchTable('orders-table', data.orders, renderOrder);
+        });
+        stream.addEventListener('prices', event => {
+            prices = JSON.parse(event.data);
+            refreshPositionPrices();
+        });
+        stream.addEventListener('resync', () => {
+            // Tampon saturé côté serveur : recharger l'état complet
+            cursor = null;
+            etag = null;
+            fetchDashboardData();
+        });
+    }
+
+    // Fonction pour récupérer les données du dashboard (complètes puis deltas)
     function fetchDashboardData() {
-        fetch('/api/dashboard/data')
-            .then(response => response.json())
+        const url = cursor ? `/api/dashboard/data?since=${encodeURIComponent(cursor)}` : '/api/dashboard/data';
+        const headers = etag ? { 'If-None-Match': etag } : {};
+        fetch(url, { headers: headers })
+            .then(response => {
+                if (response.status === 304) {
+                    return null;
+                }
+                etag = response.headers.get('ETag');
+                return response.json();
+            })
             .then(data => {
-                updateDashboard(data);
-                updateChart(data.history, chart);
+                if (!data) {
+                    return;
+                }
+                if (data.error) {
+                    throw new Error(data.error);
+                }
+                cursor = data.cursor;
+                applyData(data);
+                document.getElementById('bot-status').className = 'badge bg-success';
+                document.getElementById('bot-status').textContent = 'En ligne';
             })
             .catch(error => {
                 console.error('Error fetching dashboard data:', error);
@@ -55,11 +124,40 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
-    // Mettre à jour les éléments du dashboard
-    function updateDashboard(data) {
-        const snapshot = data.snapshot;
+    // Fusionner une réponse (complète ou delta) dans l'état local
+    function applyData(data) {
+        if (data.delta) {
+            // Ignorer ce qui a déjà été reçu par le flux SSE
+            const lastTimestamp = history.length ? history[history.length - 1].timestamp : '';
+            const newPoints = data.history.filter(item => item.timestamp > lastTimestamp);
+            const knownTrades = new Set(trades.map(trade => trade.id));
+            const newTrades = data.trades.filter(trade => !knownTrades.has(trade.id));
+            history = history.concat(newPoints).slice(-MAX_CHART_POINTS);
+            trades = newTrades.concat(trades).slice(0, 50);
+            appendChart(newPoints);
+        } else {
+            history = data.history;
+            trades = data.trades;
+            resetChart(history);
+        }
+        prices = data.prices || prices;
         
-        // Mettre à jour les KPI
+        updateKpis(data.snapshot);
+        if (data.positions !== null) {
+            patchTable('positions-table', data.positions, renderPosition);
+        } else {
+            refreshPositionPrices();
+        }
+        if (data.orders !== null) {
+            patchTable('orders-table', data.orders, renderOrder);
+        }
+        if (!data.delta || data.trades.length) {
+            patchTable('recent-trades', trades.slice(0, 5), renderTrade);
+        }
+    }
+
+    // Mettre à jour les KPI
+    function updateKpis(snapshot) {
         document.getElementById('equity-value').textContent = `$${snapshot.equity.toFixed(2)}`;
         document.getElementById('profit-value').textContent = `$${snapshot.net_profit.toFixed(2)}`;
         document.getElementById('positions-count').textContent = snapshot.open_positions;
@@ -68,8 +166,8 @@ document.addEventListener('DOMContentLoaded', function() {
         document.getElementById('last-update').textContent = new Date(snapshot.timestamp).toLocaleTimeString('fr-FR');
         
         // Calculer les variations
-        const prevEquity = data.history.length > 1 ? data.history[data.history.length - 2].equity : snapshot.equity;
-        const prevProfit = data.history.length > 1 ? data.history[data.history.length - 2].net_profit : snapshot.net_profit;
+        const prevEquity = history.length > 1 ? history[history.length - 2].equity : snapshot.equity;
+        const prevProfit = history.length > 1 ? history[history.length - 2].net_profit : snapshot.net_profit;
         
         const equityChange = ((snapshot.equity - prevEquity) / prevEquity * 100).toFixed(2);
         const profitChange = ((snapshot.net_profit - prevProfit) / Math.abs(prevProfit) * 100).toFixed(2);
@@ -79,17 +177,62 @@ document.addEventListener('DOMContentLoaded', function() {
         
         document.getElementById('profit-change').textContent = `${profitChange >= 0 ? '+' : ''}${profitChange}%`;
         document.getElementById('profit-change').className = profitChange >= 0 ? 'profit-positive' : 'profit-negative';
+    }
         
-        // Mettre à jour les positions
-        const positionsTable = document.getElementById('positions-table');
-        positionsTable.innerHTML = '';
+    // Mettre à jour un tableau ligne par ligne (clé data-key) au lieu de tout redessiner
+    function patchTable(tableId, items, render) {
+        const table = document.getElementById(tableId);
+        const existing = {};
+        Array.from(table.rows).forEach(row => { existing[row.dataset.key] = row; });
         
-        data.positions.forEach(position => {
-            const profit = (position.current_price - position.entry_price) * position.quantity;
-            const profitPercent = ((position.current_price - position.entry_price) / position.entry_price * 100).toFixed(2);
+        let previous = null;
+        items.forEach(item => {
+            const key = String(item.id);
+            const html = render(item);
+            let row = existing[key];
+            if (row) {
+                delete existing[key];
+                if (row.dataset.html !== html) {
+                    row.innerHTML = html;
+                    row.dataset.html = html;
+                }
+            } else {
+                row = document.createElement('tr');
+                row.dataset.key = key;
+                row.innerHTML = html;
+                row.dataset.html = html;
+            }
+            // Respecter l'ordre reçu sans déplacer les lignes déjà en place
+            const expected = previous ? previous.nextSibling : table.firstChild;
+            if (row !== expected) {
+                table.insertBefore(row, expected);
+            }
+            row.dataset.item = JSON.stringify(item);
+            previous = row;
+        });
+        Object.values(existing).forEach(row => row.remove());
+    }
             
-            const row = document.createElement('tr');
-            row.innerHTML = `
+    // Rafraîchir seulement les cellules dépendant du prix courant
+    function refreshPositionPrices() {
+        const table = document.getElementById('positions-table');
+        Array.from(table.rows).forEach(row => {
+            const position = JSON.parse(row.dataset.item);
+            if (prices[position.symbol] === undefined || prices[position.symbol] === position.current_price) {
+                return;
+            }
+            position.current_price = prices[position.symbol];
+            const html = renderPosition(position);
+            row.innerHTML = html;
+            row.dataset.html = html;
+            row.dataset.item = JSON.stringify(position);
+        });
+    }
+
+    function renderPosition(position) {
+        const profit = (position.current_price - position.entry_price) * position.quantity;
+        const profitPercent = ((position.current_price - position.entry_price) / position.entry_price * 100).toFixed(2);
+        return `
                 <td>${position.symbol}</td>
                 <td>${position.quantity.toFixed(6)}</td>
                 <td>$${position.entry_price.toFixed(2)}</td>
@@ -98,48 +241,53 @@ document.addEventListener('DOMContentLoaded', function() {
                     ${profit >= 0 ? '+' : ''}${profit.toFixed(2)} (${profitPercent}%)
                 </td>
             `;
-            positionsTable.appendChild(row);
-        });
-        
-        // Mettre à jour les ordres en attente
-        const ordersTable = document.getElementById('orders-table');
-        ordersTable.innerHTML = '';
+    }
         
-        data.orders.forEach(order => {
-            const row = document.createElement('tr');
-            row.innerHTML = `
+    function renderOrder(order) {
+        return `
                 <td>${order.symbol}</td>
                 <td><span class="badge ${order.side === 'BUY' ? 'bg-success' : 'bg-danger'}">${order.side}</span></td>
                 <td>${order.quantity.toFixed(6)}</td>
                 <td>$${order.price.toFixed(2)}</td>
                 <td><span class="badge bg-warning text-dark">En attente</span></td>
             `;
-            ordersTable.appendChild(row);
-        });
-        
-        // Mettre à jour les transactions récentes
-        const recentTrades = document.getElementById('recent-trades');
-        recentTrades.innerHTML = '';
+    }
         
-        data.trades.slice(0, 5).forEach(trade => {
-            const date = new Date(trade.timestamp);
-            const row = document.createElement('tr');
-            row.innerHTML = `
+    function renderTrade(trade) {
+        const date = new Date(trade.timestamp);
+        return `
                 <td>${date.toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' })}</td>
                 <td>${trade.symbol}</td>
                 <td><span class="badge ${trade.side === 'BUY' ? 'bg-success' : 'bg-danger'}">${trade.side}</span></td>
                 <td>$${(trade.quantity * trade.price).toFixed(2)}</td>
             `;
-            recentTrades.appendChild(row);
-        });
     }
 
-    // Mettre à jour le graphique de performance
-    function updateChart(history, chart) {
-        chart.data.labels = history.map(item => 
-            new Date(item.timestamp).toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' }));
+    function chartLabel(item) {
+        return new Date(item.timestamp).toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' });
+    }
         
-        chart.data.datasets[0].data = history.map(item => item.equity);
+    // Remplacer toute la série (chargement initial)
+    function resetChart(points) {
+        chart.data.labels = points.map(chartLabel);
+        chart.data.datasets[0].data = points.map(item => item.equity);
         chart.update();
     }
+
+    // Ajouter les nouveaux points et retirer les plus anciens
+    function appendChart(points) {
+        if (!points.length) {
+            return;
+        }
+        points.forEach(item => {
+            chart.data.labels.push(chartLabel(item));
+            chart.data.datasets[0].data.push(item.equity);
+        });
+        const overflow = chart.data.labels.length - MAX_CHART_POINTS;
+        if (overflow > 0) {
+            chart.data.labels.splice(0, overflow);
+            chart.data.datasets[0].data.splice(0, overflow);
+        }
+        chart.update('none');
+    }
 });
@@ -0,0 +1,378 @@
+"""Backtest hors ligne de la stratégie DCA/PIR
+
+Rejoue des bougies OHLCV et une série de signaux avec les mêmes règles que le
+bot : échelle d'achats à BELOW_PERCENT sous le dernier prix d'entrée (`/webhook`),
+quantité de `calculate_quantity`, limite min(PIR, MAX_ORDERS) de
+`can_open_new_position`, sortie à PROFIT_PERCENT au-dessus du prix moyen
+(`check_exit_conditions`) et vente sur signal si le P&L latent est positif.
+
+Usage : python backtest.py candles.csv [--signals signals.csv] [--output result.json]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BUY = 1
+SELL = -1
+
+
+class BacktestParams:
+    """Paramètres de stratégie (mêmes noms que Config)"""
+
+    def __init__(self, PROFIT_PERCENT=1.5, BELOW_PERCENT=0.5, ORDER_VALUE=100, MAX_ORDERS=5,
+                 MIN_MOVEMENT=0.0001, ROUNDING=4, INITIAL_CAPITAL=1000, COMMISSION=0.1):
+        self.PROFIT_PERCENT = PROFIT_PERCENT
+        self.BELOW_PERCENT = BELOW_PERCENT
+        self.ORDER_VALUE = ORDER_VALUE
+        self.MAX_ORDERS = MAX_ORDERS
+        self.MIN_MOVEMENT = MIN_MOVEMENT
+        self.ROUNDING = ROUNDING
+        self.INITIAL_CAPITAL = INITIAL_CAPITAL
+        self.COMMISSION = COMMISSION  # en pourcentage du notionnel
+
+    @classmethod
+    def from_config(cls, config, **overrides):
+        params = cls(
+            PROFIT_PERCENT=config.PROFIT_PERCENT,
+            BELOW_PERCENT=config.BELOW_PERCENT,
+            ORDER_VALUE=config.ORDER_VALUE,
+            MAX_ORDERS=config.MAX_ORDERS,
+            MIN_MOVEMENT=config.MIN_MOVEMENT,
+            ROUNDING=config.ROUNDING,
+            INITIAL_CAPITAL=float(os.getenv('INITIAL_CAPITAL', '1000')),
+            COMMISSION=float(os.getenv('COMMISSION', '0.1'))
+        )
+        for key, value in overrides.items():
+            setattr(params, key, value)
+        return params
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class BacktestResult:
+    """Courbe de capital (par bougie) et liste des transactions"""
+
+    def __init__(self, symbol, timestamps, close, equity, net_profit, open_positions, trades, params):
+        self.symbol = symbol
+        self.timestamps = timestamps
+        self.close = close
+        self.equity = equity
+        self.net_profit = net_profit
+        self.open_positions = open_positions
+        self.trades = trades
+        self.params = params
+
+    def summary(self):
+        peak = np.maximum.accumulate(self.equity)
+        drawdown = (peak - self.equity) / peak
+        initial = self.params.INITIAL_CAPITAL
+        sells = [t for t in self.trades if t['side'] == 'SELL']
+        return {
+            'symbol': self.symbol,
+            'bars': int(len(self.equity)),
+            'final_equity': float(self.equity[-1]) if len(self.equity) else initial,
+            'return_percent': float((self.equity[-1] / initial - 1) * 100) if len(self.equity) else 0.0,
+            'max_drawdown_percent': float(drawdown.max() * 100) if len(drawdown) else 0.0,
+            'buys': len(self.trades) - len(sells),
+            'cycles': len(sells),
+            'open_positions': int(self.open_positions[-1]) if len(self.open_positions) else 0
+        }
+
+    def trade_history(self):
+        """Transactions au format des colonnes de TradeHistory"""
+        return [dict(t, timestamp=_to_datetime(t['timestamp'])) for t in self.trades]
+
+    def snapshots(self, every=1):
+        """Courbe de capital au format des colonnes de TradingSnapshot"""
+        index = np.arange(0, len(self.equity), every)
+        return [{
+            'timestamp': _to_datetime(self.timestamps[i]),
+            'equity': float(self.equity[i]),
+            'net_profit': float(self.net_profit[i]),
+            'open_positions': int(self.open_positions[i]),
+            'pending_orders': 0,
+            'btc_price': float(self.close[i])
+        } for i in index]
+
+
+def _to_datetime(timestamp):
+    # Horodatages Binance en millisecondes
+    return datetime.utcfromtimestamp(float(timestamp) / 1000)
+
+
+def load_candles(path):
+    """Charge des bougies depuis un CSV (timestamp,open,high,low,close,volume[,signal]) ou un NPZ"""
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    with open(path) as f:
+        header = f.readline().strip().lower().split(',')
+    has_header = not _is_number(header[0])
+    columns = header if has_header else ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'signal'][:len(header)]
+    data = np.loadtxt(path, delimiter=',', skiprows=1 if has_header else 0, ndmin=2)
+    return {name: data[:, i] for i, name in enumerate(columns)}
+
+
+def load_signals(path):
+    """Charge une série de signaux (1 achat, -1 vente, 0 rien) alignée sur les bougies"""
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return data['signal']
+    return np.loadtxt(path, delimiter=',', ndmin=1)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def calculate_quantities(prices, order_value, min_movement, decimals):
+    """Version vectorisée de main.calculate_quantity"""
+    raw_qty = order_value / prices
+    rounded = np.round(raw_qty, decimals)
+    return np.where(rounded >= raw_qty, rounded + min_movement, rounded + min_movement * 2)
+
+
+def run_backtest(candles, signals=None, params=None, symbol='BTCUSDT', window=4096):
+    """Rejoue la stratégie ; chaque cycle (première entrée -> sortie) est résolu par tableaux
+
+    Après la première entrée au prix p0, le k-ième palier est exactement
+    p0 * (1 - BELOW_PERCENT/100)**k : il est rempli par le premier signal
+    d'achat suivant le palier précédent dont le prix est sous ce niveau, et la
+    sortie est le premier dépassement de l'objectif du palier courant. Seules
+    les boucles sur les cycles et sur leurs paliers (au plus MAX_ORDERS) restent en Python.
+    """
+    params = params or BacktestParams()
+    close = np.asarray(candles['close'], dtype=np.float64)
+    n = len(close)
+    timestamps = np.asarray(candles.get('timestamp', np.arange(n)), dtype=np.float64)
+    if signals is None:
+        signals = candles.get('signal', np.full(n, BUY))
+    signals = np.asarray(signals)
+
+    buy_bars = np.flatnonzero(signals == BUY)
+    sell_mask = signals == SELL
+    below = 1 - params.BELOW_PERCENT / 100
+    profit = 1 + params.PROFIT_PERCENT / 100
+    fee = params.COMMISSION / 100
+
+    cash_delta = np.zeros(n)
+    qty_delta = np.zeros(n)
+    count_delta = np.zeros(n, dtype=np.int64)
+    trades = []
+    cash = float(params.INITIAL_CAPITAL)
+    position = 0  # prochaine bougie à examiner
+
+    while position < n:
+        j = np.searchsorted(buy_bars, position)
+        if j >= len(buy_bars):
+            break
+        t0 = buy_bars[j]
+
+        # Limite de can_open_new_position : current_orders < min(PIR, MAX_ORDERS)
+        net_profit = cash - params.INITIAL_CAPITAL
+        pir = (cash + net_profit) / params.ORDER_VALUE
+        limit = min(pir, params.MAX_ORDERS)
+        max_entries = int(np.ceil(limit)) if limit > 0 else 0
+        if max_entries == 0:
+            break
+
+        levels = close[t0] * below ** np.arange(max_entries)
+        quantities = calculate_quantities(levels, params.ORDER_VALUE, params.MIN_MOVEMENT, params.ROUNDING)
+        cum_qty = np.cumsum(quantities)
+        avg = np.cumsum(levels * quantities) / cum_qty
+        targets = avg * profit
+
+        # Fenêtre croissante : on ne relit pas toute la série à chaque cycle
+        span = window
+        while True:
+            end = min(n, t0 + 1 + span)
+            entry_bars = _ladder_entries(buy_bars[j + 1:], close, levels, end)
+            entry_bars = np.concatenate(([t0], entry_bars))
+            bars = np.arange(t0 + 1, end)
+            level_of_bar = np.searchsorted(entry_bars, bars, side='left') - 1
+            bar_close = close[t0 + 1:end]
+            exits = (bar_close >= targets[level_of_bar]) | (sell_mask[t0 + 1:end] & (bar_close > avg[level_of_bar]))
+            hit = np.argmax(exits) if len(exits) else 0
+            if (len(exits) and exits[hit]) or end == n:
+                break
+            span *= 4
+
+        exited = len(exits) > 0 and bool(exits[hit])
+        exit_bar = t0 + 1 + hit if exited else n
+        entry_bars = entry_bars[entry_bars < exit_bar]
+        filled = len(entry_bars)
+
+        costs = levels[:filled] * quantities[:filled] * (1 + fee)
+        np.add.at(cash_delta, entry_bars, -costs)
+        np.add.at(qty_delta, entry_bars, quantities[:filled])
+        np.add.at(count_delta, entry_bars, 1)
+        cash -= costs.sum()
+        for k in range(filled):
+            trades.append({'timestamp': timestamps[entry_bars[k]], 'symbol': symbol, 'side': 'BUY',
+                           'quantity': float(quantities[k]), 'price': float(levels[k]), 'status': 'FILLED'})
+
+        if not exited:
+            break
+        total_qty = cum_qty[filled - 1]
+        proceeds = close[exit_bar] * total_qty * (1 - fee)
+        cash_delta[exit_bar] += proceeds
+        qty_delta[exit_bar] -= total_qty
+        count_delta[exit_bar] -= filled
+        cash += proceeds
+        trades.append({'timestamp': timestamps[exit_bar], 'symbol': symbol, 'side': 'SELL',
+                       'quantity': float(total_qty), 'price': float(close[exit_bar]), 'status': 'FILLED'})
+        position = exit_bar + 1
+
+    held = np.cumsum(qty_delta)
+    equity = params.INITIAL_CAPITAL + np.cumsum(cash_delta) + held * close
+    return BacktestResult(
+        symbol=symbol,
+        timestamps=timestamps,
+        close=close,
+        equity=equity,
+        net_profit=equity - params.INITIAL_CAPITAL,
+        open_positions=np.cumsum(count_delta),
+        trades=trades,
+        params=params
+    )
+
+
+def run_reference_backtest(candles, signals=None, params=None, symbol='BTCUSDT'):
+    """Même stratégie bougie par bougie, sans vectorisation (référence des tests de run_backtest)
+
+    Sur chaque bougie du cycle, la sortie est examinée avant l'entrée. Comme
+    `/webhook`, un signal d'achat ne remplit le palier suivant que si son
+    propre prix est inférieur ou égal au niveau de ce palier.
+    """
+    params = params or BacktestParams()
+    close = np.asarray(candles['close'], dtype=np.float64)
+    n = len(close)
+    timestamps = np.asarray(candles.get('timestamp', np.arange(n)), dtype=np.float64)
+    if signals is None:
+        signals = candles.get('signal', np.full(n, BUY))
+    signals = np.asarray(signals)
+    below = 1 - params.BELOW_PERCENT / 100
+    profit = 1 + params.PROFIT_PERCENT / 100
+    fee = params.COMMISSION / 100
+
+    cash = float(params.INITIAL_CAPITAL)
+    equity = np.empty(n)
+    open_positions = np.zeros(n, dtype=np.int64)
+    trades = []
+    entries = []  # (prix, quantité) du cycle en cours
+    max_entries = 0
+    stopped = False
+
+    for t in range(n):
+        price = close[t]
+        if entries:
+            quantity = sum(q for _, q in entries)
+            avg = sum(p * q for p, q in entries) / quantity
+            if price >= avg * profit or (signals[t] == SELL and price > avg):
+                cash += price * quantity * (1 - fee)
+                trades.append({'timestamp': timestamps[t], 'symbol': symbol, 'side': 'SELL',
+                               'quantity': float(quantity), 'price': float(price), 'status': 'FILLED'})
+                entries = []
+            elif signals[t] == BUY and len(entries) < max_entries:
+                level = entries[0][0] * below ** len(entries)
+                if price <= level:
+                    quantity = float(calculate_quantities(np.array([level]), params.ORDER_VALUE,
+                                                          params.MIN_MOVEMENT, params.ROUNDING)[0])
+                    entries.append((level, quantity))
+                    cash -= level * quantity * (1 + fee)
+                    trades.append({'timestamp': timestamps[t], 'symbol': symbol, 'side': 'BUY',
+                                   'quantity': quantity, 'price': float(level), 'status': 'FILLED'})
+        elif signals[t] == BUY and not stopped:
+            net_profit = cash - params.INITIAL_CAPITAL
+            limit = min((cash + net_profit) / params.ORDER_VALUE, params.MAX_ORDERS)
+            max_entries = int(np.ceil(limit)) if limit > 0 else 0
+            if max_entries == 0:
+                stopped = True
+            else:
+                quantity = float(calculate_quantities(np.array([price]), params.ORDER_VALUE,
+                                                      params.MIN_MOVEMENT, params.ROUNDING)[0])
+                entries = [(price, quantity)]
+                cash -= price * quantity * (1 + fee)
+                trades.append({'timestamp': timestamps[t], 'symbol': symbol, 'side': 'BUY',
+                               'quantity': quantity, 'price': float(price), 'status': 'FILLED'})
+        equity[t] = cash + sum(q for _, q in entries) * price
+        open_positions[t] = len(entries)
+
+    return BacktestResult(
+        symbol=symbol,
+        timestamps=timestamps,
+        close=close,
+        equity=equity,
+        net_profit=equity - params.INITIAL_CAPITAL,
+        open_positions=open_positions,
+        trades=trades,
+        params=params
+    )
+
+
+def _ladder_entries(later_buys, close, levels, end):
+    """Bougies des paliers 1..k : premier signal postérieur au palier précédent dont le prix est sous le niveau
+
+    Même condition que `/webhook` (signal_price <= next_price) : un signal
+    au-dessus du niveau ne remplit rien, même si un signal antérieur l'a atteint.
+    """
+    later_buys = later_buys[later_buys < end]
+    prices = close[later_buys]
+    entries = []
+    start = 0
+    for level in levels[1:]:
+        below = np.flatnonzero(prices[start:] <= level)
+        if not len(below):
+            break
+        start += below[0]
+        entries.append(later_buys[start])
+        start += 1
+    return np.array(entries, dtype=np.int64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest de la stratégie DCA/PIR')
+    parser.add_argument('candles', help='Fichier de bougies (.csv ou .npz)')
+    parser.add_argument('--signals', help='Série de signaux (.csv ou .npz), achat à chaque bougie par défaut')
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--output', help='Fichier JSON de sortie (résumé, transactions, courbe)')
+    parser.add_argument('--every', type=int, default=60, help='Pas de la courbe de capital exportée (bougies)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    candles = load_candles(args.candles)
+    signals = load_signals(args.signals) if args.signals else None
+    params = BacktestParams.from_config(Config())
+
+    start = time.time()
+    result = run_backtest(candles, signals, params, symbol=args.symbol)
+    summary = result.summary()
+    logger.info(f"Backtest done in {time.time() - start:.2f}s: {summary}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'params': params.to_dict(),
+                'summary': summary,
+                'trades': result.trade_history(),
+                'equity': result.snapshots(every=args.every)
+            }, f, default=str)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""Benchmarks reproductibles des chemins critiques du bot
+
+L'application est chargée contre l'échange simulé (aucun appel réseau) et une
+base SQLite temporaire. Chaque scénario mesure la latence de chaque appel et
+rapporte débit, p50, p99 ; les résultats sont enregistrés en JSON pour être
+comparés d'un commit à l'autre.
+
+Usage :
+    python benchmark.py --output bench.json
+    python benchmark.py --scenario webhook --rate 200 --signals 2000
+    python benchmark.py --compare bench.json --output bench-new.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from position_manager import PositionManager
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ('webhook', 'monitor', 'aggregates', 'dashboard')
+
+
+def summarize(latencies, elapsed=None):
+    """Débit et percentiles (ms) d'une série de durées en secondes"""
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    if not len(values):
+        return {'count': 0}
+    elapsed = elapsed if elapsed is not None else values.sum() / 1000
+    return {
+        'count': int(len(values)),
+        'throughput_per_s': round(len(values) / elapsed, 2) if elapsed > 0 else None,
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p99_ms': round(float(np.percentile(values, 99)), 4),
+        'max_ms': round(float(values.max()), 4)
+    }
+
+
+def timed_calls(func, count):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def load_app(workdir, webhook_mode):
+    """Importe main contre l'échange simulé et une base temporaire"""
+    os.environ.update({
+        'EXCHANGE': 'simulated',
+        'SIM_INITIAL_BALANCE': '1000000000',
+        'POSITION_STORE': '',
+        'SYMBOL_RULES_FILE': '',
+        'ORDER_EVENTS': 'poll',
+        'WEBHOOK_MODE': webhook_mode,
+        'DISABLE_TIMEWINDOW': 'true',
+        'DISABLE_MAX_ORDERS_CHECK': 'true',
+        'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    })
+    os.environ.pop('WEBHOOK_TOKEN', None)
+    import main
+    main.create_app()
+    return main
+
+
+def symbols_for(count):
+    return [f'SYM{i}USDT' for i in range(count)]
+
+
+def bench_webhook(main, signals, rate, symbols, duplicate_rate=0.0):
+    """POST /webhook via le client de test, au débit demandé (0 = au plus vite)
+
+    Chaque signal porte un signal_id unique, sauf une proportion `duplicate_rate`
+    qui rejoue un signal déjà envoyé (retries TradingView).
+    """
+    client = main.app.test_client()
+    names = symbols_for(symbols)
+    for symbol in names:
+        main.binance.set_price(symbol, 100.0)
+    interval = 1.0 / rate if rate else 0
+    rng = random.Random(1)
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    for i in range(signals):
+        if interval:
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if i and rng.random() < duplicate_rate:
+            signal_id = f'bench-{rng.randrange(i)}'
+            symbol = names[int(signal_id.split('-')[1]) % len(names)]
+        else:
+            signal_id = f'bench-{i}'
+            symbol = names[i % len(names)]
+        action = 'sell' if rng.random() < 0.1 else 'buy'
+        t = time.perf_counter()
+        response = client.post('/webhook', json={'signal_id': signal_id, 'symbol': symbol, 'action': action,
+                                                 'price': 100.0})
+        latencies.append(time.perf_counter() - t)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    result = summarize(latencies, time.perf_counter() - start)
+    if main.signal_queue:
+        # Mode asynchrone : la latence HTTP ne couvre que la mise en file
+        main.signal_queue.flush()
+        result['processed_per_s'] = round(signals / (time.perf_counter() - start), 2)
+    result['statuses'] = statuses
+    result['target_rate'] = rate
+    return result
+
+
+def seed_orders(main, symbols, orders):
+    """N symboles x M ordres limites au repos, et une position par symbole"""
+    for symbol in symbols_for(symbols):
+        main.binance.set_price(symbol, 100.0)
+        main.position_manager.add_position(symbol, 100.0, 1.0, None)
+        for _ in range(orders):
+            order = main.binance.place_limit_order(symbol, 'BUY', 1.0, 50.0)
+            main.position_manager.add_pending_order(symbol, order['orderId'], 'BUY', 50.0, 1.0)
+
+
+def bench_monitor(main, symbols, orders, iterations):
+    seed_orders(main, symbols, orders)
+    with main.app.app_context():
+        return {
+            'symbols': symbols,
+            'orders_per_symbol': orders,
+            'monitor_pending_orders': timed_calls(main.monitor_pending_orders, iterations),
+            'check_exit_conditions': timed_calls(main.check_exit_conditions, iterations)
+        }
+
+
+def bench_aggregates(symbols, positions, iterations):
+    """Appels agrégés du PositionManager (sans journal)"""
+    manager = PositionManager()
+    names = symbols_for(symbols)
+    rng = random.Random(2)
+    for symbol in names:
+        for _ in range(positions):
+            manager.add_position(symbol, rng.uniform(90, 110), rng.uniform(0.1, 1), None)
+    calls = {
+        'calculate_avg_price': lambda: [manager.calculate_avg_price(s) for s in names],
+        'get_unrealized_profit': lambda: [manager.get_unrealized_profit(s, 100.0) for s in names],
+        'get_total_quantity': lambda: [manager.get_total_quantity(s) for s in names],
+        'get_last_entry_price': lambda: [manager.get_last_entry_price(s) for s in names]
+    }
+    result = {'symbols': symbols, 'positions_per_symbol': positions}
+    for name, call in calls.items():
+        result[name] = timed_calls(call, iterations)
+    return result
+
+
+def seed_database(main, snapshots, trades):
+    """Snapshots toutes les 5 minutes jusqu'à maintenant, et transactions réparties sur la période"""
+    now = datetime.utcnow()
+    rng = random.Random(3)
+    with main.app.app_context():
+        main.db.session.execute(main.TradingSnapshot.__table__.insert(), [{
+            'timestamp': now - timedelta(minutes=5 * (snapshots - i)),
+            'equity': 10000 + rng.uniform(-500, 500),
+            'net_profit': rng.uniform(-100, 100),
+            'open_positions': rng.randint(0, 5),
+            'pending_orders': rng.randint(0, 5),
+            'btc_price': 60000.0
+        } for i in range(snapshots)])
+        span = 5 * 60 * snapshots
+        main.db.session.execute(main.TradeHistory.__table__.insert(), [{
+            'timestamp': now - timedelta(seconds=span * (trades - i) / trades),
+            'symbol': f'SYM{i % 10}USDT',
+            'side': 'BUY' if i % 3 else 'SELL',
+            'quantity': 1.0,
+            'price': 100.0,
+            'status': 'FILLED' if i % 3 else 'EXECUTED'
+        } for i in range(trades)])
+        main.db.session.commit()
+
+
+def bench_dashboard(main, snapshots, trades, iterations):
+    seed_database(main, snapshots, trades)
+    client = main.app.test_client()
+    first = client.get('/api/dashboard/data')
+    cursor, etag = first.json['cursor'], first.headers['ETag']
+    return {
+        'snapshots': snapshots,
+        'trades': trades,
+        'full': timed_calls(lambda: client.get('/api/dashboard/data'), iterations),
+        'delta': timed_calls(lambda: client.get(f'/api/dashboard/data?since={cursor}'), iterations),
+        'not_modified': timed_calls(lambda: client.get('/api/dashboard/data', headers={'If-None-Match': etag}),
+                                    iterations),
+        'trades_by_symbol': timed_calls(lambda: client.get('/api/trades?symbol=SYM3USDT'), iterations),
+        'daily_pnl': timed_calls(lambda: client.get('/api/pnl/daily'), iterations)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, path=()):
+    """Lignes 'scénario: p50/p99 avant -> après' pour les mesures communes"""
+    lines = []
+    for key, value in current.items():
+        before = previous.get(key) if isinstance(previous, dict) else None
+        if isinstance(value, dict) and 'p50_ms' in value and isinstance(before, dict) and 'p50_ms' in before:
+            lines.append(f"{'.'.join(path + (key,))}: p50 {before['p50_ms']} -> {value['p50_ms']} ms, "
+                         f"p99 {before['p99_ms']} -> {value['p99_ms']} ms")
+        elif isinstance(value, dict):
+            lines.extend(compare(before or {}, value, path + (key,)))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks des chemins critiques du bot')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scénarios à lancer (tous par défaut)')
+    parser.add_argument('--signals', type=int, default=1000, help='Nombre de signaux webhook')
+    parser.add_argument('--rate', type=float, default=0, help='Signaux par seconde (0 = au plus vite)')
+    parser.add_argument('--webhook-mode', choices=('sync', 'async'), default='sync')
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help='Part de signaux rejoués (0-1)')
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=10, help='Ordres en attente par symbole')
+    parser.add_argument('--positions', type=int, default=100, help='Positions par symbole (agrégats)')
+    parser.add_argument('--snapshots', type=int, default=8640, help='Snapshots en base (30 jours par défaut)')
+    parser.add_argument('--trades', type=int, default=100000, help='Transactions en base')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--output', help='Fichier JSON des résultats')
+    parser.add_argument('--compare', help='Résultats JSON précédents à comparer')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    # Avant l'import de main : ses logs INFO fausseraient les mesures
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    scenarios = args.scenario or list(SCENARIOS)
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    app = load_app(workdir, args.webhook_mode)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': {}
+    }
+    for scenario in scenarios:
+        start = time.time()
+        if scenario == 'webhook':
+            result = bench_webhook(app, args.signals, args.rate, args.symbols, args.duplicate_rate)
+        elif scenario == 'monitor':
+            result = bench_monitor(app, args.symbols, args.orders, args.iterations)
+        elif scenario == 'aggregates':
+            result = bench_aggregates(args.symbols, args.positions, args.iterations)
+        else:
+            result = bench_dashboard(app, args.snapshots, args.trades, args.iterations)
+        results['results'][scenario] = result
+        print(f"{scenario} ({time.time() - start:.1f}s)")
+        print(json.dumps(result, indent=2))
+
+    app.db_writer.flush(timeout=10)
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"Comparison with {previous.get('commit')}:")
+        for line in compare(previous.get('results', {}), results['results']):
+            print(f"  {line}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,453 @@
-from binance.client import Client
+import heapq
+import itertools
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+
+import metrics
+
+# Priorités du planificateur (plus petit = plus prioritaire)
+PRIORITY_ORDER = 0   # placement et annulation d'ordres
+PRIORITY_STATUS = 1  # suivi des ordres ouverts
+PRIORITY_READ = 2    # prix, compte, dashboard
+
+# Poids des endpoints REST Spot (limite REQUEST_WEIGHT par minute)
+ENDPOINT_WEIGHTS = {
+    'create_order': 1,
+    'cancel_order': 1,
+    'get_order': 4,
+    'get_open_orders': 6,
+    'get_all_open_orders': 80,
+    'get_symbol_ticker': 2,
+    'get_account': 20,
+    'get_exchange_info': 20,
+    'get_server_time': 1
+}
+
+# Délai maximal par endpoint (s) : lectures courtes (doublées si lentes), ordres plus patients
+DEFAULT_TIMEOUT = 10
+ENDPOINT_TIMEOUTS = {
+    'get_symbol_ticker': 2,
+    'get_server_time': 2,
+    'get_order': 3,
+    'get_open_orders': 5,
+    'get_account': 5,
+    'cancel_order': 5,
+    'create_order': 10,
+    'get_exchange_info': 10
+}
+# Endpoints python-binance sans paramètres : délai par défaut du client
+UNPARAMETERIZED = ('get_server_time', 'get_exchange_info')
+# Lectures idempotentes pouvant être doublées par une seconde requête
+HEDGED_ENDPOINTS = ('get_symbol_ticker', 'get_order', 'get_open_orders', 'get_account')
+# Code d'erreur Binance : horodatage hors de recvWindow
+INVALID_TIMESTAMP = -1021
+
+
+class RateLimitExceeded(Exception):
+    """Budget de poids épuisé au-delà du délai d'attente autorisé"""
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestScheduler:
+    """Planificateur des appels REST selon le budget de poids glissant de Binance
+
+    Chaque appel consomme le poids de son endpoint sur une fenêtre glissante.
+    Les lectures ne peuvent pas entamer la réserve, gardée pour les ordres ;
+    quand le budget manque, les appelants attendent et sont servis par
+    priorité. Les lectures identiques en cours sont fusionnées.
+    """
+
+    def __init__(self, max_weight=6000, window=60.0, reserve=0.2, max_wait=10.0):
+        self.max_weight = max_weight
+        self.window = window
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.entries = deque()  # (timestamp, poids)
+        self.used = 0
+        self.server_used = 0
+        self.server_time = 0
+        self.blocked_until = 0
+        self.calls = {}  # endpoint: nombre d'appels
+        self.coalesced = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self._waiters = []  # tas (priorité, séquence)
+        self._sequence = itertools.count()
+        self._inflight = {}
+        self._metrics = {}  # endpoint: (histogramme, compteur d'erreurs)
+        self._throttle_rejections = metrics.registry.counter(
+            'bot_exchange_rate_limited_total', 'Appels refusés faute de budget de poids')
+        self._throttle_wait = metrics.registry.histogram(
+            'bot_exchange_throttle_wait_seconds', 'Attente du budget de poids avant un appel')
+        self._condition = threading.Condition()
+        self.logger = logging.getLogger(__name__)
+
+    def _expire(self, now):
+        while self.entries and now - self.entries[0][0] >= self.window:
+            self.used -= self.entries.popleft()[1]
+
+    def _limit(self, priority):
+        if priority == PRIORITY_ORDER:
+            return self.max_weight
+        return self.max_weight * (1 - self.reserve)
+
+    def acquire(self, weight, priority=PRIORITY_READ):
+        """Réserve `weight` dans la fenêtre ; attend au plus `max_wait` secondes"""
+        start = time.time()
+        deadline = start + self.max_wait
+        with self._condition:
+            waiter = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, waiter)
+            try:
+                while True:
+                    now = time.time()
+                    self._expire(now)
+                    used = max(self.used, self.server_used if now - self.server_time < self.window else 0)
+                    if (self._waiters[0] == waiter and now >= self.blocked_until
+                            and used + weight <= self._limit(priority)):
+                        break
+                    if now >= deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded(f"Request weight budget exhausted ({used}/{self.max_weight})")
+                    if self.entries:
+                        retry = self.entries[0][0] + self.window - now
+                    else:
+                        retry = self.window
+                    if now < self.blocked_until:
+                        retry = self.blocked_until - now
+                    self._condition.wait(min(max(retry, 0.01), deadline - now))
+                heapq.heappop(self._waiters)
+                self.entries.append((now, weight))
+                self.used += weight
+            except RateLimitExceeded:
+                self._throttle_rejections.inc()
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                raise
+            finally:
+                self._condition.notify_all()
+        waited = time.time() - start
+        self._throttle_wait.observe(waited)
+        if waited > 0.01:
+            self.throttled += 1
+            self.wait_time += waited
+
+    def try_acquire(self, weight, priority=PRIORITY_READ):
+        """Réserve `weight` seulement s'il est disponible tout de suite et que personne n'attend"""
+        with self._condition:
+            now = time.time()
+            self._expire(now)
+            used = max(self.used, self.server_used if now - self.server_time < self.window else 0)
+            if self._waiters or now < self.blocked_until or used + weight > self._limit(priority):
+                return False
+            self.entries.append((now, weight))
+            self.used += weight
+            return True
+
+    def observe(self, used_weight):
+        """Poids utilisé annoncé par le serveur (en-tête X-MBX-USED-WEIGHT-1M)"""
+        with self._condition:
+            self.server_used = used_weight
+            self.server_time = time.time()
+
+    def backoff(self, seconds):
+        """Suspend tous les appels (réponse 429/418 avec Retry-After)"""
+        with self._condition:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+        self.logger.warning(f"Rate limited by exchange, pausing requests for {seconds}s")
+
+    def call(self, endpoint, fn, *args, priority=PRIORITY_READ, key=None, weight=None, **kwargs):
+        """Exécute `fn` après réservation du poids ; `key` fusionne les lectures identiques"""
+        if key is not None:
+            with self._condition:
+                inflight = self._inflight.get(key)
+                leader = inflight is None
+                if leader:
+                    inflight = self._inflight[key] = _InFlight()
+                else:
+                    self.coalesced += 1
+            if not leader:
+                inflight.done.wait()
+                if inflight.error:
+                    raise inflight.error
+                return inflight.result
+            try:
+                inflight.result = self._call(endpoint, fn, args, kwargs, priority, weight)
+                return inflight.result
+            except Exception as e:
+                inflight.error = e
+                raise
+            finally:
+                with self._condition:
+                    del self._inflight[key]
+                inflight.done.set()
+        return self._call(endpoint, fn, args, kwargs, priority, weight)
+
+    def _endpoint_metrics(self, endpoint):
+        series = self._metrics.get(endpoint)
+        if series is None:
+            series = self._metrics[endpoint] = (
+                metrics.registry.histogram('bot_exchange_request_duration_seconds',
+                                           'Durée des appels REST par endpoint', endpoint=endpoint),
+                metrics.registry.counter('bot_exchange_errors_total',
+                                         'Erreurs des appels REST par endpoint', endpoint=endpoint)
+            )
+        return series
+
+    def _call(self, endpoint, fn, args, kwargs, priority, weight):
+        self.acquire(weight or ENDPOINT_WEIGHTS.get(endpoint, 1), priority)
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        latency, errors = self._endpoint_metrics(endpoint)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            errors.inc()
+            # BinanceAPIException, reconnue sans importer python-binance
+            if getattr(e, 'status_code', None) in (418, 429):
+                response = getattr(e, 'response', None)
+                retry_after = response.headers.get('Retry-After') if response is not None else None
+                self.backoff(float(retry_after or self.window))
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+
+    def stats(self):
+        with self._condition:
+            self._expire(time.time())
+            return {
+                'max_weight': self.max_weight,
+                'window_weight': self.used,
+                'server_weight': self.server_used,
+                'utilization': round(self.used / self.max_weight, 4),
+                'waiting': len(self._waiters),
+                'calls': dict(self.calls),
+                'coalesced': self.coalesced,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+                'wait_time': round(self.wait_time, 3)
+            }
+
 
 class BinanceAPI:
-    def __init__(self, api_key, api_secret, testnet=True):
+    def __init__(self, api_key, api_secret, testnet=True, price_feed=None, price_max_age=5.0,
+                 account_ttl=2.0, scheduler=None, pool_size=32, hedge_delay=0.3):
         self.testnet = testnet
         self.api_url = "https://testnet.binance.vision" if testnet else "https://api.binance.com"
         
-        self.client = Client(
-            api_key=api_key,
-            api_secret=api_secret,
-            testnet=self.testnet
-        )
+        # Client python-binance construit au premier appel : son import est lourd et il
+        # interroge l'échange dès sa création
+        self._api_key = api_key
+        self._api_secret = api_secret
+        self._client = None
+        self._client_lock = threading.Lock()
         
+        # Transport : connexions persistantes en nombre suffisant pour les workers concurrents
+        self.pool_size = pool_size
+        # Lectures idempotentes doublées après `hedge_delay` secondes sans réponse ; 0 = jamais
+        self.hedge_delay = hedge_delay
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='binance-hedge')
+        self._hedge_count = metrics.registry.counter('bot_exchange_hedged_total',
+                                                     'Lectures doublées par une seconde requête')
+        # Écart horloge serveur - horloge locale (ms), appliqué aux appels signés
+        self.time_offset = 0
+        self.time_synced = 0
+        self.resyncs = 0
+                
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Binance API initialized for {'TESTNET' if testnet else 'MAINNET'}")
         self.logger.info(f"Using API URL: {self.api_url}")
 
-    def place_limit_order(self, symbol, side, quantity, price):
+        # Tous les appels REST passent par le budget de poids
+        self.scheduler = scheduler or RequestScheduler()
+
+        # Flux de prix optionnel : les lectures deviennent des accès mémoire
+        self.price_feed = price_feed
+        self.price_max_age = price_max_age
+        if self.price_feed:
+            self.price_feed.start()
+
+        # Instantané du compte partagé par get_equity / get_net_profit / get_positions
+        self.account_ttl = account_ttl
+        self._account = None
+        self._account_time = 0
+        self._account_lock = threading.Lock()
+
+    @property
+    def client(self):
+        created = False
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from binance.client import Client
+                    from requests.adapters import HTTPAdapter
+                    client = Client(
+                        api_key=self._api_key,
+                        api_secret=self._api_secret,
+                        testnet=self.testnet,
+                        requests_params={'timeout': DEFAULT_TIMEOUT},
+                        ping=False
+                    )
+                    # Pool dimensionné pour les workers, sans reprise implicite (gérée ici)
+                    client.session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size,
+                                                                 max_retries=0))
+                    self._client = client
+                    created = True
+        if created:
+            # Remplace le ping de python-binance : ouvre la connexion et mesure l'écart d'horloge
+            self.sync_time()
+        return self._client
+
+    def sync_time(self):
+        """Mesure l'écart avec l'horloge du serveur (tâche périodique et après un rejet -1021)"""
+        try:
+            before = time.time()
+            server_time = self._request('get_server_time', PRIORITY_STATUS)['serverTime']
+            after = time.time()
+            # L'heure serveur correspond au milieu de l'aller-retour
+            self.time_offset = int(server_time - (before + after) * 500)
+            self.client.timestamp_offset = self.time_offset
+            self.time_synced = after
+            if abs(self.time_offset) > 1000:
+                self.logger.warning(f"Local clock is {-self.time_offset} ms off the exchange clock")
+            return self.time_offset
+        except Exception as e:
+            self.logger.error(f"Server time sync failed: {e}")
+            return None
+
+    def _request(self, endpoint, priority, key=None, weight=None, **params):
+        """Appel REST `self.client.<endpoint>(**params)` via le planificateur"""
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        
+        def send():
+            # Réponse capturée pour cet appel : self.client.response est partagé par tous les threads
+            responses = []
+            call_params = params
+            if endpoint not in UNPARAMETERIZED:
+                call_params = dict(params, requests_params={
+                    'timeout': timeout,
+                    'hooks': {'response': lambda response, *args, **kwargs: responses.append(response)}
+                })
+            try:
+                return getattr(self.client, endpoint)(**call_params)
+            finally:
+                used = responses[-1].headers.get('x-mbx-used-weight-1m') if responses else None
+                if used:
+                    self.scheduler.observe(int(used))
+        
+        call = send
+        if self.hedge_delay and endpoint in HEDGED_ENDPOINTS:
+            call = lambda: self._hedged(endpoint, send, priority, weight)
         try:
-            order = self.client.create_order(
+            return self.scheduler.call(endpoint, call, priority=priority, key=key, weight=weight)
+        except Exception as e:
+            if getattr(e, 'code', None) != INVALID_TIMESTAMP or endpoint == 'get_server_time':
+                raise
+            # Horloge dérivée : resynchroniser puis une seule reprise, sans doublon (l'ordre rejeté n'existe pas)
+            self.resyncs += 1
+            self.logger.warning(f"{endpoint} rejected for timestamp drift, resyncing server time")
+            self.sync_time()
+            return self.scheduler.call(endpoint, send, priority=priority, key=key, weight=weight)
+
+    def _hedged(self, endpoint, send, priority, weight):
+        """Lecture idempotente : si la réponse tarde, une seconde requête part en parallèle
+
+        La première réponse réussie l'emporte. La seconde requête n'est envoyée
+        que si le budget de poids le permet sans attendre. Un rejet -1021 est
+        remonté sans attendre l'autre requête, signée avec le même décalage.
+        """
+        first = self._hedge_pool.submit(send)
+        try:
+            return first.result(timeout=self.hedge_delay)
+        except FutureTimeout:
+            pass
+        if not self.scheduler.try_acquire(weight or ENDPOINT_WEIGHTS.get(endpoint, 1), priority):
+            return first.result()
+        self.hedged += 1
+        self._hedge_count.inc()
+        second = self._hedge_pool.submit(send)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is second:
+                        self.hedge_wins += 1
+                    return future.result()
+                if getattr(error, 'code', None) == INVALID_TIMESTAMP:
+                    raise error
+        return first.result()  # les deux ont échoué : erreur de la première
+
+    def transport_stats(self):
+        return {
+            'pool_size': self.pool_size,
+            'hedge_delay': self.hedge_delay,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'time_offset_ms': self.time_offset,
+            'time_synced': self.time_synced,
+            'resyncs': self.resyncs
+        }
+
+    def _get_account(self):
+        """Retourne le compte en cache, ou le recharge si le TTL est dépassé"""
+        with self._account_lock:
+            if self._account is None or time.time() - self._account_time > self.account_ttl:
+                self._account = self._request('get_account', PRIORITY_READ)
+                self._account_time = time.time()
+            return self._account
+
+    def invalidate_account(self):
+        """Force le rechargement du compte au prochain accès (ordre placé, rempli ou annulé)"""
+        with self._account_lock:
+            self._account = None
+
+    def place_limit_order(self, symbol, side, quantity, price, client_order_id=None):
+        try:
+            # newClientOrderId : l'échange refuse un second ordre ouvert avec le même identifiant
+            extra = {'newClientOrderId': client_order_id} if client_order_id else {}
+            order = self._request(
+                'create_order', PRIORITY_ORDER,
                 symbol=symbol,
                 side=side.upper(),
-                type=Client.ORDER_TYPE_LIMIT,
-                timeInForce=Client.TIME_IN_FORCE_GTC,
+                type='LIMIT',
+                timeInForce='GTC',
                 quantity=quantity,
-                price=price
+                price=price,
+                **extra
             )
+            self.invalidate_account()
             self.logger.info(f"Limit order placed: {symbol} {side} {quantity} @ {price}")
             return order
         except Exception as e:
             self.logger.error(f"Limit order failed: {e}")
             return None
 
-    def place_market_order(self, symbol, side, quantity):
+    def place_market_order(self, symbol, side, quantity, client_order_id=None):
         try:
-            order = self.client.create_order(
+            extra = {'newClientOrderId': client_order_id} if client_order_id else {}
+            order = self._request(
+                'create_order', PRIORITY_ORDER,
                 symbol=symbol,
                 side=side.upper(),
-                type=Client.ORDER_TYPE_MARKET,
-                quantity=quantity
+                type='MARKET',
+                quantity=quantity,
+                **extra
             )
+            self.invalidate_account()
             self.logger.info(f"Market order placed: {symbol} {side} {quantity}")
             return order
         except Exception as e:
@@ -48,7 +456,8 @@ class BinanceAPI:
 
     def get_order_status(self, symbol, order_id):
         try:
-            order = self.client.get_order(symbol=symbol, orderId=order_id)
+            order = self._request('get_order', PRIORITY_STATUS, key=('get_order', order_id),
+                                  symbol=symbol, orderId=order_id)
             return order['status']
         except Exception as e:
             self.logger.error(f"Order status check failed: {e}")
@@ -56,7 +465,8 @@ class BinanceAPI:
 
     def cancel_order(self, symbol, order_id):
         try:
-            result = self.client.cancel_order(symbol=symbol, orderId=order_id)
+            result = self._request('cancel_order', PRIORITY_ORDER, symbol=symbol, orderId=order_id)
+            self.invalidate_account()
             self.logger.info(f"Order canceled: {order_id}")
             return True
         except Exception as e:
@@ -64,16 +474,29 @@ class BinanceAPI:
             return False
 
     def get_current_price(self, symbol):
+        if self.price_feed:
+            price = self.price_feed.get_price(symbol, self.price_max_age)
+            if price is not None:
+                return price
+            # Prix absent ou périmé : repli sur REST
+            self.price_feed.subscribe(symbol)
         try:
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            return float(ticker['price'])
+            ticker = self._request('get_symbol_ticker', PRIORITY_READ, key=('ticker', symbol), symbol=symbol)
+            price = float(ticker['price'])
+            if self.price_feed:
+                self.price_feed.cache.update(symbol, price)
+            return price
         except Exception as e:
             self.logger.error(f"Price check failed: {e}")
             return 0.0
 
+    def get_exchange_info(self):
+        """Filtres de tous les symboles (exceptions propagées : le cache garde ses règles)"""
+        return self._request('get_exchange_info', PRIORITY_READ, key=('exchange_info',))
+
     def get_equity(self):
         try:
-            account = self.client.get_account()
+            account = self._get_account()
             return float(account['totalWalletBalance'])
         except Exception as e:
             self.logger.error(f"Error getting equity: {e}")
@@ -81,7 +504,7 @@ class BinanceAPI:
 
     def get_net_profit(self):
         try:
-            account = self.client.get_account()
+            account = self._get_account()
             return float(account['totalUnrealizedProfit'])
         except Exception as e:
             self.logger.error(f"Error getting net profit: {e}")
@@ -90,7 +513,7 @@ class BinanceAPI:
     def get_positions(self):
         try:
             positions = {}
-            account = self.client.get_account()
+            account = self._get_account()
             for balance in account['balances']:
                 if float(balance['free']) > 0 or float(balance['locked']) > 0:
                     positions[balance['asset']] = {
@@ -105,9 +528,11 @@ class BinanceAPI:
     def get_open_orders(self, symbol=None):
         try:
             if symbol:
-                return self.client.get_open_orders(symbol=symbol)
+                return self._request('get_open_orders', PRIORITY_STATUS, key=('open_orders', symbol), symbol=symbol)
             else:
-                return self.client.get_open_orders()
+                return self._request('get_open_orders', PRIORITY_STATUS, key=('open_orders', None),
+                                     weight=ENDPOINT_WEIGHTS['get_all_open_orders'])
         except Exception as e:
             self.logger.error(f"Error getting open orders: {e}")
-            return []
+            # None et non [] : une liste vide ferait croire que tous les ordres ont quitté le carnet
+            return None
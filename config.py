@@ -12,6 +12,70 @@ class Config:
         self.MIN_MOVEMENT = float(os.getenv('MIN_MOVEMENT', '0.0001'))
         self.ROUNDING = int(os.getenv('ROUNDING', '4'))
         self.MAX_ORDERS = int(os.getenv('MAX_ORDERS', '5'))
+        # Échange : 'binance' (défaut) ou 'simulated' (appariement local, sans réseau)
+        self.EXCHANGE = os.getenv('EXCHANGE', 'binance')
+        self.SIM_PRICE_FILE = os.getenv('SIM_PRICE_FILE', '')
+        self.SIM_INITIAL_BALANCE = float(os.getenv('SIM_INITIAL_BALANCE', '10000'))
+        self.SIM_LATENCY_MIN_MS = float(os.getenv('SIM_LATENCY_MIN_MS', '0'))
+        self.SIM_LATENCY_MAX_MS = float(os.getenv('SIM_LATENCY_MAX_MS', '0'))
+        self.SIM_ERROR_RATE = float(os.getenv('SIM_ERROR_RATE', '0'))
+        # Flux de prix : 'rest' (défaut), 'stream' (websocket) ou 'replay' (fichier CSV)
+        self.PRICE_FEED = os.getenv('PRICE_FEED', 'rest')
+        self.PRICE_MAX_AGE = float(os.getenv('PRICE_MAX_AGE', '5'))
+        self.PRICE_REPLAY_FILE = os.getenv('PRICE_REPLAY_FILE', 'prices.csv')
+        self.ACCOUNT_CACHE_TTL = float(os.getenv('ACCOUNT_CACHE_TTL', '2'))
+        # Budget de poids REST par minute ; la réserve est gardée pour les ordres
+        self.RATE_LIMIT_WEIGHT = int(os.getenv('RATE_LIMIT_WEIGHT', '6000'))
+        self.RATE_LIMIT_RESERVE = float(os.getenv('RATE_LIMIT_RESERVE', '0.2'))
+        self.RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '10'))
+        # Transport REST : connexions persistantes, lectures doublées (0 = jamais), resynchro de l'horloge (s)
+        self.HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '32'))
+        self.HTTP_HEDGE_DELAY = float(os.getenv('HTTP_HEDGE_DELAY', '0.3'))
+        self.TIME_SYNC_INTERVAL = float(os.getenv('TIME_SYNC_INTERVAL', '300'))
+        # Événements d'ordres : 'poll' (défaut), 'stream' (flux utilisateur) ou 'simulated'
+        self.ORDER_EVENTS = os.getenv('ORDER_EVENTS', 'poll')
+        self.RECONCILE_INTERVAL = int(os.getenv('RECONCILE_INTERVAL', '300'))
+        # Flux utilisateur sans aucun message depuis ce délai (s) : retour au polling MONITOR_INTERVAL
+        self.USER_STREAM_MAX_SILENCE = float(os.getenv('USER_STREAM_MAX_SILENCE', '900'))
+        # Planificateur : périodes des tâches (s), gigue maximale (s), ancienneté d'un ordre à remplacer (min)
+        self.MONITOR_INTERVAL = float(os.getenv('MONITOR_INTERVAL', '60'))
+        self.SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', '300'))
+        self.SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', '1'))
+        self.ORDER_EXPIRY_MINUTES = float(os.getenv('ORDER_EXPIRY_MINUTES', '5'))
+        # Vérifications de sortie : 'serial' (défaut) ou 'concurrent' (un symbole par worker)
+        self.MONITOR_MODE = os.getenv('MONITOR_MODE', 'serial')
+        self.MONITOR_WORKERS = int(os.getenv('MONITOR_WORKERS', '100'))
+        self.EXIT_CHECK_TIMEOUT = float(os.getenv('EXIT_CHECK_TIMEOUT', '10'))
+        # Fichier de persistance des positions ('' = en mémoire uniquement)
+        self.POSITION_STORE = os.getenv('POSITION_STORE', 'position.db')
+        # Écritures différées en base (historique, snapshots)
+        self.DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', 'True') == 'True'
+        self.DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', '100'))
+        self.DB_FLUSH_INTERVAL = float(os.getenv('DB_FLUSH_INTERVAL', '0.5'))
+        # Flux SSE du dashboard
+        self.SSE_BUFFER_SIZE = int(os.getenv('SSE_BUFFER_SIZE', '100'))
+        self.SSE_PRICE_INTERVAL = float(os.getenv('SSE_PRICE_INTERVAL', '5'))
+        # Flux SSE simultanés par worker (chacun garde un thread gunicorn gthread)
+        self.SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '8'))
+        # Webhook : 'sync' (défaut) ou 'async' (file bornée + workers)
+        self.WEBHOOK_MODE = os.getenv('WEBHOOK_MODE', 'sync')
+        self.SIGNAL_WORKERS = int(os.getenv('SIGNAL_WORKERS', '4'))
+        self.SIGNAL_QUEUE_SIZE = int(os.getenv('SIGNAL_QUEUE_SIZE', '1000'))
+        # Dédoublonnage des signaux : fenêtre (s), taille maximale, fichier ('' = en mémoire)
+        # Sans signal_id ni horodatage dans l'alerte, une alerte identique répétée dans la fenêtre est ignorée
+        self.SIGNAL_DEDUP_WINDOW = float(os.getenv('SIGNAL_DEDUP_WINDOW', '300'))
+        self.SIGNAL_DEDUP_CAPACITY = int(os.getenv('SIGNAL_DEDUP_CAPACITY', '10000'))
+        self.SIGNAL_DEDUP_FILE = os.getenv('SIGNAL_DEDUP_FILE', '')
+        # Filtres des symboles (exchangeInfo) : snapshot local ('' = pas de fichier) et rafraîchissement (s)
+        self.SYMBOL_RULES_FILE = os.getenv('SYMBOL_RULES_FILE', 'symbol_rules.json')
+        self.SYMBOL_RULES_REFRESH = float(os.getenv('SYMBOL_RULES_REFRESH', '3600'))
+        # Déploiement : 'standalone' (un seul processus), 'engine' (moteur de trading unique)
+        # ou 'web' (workers gunicorn qui lisent l'état publié par le moteur)
+        self.ROLE = os.getenv('ROLE', 'standalone')
+        self.SHARED_STATE = os.getenv('SHARED_STATE', 'shared_state.db')
+        self.SHARED_STATE_POLL = float(os.getenv('SHARED_STATE_POLL', '0.05'))
+        # Workers web : moteur considéré arrêté (health 503) sans heartbeat depuis ce délai (s)
+        self.ENGINE_STALE_AFTER = float(os.getenv('ENGINE_STALE_AFTER', '30'))
         
     def get_start_timestamp(self):
         # Implémentation simplifiée
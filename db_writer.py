@@ -0,0 +1,152 @@
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import event
+
+
+class WriteBehindWriter:
+    """Écritures différées en base : file bornée vidée par lots par un thread
+
+    Chaque élément est une fonction exécutée dans la transaction du lot
+    (par ex. `db.session.add(obj)`), suivie d'un callback optionnel appelé après
+    le commit. Un lot = une transaction. Si la file est pleine, l'écriture est
+    faite directement par l'appelant plutôt que perdue.
+    """
+
+    def __init__(self, app, db, batch_size=100, flush_interval=0.5, maxsize=10000):
+        self.app = app
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.items = queue.Queue(maxsize=maxsize)
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.inline = 0
+        self._thread = None
+        self._inline_lock = threading.RLock()  # un callback peut resoumettre une écriture
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Write-behind DB writer started (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    def add(self, obj, after_commit=None):
+        """Insère un objet du modèle au prochain lot"""
+        def write():
+            self.db.session.add(obj)
+            return obj
+        self.submit(write, after_commit)
+
+    def submit(self, write, after_commit=None):
+        """Exécute `write()` dans la transaction du prochain lot"""
+        item = (write, after_commit)
+        if self._thread is None:
+            self._write_inline(item)
+            return
+        try:
+            self.items.put_nowait(item)
+        except queue.Full:
+            self.logger.error("DB write queue full, writing inline")
+            self.inline += 1
+            self._write_inline(item)
+
+    def flush(self, timeout=None):
+        """Attend que tout ce qui a été soumis soit écrit"""
+        if self._thread is None:
+            return True
+        deadline = time.time() + timeout if timeout else None
+        while self.items.unfinished_tasks:
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=10):
+        """Vide la file avant l'arrêt du processus"""
+        if self._thread is None:
+            return
+        self.items.put((None, None))
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self.logger.info(f"DB writer stopped: {self.written} rows in {self.batches} batches, {self.failed} failed")
+
+    def stats(self):
+        return {
+            'queued': self.items.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'failed': self.failed,
+            'inline': self.inline
+        }
+
+    def _write_inline(self, item):
+        with self._inline_lock, self.app.app_context():
+            self._write_batch([item])
+
+    def _run(self):
+        while True:
+            batch = [self.items.get()]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1][0] is not None:
+                try:
+                    batch.append(self.items.get(timeout=max(0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            stop = batch[-1][0] is None
+            items = [item for item in batch if item[0] is not None]
+            try:
+                if items:
+                    with self.app.app_context():
+                        self._write_batch(items)
+            finally:
+                for _ in batch:
+                    self.items.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, items):
+        session = self.db.session
+        try:
+            results = [write() for write, _ in items]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if len(items) == 1:
+                self.failed += 1
+                self.logger.error(f"DB write failed: {e}")
+                return
+            # Rejouer un par un pour isoler l'élément fautif
+            self.logger.error(f"DB batch of {len(items)} failed ({e}), retrying individually")
+            for item in items:
+                self._write_batch([item])
+            return
+        self.written += len(items)
+        self.batches += 1
+        for (_, after_commit), result in zip(items, results):
+            if after_commit:
+                try:
+                    after_commit(result)
+                except Exception as e:
+                    self.logger.error(f"DB after-commit callback failed: {e}")
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def enable_sqlite_wal(engine):
+    """Active le journal WAL (lectures concurrentes des écritures) sur les connexions SQLite
+
+    Idempotent : create_app() peut être rappelé à chaque requête tant que le schéma n'est pas prêt.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    if not event.contains(engine, 'connect', _set_sqlite_pragma):
+        event.listen(engine, 'connect', _set_sqlite_pragma)
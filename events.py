@@ -0,0 +1,100 @@
+import json
+import logging
+import queue
+import threading
+
+
+class Subscriber:
+    """Abonné au flux d'événements, avec un tampon borné
+
+    Quand le client ne suit pas, son tampon est vidé et remplacé par un
+    événement 'resync' : il recharge alors l'état complet.
+    """
+
+    def __init__(self, maxsize):
+        self.events = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event):
+        try:
+            self.events.put_nowait(event)
+            return
+        except queue.Full:
+            pass
+        while True:
+            try:
+                self.events.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                break
+        try:
+            self.events.put_nowait(('resync', {'dropped': self.dropped}))
+        except queue.Full:
+            pass  # un autre éditeur a déjà rempli le tampon
+
+    def get(self, timeout=None):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventPublisher:
+    """Diffuse les événements du bot à tous les abonnés (SSE du dashboard)"""
+
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self.subscribers = set()
+        self.sinks = []  # callbacks appelés pour chaque événement, même sans abonné
+        self.published = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def subscribe(self):
+        subscriber = Subscriber(self.buffer_size)
+        with self._lock:
+            self.subscribers.add(subscriber)
+        self.logger.info(f"Event subscriber added ({len(self.subscribers)} connected)")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+        self.logger.info(f"Event subscriber removed ({len(self.subscribers)} connected)")
+
+    def add_sink(self, callback):
+        self.sinks.append(callback)
+
+    def subscriber_count(self):
+        return len(self.subscribers)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            subscribers = list(self.subscribers)
+            self.published += 1
+        event = (event_type, data)
+        for subscriber in subscribers:
+            subscriber.put(event)
+        for sink in self.sinks:
+            try:
+                sink(event_type, data)
+            except Exception as e:
+                self.logger.error(f"Event sink failed for {event_type}: {e}")
+
+    def stream(self, keepalive=15):
+        """Générateur SSE pour une réponse Flask ; se désabonne à la déconnexion"""
+        subscriber = self.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                event = subscriber.get(timeout=keepalive)
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield format_sse(*event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def format_sse(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n'
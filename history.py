@@ -0,0 +1,89 @@
+"""Sous-échantillonnage des séries de capital pour le graphique du dashboard"""
+from datetime import datetime, timedelta, timezone
+
+# Résolutions des tables d'agrégats : nom -> (taille du seau en secondes, rétention en jours)
+ROLLUP_RESOLUTIONS = {
+    '5m': (300, 30),
+    '1h': (3600, 365),
+    '1d': (86400, None)
+}
+
+# Les snapshots bruts sont conservés 7 jours
+RAW_RETENTION = timedelta(days=7)
+
+
+def parse_timestamp(value):
+    """ISO 8601 -> datetime UTC naïf (format des colonnes timestamp)"""
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def bucket_start(timestamp, seconds):
+    """Début du seau de `seconds` secondes contenant `timestamp`"""
+    epoch = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % seconds)
+
+
+def choose_resolution(start, end, points, now=None):
+    """Résolution la plus fine qui couvre la plage avec au plus ~4x `points` lignes
+
+    Retourne None pour lire les snapshots bruts (un toutes les 5 minutes).
+    """
+    now = now or datetime.utcnow()
+    span = (end - start).total_seconds()
+    if start >= now - RAW_RETENTION and span / 300 <= points * 4:
+        return None
+    for name, (seconds, retention) in ROLLUP_RESOLUTIONS.items():
+        if retention is not None and start < now - timedelta(days=retention):
+            continue
+        if span / seconds <= points * 4:
+            return name
+    return '1d'
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets : indices des points conservés
+
+    Garde le premier et le dernier point, puis un point par seau : celui qui
+    forme le plus grand triangle avec le point retenu précédent et la moyenne
+    du seau suivant. Préserve les pics et creux bien mieux qu'une moyenne.
+    """
+    import numpy as np  # chargé au premier graphique, pas au démarrage
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+        # Aire (x2) des triangles (précédent, candidat, moyenne du seau suivant)
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(timestamps, equity, net_profit, points):
+    """Applique LTTB sur la courbe de capital ; net_profit suit les mêmes indices"""
+    if not timestamps:
+        return []
+    import numpy as np
+    x = np.array([(t - datetime(1970, 1, 1)).total_seconds() for t in timestamps])
+    index = lttb(x, equity, points)
+    return [{
+        'timestamp': timestamps[i].isoformat(),
+        'equity': equity[i],
+        'net_profit': net_profit[i]
+    } for i in index]
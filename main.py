@@ -1,15 +1,39 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for
-from binance_api import BinanceAPI
+import time
+
+# Début du chargement, pour le rapport de démarrage
+STARTUP_BEGIN = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, render_template, redirect, url_for
+from binance_api import BinanceAPI, RequestScheduler
 from position_manager import PositionManager
+from position_store import PositionStore
+from order_reconciler import OrderReconciler
+from user_stream import ExecutionReportPipeline, create_user_data_source
+from signal_queue import SignalQueue
+from signal_dedup import SignalDeduplicator
+from scheduler import TaskScheduler
+from symbol_monitor import SymbolLocks, SymbolMonitor
+from shared_state import SharedStateStore, SharedStateView, SharedEventFollower
+from symbol_rules import SymbolRulesCache
+from simulated_exchange import SimulatedExchange
+from events import EventPublisher
+from db_writer import WriteBehindWriter, enable_sqlite_wal
+from price_feed import create_price_feed
 from config import Config
+from metrics import registry, timed, function_errors
+from history import ROLLUP_RESOLUTIONS, RAW_RETENTION, bucket_start, choose_resolution, downsample, parse_timestamp
 import threading
-import time
+import atexit
+import signal
+import sys
 import logging
+import re
 import os
 from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 import urllib.parse
+import hashlib
+from collections import OrderedDict
 
 # Configuration du logging
 logging.basicConfig(
@@ -18,6 +42,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Durées de démarrage par étape (ms)
+startup_timings = OrderedDict()
+startup_last = STARTUP_BEGIN
+
+def mark_startup(step):
+    """Enregistre la durée écoulée depuis l'étape précédente"""
+    global startup_last
+    now = time.perf_counter()
+    startup_timings[step] = round((now - startup_last) * 1000, 1)
+    startup_last = now
+
+mark_startup('imports')
+
 # Initialisation de Flask
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
@@ -33,13 +70,27 @@ else:
     logger.info("Using SQLite database")
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Les objets restent lisibles après commit (callbacks de l'écriture différée)
+db = SQLAlchemy(app, session_options={'expire_on_commit': False})
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Flask-Migrate (et alembic) ne sont chargés que pour la CLI `flask db` ou une mise à jour du schéma
+migrate = None
+
+def init_migrations():
+    global migrate
+    if migrate is None:
+        from flask_migrate import Migrate
+        migrate = Migrate(app, db, directory=MIGRATIONS_DIR)
+    return migrate
+
+if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+    init_migrations()
 
 # Modèles de base de données
 class TradingSnapshot(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     equity = db.Column(db.Float)
     net_profit = db.Column(db.Float)
     open_positions = db.Column(db.Integer)
@@ -51,17 +102,75 @@ class TradingSnapshot(db.Model):
 
 class TradeHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     symbol = db.Column(db.String(10))
     side = db.Column(db.String(10))
     quantity = db.Column(db.Float)
     price = db.Column(db.Float)
     status = db.Column(db.String(20))
     
+    __table_args__ = (db.Index('ix_trade_history_symbol_timestamp', 'symbol', 'timestamp'),)
+    
     def __repr__(self):
         return f'<Trade {self.symbol} {self.side} {self.quantity}>'
 
+class SnapshotRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(5))
+    bucket = db.Column(db.DateTime)
+    count = db.Column(db.Integer, default=0)
+    equity_avg = db.Column(db.Float)
+    equity_min = db.Column(db.Float)
+    equity_max = db.Column(db.Float)
+    equity_last = db.Column(db.Float)
+    net_profit_last = db.Column(db.Float)
+    
+    __table_args__ = (db.UniqueConstraint('resolution', 'bucket'),)
+    
+    def __repr__(self):
+        return f'<Rollup {self.resolution} {self.bucket}>'
+
 # Fonctions utilitaires
+def serialize_snapshot(snapshot):
+    return {
+        'equity': snapshot.equity if snapshot else 0,
+        'net_profit': snapshot.net_profit if snapshot else 0,
+        'open_positions': snapshot.open_positions if snapshot else 0,
+        'pending_orders': snapshot.pending_orders if snapshot else 0,
+        'btc_price': snapshot.btc_price if snapshot else 0,
+        'timestamp': snapshot.timestamp.isoformat() if snapshot else ''
+    }
+
+def serialize_trade(trade):
+    return {
+        'id': trade.id,
+        'timestamp': trade.timestamp.isoformat(),
+        'symbol': trade.symbol,
+        'side': trade.side,
+        'quantity': trade.quantity,
+        'price': trade.price,
+        'status': trade.status
+    }
+
+def serialize_positions(prices):
+    return [{
+        'id': position.id,
+        'symbol': symbol,
+        'quantity': position.quantity,
+        'entry_price': position.entry_price,
+        'current_price': prices.get(symbol, 0)
+    } for symbol in position_manager.get_symbols() for position in position_manager.get_positions(symbol)]
+
+def serialize_orders():
+    return [{
+        'id': order['order_id'],
+        'symbol': order['symbol'],
+        'side': order['side'],
+        'quantity': order['quantity'],
+        'price': order['price']
+    } for order in position_manager.get_pending_orders()]
+
+@timed
 def save_snapshot(binance, position_manager):
     """Enregistre un instantané du portefeuille"""
     try:
@@ -69,113 +178,546 @@ def save_snapshot(binance, position_manager):
         equity = binance.get_equity()
         net_profit = binance.get_net_profit()
         btc_price = binance.get_current_price('BTCUSDT')
-        open_positions = len(position_manager.get_positions('BTCUSDT'))
+        open_positions = position_manager.get_position_count('BTCUSDT')
         pending_orders = len(position_manager.get_pending_orders())
         
-        # Utiliser le contexte d'application pour les opérations DB
-        with app.app_context():
-            snapshot = TradingSnapshot(
-                equity=equity,
-                net_profit=net_profit,
-                open_positions=open_positions,
-                pending_orders=pending_orders,
-                btc_price=btc_price
-            )
-            
+        snapshot = TradingSnapshot(
+            timestamp=datetime.utcnow(),
+            equity=equity,
+            net_profit=net_profit,
+            open_positions=open_positions,
+            pending_orders=pending_orders,
+            btc_price=btc_price
+        )
+        
+        def write():
             db.session.add(snapshot)
-            db.session.commit()
-            
-            # Nettoyer les anciens snapshots (garder 7 jours)
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            TradingSnapshot.query.filter(TradingSnapshot.timestamp < week_ago).delete()
-            db.session.commit()
-            
+            update_rollups(snapshot)
+            return snapshot
+        
+        def saved(snapshot):
             logger.info(f"Snapshot saved: equity={equity}, profit={net_profit}")
-            return True
+            event_publisher.publish('snapshot', serialize_snapshot(snapshot))
+        
+        # Écriture différée : la boucle de surveillance n'attend pas le disque
+        db_writer.submit(write, after_commit=saved)
+        
+        # Nettoyage des anciens snapshots et agrégats, au plus une fois par heure
+        global last_retention_time
+        if time.time() - last_retention_time > 3600:
+            last_retention_time = time.time()
+            db_writer.submit(purge_expired_history, after_commit=purged)
+        return True
     except Exception as e:
         logger.error(f"Error saving snapshot: {e}")
-        if 'app.app_context' in locals():
-            db.session.rollback()
+        function_errors('save_snapshot').inc()
         return False
 
+def purge_expired_history():
+    """Supprime un lot de snapshots de plus de 7 jours et les agrégats expirés
+
+    Les lignes expirées sont lues dans l'ordre de l'index sur timestamp puis
+    supprimées par clé primaire : chaque lot est une transaction courte de
+    l'écriture différée, et le lot suivant est resoumis tant qu'il en reste.
+    """
+    week_ago = datetime.utcnow() - RAW_RETENTION
+    expired = [row[0] for row in db.session.query(TradingSnapshot.id).filter(
+        TradingSnapshot.timestamp < week_ago
+    ).order_by(TradingSnapshot.timestamp.asc()).limit(RETENTION_BATCH_SIZE)]
+    if expired:
+        TradingSnapshot.query.filter(TradingSnapshot.id.in_(expired)).delete(synchronize_session=False)
+    for resolution, (seconds, retention) in ROLLUP_RESOLUTIONS.items():
+        if retention is not None:
+            SnapshotRollup.query.filter(
+                SnapshotRollup.resolution == resolution,
+                SnapshotRollup.bucket < datetime.utcnow() - timedelta(days=retention)
+            ).delete()
+    return len(expired)
+
+def purged(count):
+    """Après un lot de rétention : enchaîner le suivant s'il était plein"""
+    if count:
+        logger.info(f"Purged {count} expired snapshots")
+    if count >= RETENTION_BATCH_SIZE:
+        db_writer.submit(purge_expired_history, after_commit=purged)
+
+def update_rollups(snapshot):
+    """Intègre un snapshot dans les agrégats 5m/1h/1d (à appeler dans la transaction)"""
+    equity = snapshot.equity or 0
+    for resolution, (seconds, retention) in ROLLUP_RESOLUTIONS.items():
+        bucket = bucket_start(snapshot.timestamp, seconds)
+        rollup = SnapshotRollup.query.filter_by(resolution=resolution, bucket=bucket).first()
+        if rollup is None:
+            rollup = SnapshotRollup(resolution=resolution, bucket=bucket, count=0, equity_avg=0,
+                                    equity_min=equity, equity_max=equity)
+            db.session.add(rollup)
+        rollup.equity_avg = (rollup.equity_avg * rollup.count + equity) / (rollup.count + 1)
+        rollup.equity_min = min(rollup.equity_min, equity)
+        rollup.equity_max = max(rollup.equity_max, equity)
+        rollup.equity_last = equity
+        rollup.net_profit_last = snapshot.net_profit or 0
+        rollup.count += 1
+
+def get_equity_history(start, end, points):
+    """Série de capital bornée à `points` points (snapshots bruts ou agrégats + LTTB)"""
+    resolution = choose_resolution(start, end, points)
+    if resolution is None:
+        rows = db.session.query(
+            TradingSnapshot.timestamp, TradingSnapshot.equity, TradingSnapshot.net_profit
+        ).filter(
+            TradingSnapshot.timestamp >= start, TradingSnapshot.timestamp <= end
+        ).order_by(TradingSnapshot.timestamp.asc()).all()
+    else:
+        rows = db.session.query(
+            SnapshotRollup.bucket, SnapshotRollup.equity_last, SnapshotRollup.net_profit_last
+        ).filter(
+            SnapshotRollup.resolution == resolution,
+            SnapshotRollup.bucket >= bucket_start(start, ROLLUP_RESOLUTIONS[resolution][0]),
+            SnapshotRollup.bucket <= end
+        ).order_by(SnapshotRollup.bucket.asc()).all()
+    history = downsample(
+        [r[0] for r in rows],
+        [r[1] or 0 for r in rows],
+        [r[2] or 0 for r in rows],
+        points
+    )
+    return resolution or 'raw', history
+
+def executed_trades():
+    """Filtre des transactions réellement exécutées
+
+    Les achats limites sont journalisés 'EXECUTED' au placement puis 'FILLED'
+    à l'exécution ; les ventes au marché ne sont journalisées qu'une fois.
+    """
+    return db.or_(
+        db.and_(TradeHistory.side == 'BUY', TradeHistory.status == 'FILLED'),
+        db.and_(TradeHistory.side == 'SELL', TradeHistory.status == 'EXECUTED')
+    )
+
+def get_trades(symbol=None, start=None, end=None, limit=100):
+    """Transactions les plus récentes d'abord, par symbole (index symbol, timestamp)"""
+    query = TradeHistory.query
+    if symbol:
+        query = query.filter(TradeHistory.symbol == symbol)
+    if start:
+        query = query.filter(TradeHistory.timestamp >= start)
+    if end:
+        query = query.filter(TradeHistory.timestamp <= end)
+    return query.order_by(TradeHistory.timestamp.desc()).limit(limit).all()
+
+def get_daily_pnl(start, end, symbol=None):
+    """Flux réalisés par jour : achats exécutés, ventes, solde net et nombre de transactions"""
+    day = db.func.date(TradeHistory.timestamp)
+    notional = TradeHistory.quantity * TradeHistory.price
+    query = db.session.query(
+        day,
+        db.func.sum(db.case((TradeHistory.side == 'BUY', notional), else_=0)),
+        db.func.sum(db.case((TradeHistory.side == 'SELL', notional), else_=0)),
+        db.func.count(TradeHistory.id)
+    ).filter(
+        TradeHistory.timestamp >= start, TradeHistory.timestamp <= end, executed_trades()
+    )
+    if symbol:
+        query = query.filter(TradeHistory.symbol == symbol)
+    rows = query.group_by(day).order_by(day).all()
+    return [{
+        'date': str(d),
+        'bought': bought or 0,
+        'sold': sold or 0,
+        'net': (sold or 0) - (bought or 0),
+        'trades': count
+    } for d, bought, sold, count in rows]
+
 def log_trade(symbol, side, quantity, price, status):
     """Enregistre une transaction dans l'historique"""
     try:
-        with app.app_context():
-            trade = TradeHistory(
-                symbol=symbol,
-                side=side,
-                quantity=quantity,
-                price=price,
-                status=status
-            )
-            db.session.add(trade)
-            db.session.commit()
+        trade = TradeHistory(
+            timestamp=datetime.utcnow(),
+            symbol=symbol,
+            side=side,
+            quantity=quantity,
+            price=price,
+            status=status
+        )
+        
+        def logged(trade):
             logger.info(f"Trade logged: {symbol} {side} {quantity} @ {price} ({status})")
-            return True
+            event_publisher.publish('trade', serialize_trade(trade))
+        
+        # Écriture différée : le chemin de passage d'ordre n'attend pas le disque
+        db_writer.add(trade, after_commit=logged)
+        return True
     except Exception as e:
         logger.error(f"Error logging trade: {e}")
-        db.session.rollback()
         return False
 
 # Configuration et initialisation du bot
 config = Config()
 
+# Identifiant de démarrage : invalide les curseurs du dashboard d'un processus précédent
+BOOT_ID = int(time.time())
+
 # TEST: Vérifier la configuration
 logger.info(f"Configuration TESTNET: {config.TESTNET}")
 
-try:
-    binance = BinanceAPI(config.API_KEY, config.SECRET_KEY, testnet=config.TESTNET)
-    logger.info(f"Binance API initialized successfully for {'TESTNET' if config.TESTNET else 'MAINNET'}")
-    # CORRECTION : Utiliser binance.api_url au lieu de binance.client.base_url
-    logger.info(f"Binance API URL: {binance.api_url}")
-except Exception as e:
-    logger.error(f"Failed to initialize BinanceAPI: {e}")
-    raise e
+# État partagé entre le moteur (ROLE=engine) et les workers web (ROLE=web)
+shared_state = SharedStateStore(config.SHARED_STATE) if config.ROLE in ('engine', 'web') else None
+
+if config.ROLE == 'web':
+    # Worker web : positions, ordres et prix sont lus dans l'état publié par le moteur,
+    # qui est le seul processus à parler à l'échange
+    user_data_source = None
+    binance = position_manager = SharedStateView(shared_state, refresh_interval=config.SHARED_STATE_POLL)
+    symbol_rules = None
+    logger.info(f"Web worker reading engine state from {config.SHARED_STATE}")
+    mark_startup('shared_state')
+else:
+    # Source d'événements d'ordres (partagée avec l'échange simulé)
+    user_data_source = create_user_data_source(config)
+    
+    try:
+        if config.EXCHANGE == 'simulated':
+            binance = SimulatedExchange.from_config(config, user_stream=user_data_source)
+        else:
+            binance = BinanceAPI(
+                config.API_KEY,
+                config.SECRET_KEY,
+                testnet=config.TESTNET,
+                price_feed=create_price_feed(config),
+                price_max_age=config.PRICE_MAX_AGE,
+                account_ttl=config.ACCOUNT_CACHE_TTL,
+                scheduler=RequestScheduler(
+                    max_weight=config.RATE_LIMIT_WEIGHT,
+                    reserve=config.RATE_LIMIT_RESERVE,
+                    max_wait=config.RATE_LIMIT_MAX_WAIT
+                ),
+                pool_size=config.HTTP_POOL_SIZE,
+                hedge_delay=config.HTTP_HEDGE_DELAY
+            )
+        logger.info(f"Binance API initialized successfully for {'TESTNET' if config.TESTNET else 'MAINNET'}")
+        # CORRECTION : Utiliser binance.api_url au lieu de binance.client.base_url
+        logger.info(f"Binance API URL: {binance.api_url}")
+    except Exception as e:
+        logger.error(f"Failed to initialize BinanceAPI: {e}")
+        raise e
+    mark_startup('exchange')
+    
+    # Filtres des symboles, chargés au premier ordre puis rafraîchis périodiquement
+    symbol_rules = SymbolRulesCache(loader=binance.get_exchange_info, path=config.SYMBOL_RULES_FILE or None,
+                                    refresh_interval=config.SYMBOL_RULES_REFRESH)
+    
+    # Initialisation du PositionManager
+    position_manager = PositionManager(store=PositionStore(config.POSITION_STORE) if config.POSITION_STORE else None)
+    logger.info("PositionManager initialized")
+    mark_startup('positions')
+    atexit.register(position_manager.close)
 
-# Initialisation du PositionManager
-position_manager = PositionManager()
-logger.info("PositionManager initialized")
+# Diffusion des événements au dashboard (SSE)
+event_publisher = EventPublisher(buffer_size=config.SSE_BUFFER_SIZE)
+positions_changed = threading.Event()
+position_manager.add_listener(lambda op, fields: positions_changed.set())
+event_stream_thread = None
+event_stream_lock = threading.Lock()
+order_reconciler = OrderReconciler(binance, position_manager)
+execution_reports = None
+task_scheduler = None
+symbol_locks = SymbolLocks()
+early_reports = OrderedDict()  # order_id: statut reçu avant l'enregistrement de l'ordre
+early_reports_lock = threading.Lock()
+expiring_orders = set()  # ordres échus en attente du prochain lot de vérification
+expiring_orders_lock = threading.Lock()
 
-# Création de la base de données
-with app.app_context():
-    db.create_all()
-    logger.info("Database initialized")
+# Base de données : vérifiée au premier create_app() (ou à la première requête)
+app_ready = False
+app_ready_lock = threading.Lock()
+schema_warned = False
+# Routes qui lisent les tables du bot (historique, P&L)
+DATABASE_ENDPOINTS = {'dashboard_data', 'dashboard_history', 'trades_history', 'daily_pnl'}
+
+def schema_head():
+    """Révision de tête des scripts de migration, lue sans importer alembic"""
+    revisions, parents = set(), set()
+    versions_dir = os.path.join(MIGRATIONS_DIR, 'versions')
+    for name in os.listdir(versions_dir):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(versions_dir, name)) as f:
+            source = f.read()
+        revision = re.search(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", source, re.M)
+        parent = re.search(r"^down_revision\s*=\s*['\"]([^'\"]+)['\"]", source, re.M)
+        if revision:
+            revisions.add(revision.group(1))
+        if parent:
+            parents.add(parent.group(1))
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+def schema_revision():
+    """Révision appliquée à la base (None si la base n'est pas versionnée)"""
+    try:
+        return db.session.execute(db.text('SELECT version_num FROM alembic_version')).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+def init_database():
+    """Active WAL puis migre la base, seulement si sa révision n'est pas la tête des migrations
+
+    Retourne False tant que le schéma n'est pas prêt (worker web démarré avant la migration du moteur).
+    """
+    with app.app_context():
+        enable_sqlite_wal(db.engine)
+        head = schema_head()
+        # Le schéma appartient au moteur : pas de migrations concurrentes depuis les workers web
+        if config.ROLE == 'web':
+            return head is None or schema_revision() == head
+        if head is not None and schema_revision() == head:
+            logger.info(f"Database schema up to date (revision {head})")
+            return True
+        from flask_migrate import upgrade
+        init_migrations()
+        upgrade()
+        logger.info("Database initialized")
+        return True
+
+def create_app():
+    """Fabrique WSGI : termine le démarrage une seule fois et rapporte sa durée
+
+    L'import de ce module ne touche ni au réseau ni au schéma ; le client de
+    l'échange est créé au premier appel et la base vérifiée ici.
+    """
+    global app_ready, schema_warned
+    if app_ready:
+        return app
+    with app_ready_lock:
+        if not app_ready:
+            if not init_database():
+                # Revérifié à la prochaine requête ; les routes qui lisent la base répondent 503 d'ici là
+                if not schema_warned:
+                    logger.warning("Database schema not migrated yet, waiting for the engine")
+                    schema_warned = True
+                return app
+            mark_startup('schema')
+            app_ready = True
+            steps = ', '.join(f'{step} {duration:.0f}' for step, duration in startup_timings.items())
+            logger.info(f"Startup completed in {sum(startup_timings.values()):.0f} ms ({steps})")
+    return app
+
+# Écritures différées (historique des transactions et snapshots)
+db_writer = WriteBehindWriter(app, db, batch_size=config.DB_BATCH_SIZE, flush_interval=config.DB_FLUSH_INTERVAL)
+if config.DB_WRITE_BEHIND:
+    db_writer.start()
+    atexit.register(db_writer.close)
+last_retention_time = 0
+RETENTION_BATCH_SIZE = 5000
+SHARED_HEARTBEAT_INTERVAL = 5
 
 # Démarrer les tâches périodiques
+def start_order_events():
+    """Démarre le flux d'exécution des ordres si une source est configurée"""
+    global execution_reports
+    if user_data_source is None:
+        return None
+    execution_reports = ExecutionReportPipeline(user_data_source, handle_execution_report,
+                                                max_silence=config.USER_STREAM_MAX_SILENCE)
+    execution_reports.start()
+    return execution_reports
+
+def start_event_stream():
+    """Thread unique qui pousse positions/ordres (regroupés) et prix aux abonnés SSE"""
+    global event_stream_thread
+    with event_stream_lock:
+        if event_stream_thread is not None:
+            return
+        if config.ROLE == 'web':
+            # Worker web : relayer les événements du moteur plutôt que les produire
+            follower = SharedEventFollower(shared_state, event_publisher, interval=config.SHARED_STATE_POLL * 2)
+            event_stream_thread = follower.start()
+            return
+        event_stream_thread = threading.Thread(target=publish_events, daemon=True)
+        event_stream_thread.start()
+    logger.info("Event stream publisher started")
+
+def publish_events():
+    """Boucle du publieur : les prix ne sont lus qu'une fois, quel que soit le nombre d'abonnés"""
+    last_prices_time = 0
+    while True:
+        try:
+            changed = positions_changed.wait(timeout=config.SSE_PRICE_INTERVAL)
+            if changed:
+                positions_changed.clear()
+            if not event_publisher.subscriber_count() and not event_publisher.sinks:
+                continue
+            if changed:
+                # Regrouper les mutations en rafale
+                time.sleep(0.2)
+            if changed or time.time() - last_prices_time >= config.SSE_PRICE_INTERVAL:
+                version = position_manager.version
+                prices = {symbol: binance.get_current_price(symbol) for symbol in position_manager.get_symbols()}
+                last_prices_time = time.time()
+                if changed:
+                    event_publisher.publish('positions', {
+                        'version': version,
+                        'positions': serialize_positions(prices),
+                        'orders': serialize_orders(),
+                        'prices': prices
+                    })
+                else:
+                    event_publisher.publish('prices', prices)
+        except Exception as e:
+            logger.error(f"Event stream error: {e}")
+            time.sleep(1)
+
+def share_event(event_type, data):
+    """Moteur : journalise l'événement pour les workers web et publie l'état courant"""
+    shared_state.append_event(event_type, data)
+    if event_type in ('positions', 'prices'):
+        shared_state.put_state(event_type, data)
+
+def share_engine_state():
+    """Moteur : battement de cœur et purge du journal et des signaux traités"""
+    shared_state.put_state('engine', {'boot': BOOT_ID, 'pid': os.getpid(), 'heartbeat': time.time()})
+    shared_state.trim_events()
+    shared_state.prune_signals(config.SIGNAL_DEDUP_WINDOW)
+
+def start_engine_sharing():
+    """Moteur : publie état et événements, et traite les signaux déposés par les workers web"""
+    event_publisher.add_sink(share_event)
+    positions_changed.set()  # publier l'état initial sans attendre une mutation
+    start_event_stream()
+    shared_state.requeue_processing()
+    threading.Thread(target=consume_shared_signals, name='shared-signals', daemon=True).start()
+    logger.info(f"Engine sharing state through {config.SHARED_STATE}")
+
+def consume_shared_signals():
+    """Moteur : transfère les signaux de la boîte partagée vers la file de traitement"""
+    while True:
+        try:
+            signals = shared_state.claim_signals()
+            for signal_id, symbol, data, received_at in signals:
+                # Horodatage epoch du worker web -> horloge de latence locale
+                received = time.perf_counter() - (time.time() - received_at)
+                if not signal_queue.submit(symbol, (data, received, signal_id)):
+                    shared_state.release_signal(signal_id)
+                    logger.error(f"Signal queue full, dropped shared signal {signal_id[:12]} for {symbol}")
+            if not signals:
+                time.sleep(config.SHARED_STATE_POLL)
+        except Exception as e:
+            logger.error(f"Shared signal consumer error: {e}")
+            time.sleep(1)
+
 def start_periodic_tasks():
-    last_snapshot_time = 0
+    """Planifie sorties, réconciliation, snapshots et l'échéance de chaque ordre en attente"""
+    global task_scheduler
+    task_scheduler = TaskScheduler()
     
-    def monitor_targets():
-        nonlocal last_snapshot_time
-        while True:
-            try:
-                # Utiliser le contexte d'application pour les opérations DB
-                with app.app_context():
-                    check_exit_conditions()
-                    monitor_pending_orders()
-                    position_manager.sync_with_exchange(binance)
-                
-                # Sauvegarder un snapshot toutes les 5 minutes
-                current_time = time.time()
-                if current_time - last_snapshot_time > 300:  # 5 minutes
-                    save_snapshot(binance, position_manager)
-                    last_snapshot_time = current_time
-            except Exception as e:
-                logger.error(f"Periodic task error: {e}")
-            time.sleep(60)
+    def exit_checks():
+        with app.app_context():
+            check_exit_conditions()
+    
+    def reconcile():
+        with app.app_context():
+            monitor_pending_orders()
+            position_manager.sync_with_exchange(binance)
     
-    thread = threading.Thread(target=monitor_targets, daemon=True)
-    thread.start()
+    def reconcile_interval():
+        # Avec le flux d'exécution actif, le polling n'est plus qu'un filet de sécurité
+        if execution_reports and execution_reports.is_alive():
+            return config.RECONCILE_INTERVAL
+        return config.MONITOR_INTERVAL
+    
+    jitter = config.SCHEDULER_JITTER
+    task_scheduler.every('exit_checks', config.MONITOR_INTERVAL, exit_checks, jitter=jitter)
+    task_scheduler.every('reconcile', reconcile_interval, reconcile, jitter=jitter)
+    task_scheduler.every('snapshot', config.SNAPSHOT_INTERVAL, lambda: save_snapshot(binance, position_manager),
+                         jitter=jitter)
+    # Premier chargement au premier ordre ; ensuite rafraîchissement en arrière-plan
+    task_scheduler.every('symbol_rules', config.SYMBOL_RULES_REFRESH, symbol_rules.refresh, jitter=jitter,
+                         delay=config.SYMBOL_RULES_REFRESH)
+    # Écart d'horloge avec le serveur (mesuré une première fois à la création du client)
+    if hasattr(binance, 'sync_time'):
+        task_scheduler.every('server_time', config.TIME_SYNC_INTERVAL, binance.sync_time, jitter=jitter,
+                             delay=config.TIME_SYNC_INTERVAL)
+    if shared_state:
+        task_scheduler.every('shared_state', SHARED_HEARTBEAT_INTERVAL, share_engine_state)
+    
+    # Une minuterie par ordre en attente, posée à l'ajout et retirée à la sortie
+    position_manager.add_listener(on_pending_order_change)
+    for order in position_manager.get_pending_orders():
+        schedule_order_expiry(order['order_id'])
+    task_scheduler.start()
     logger.info("Periodic tasks started")
 
-def place_order(symbol, side, quantity, price, order_type='LIMIT'):
-    """Wrapper pour placer des ordres et logger les transactions"""
+def on_pending_order_change(op, fields):
+    if op == 'add_order':
+        schedule_order_expiry(fields['order']['order_id'])
+    elif op == 'remove_order':
+        task_scheduler.cancel(('expire', fields['order_id']))
+
+def schedule_order_expiry(order_id, deadline=None):
+    if deadline is None:
+        deadline = position_manager.order_expiry(order_id, config.ORDER_EXPIRY_MINUTES)
+        if deadline is None:
+            return
+    task_scheduler.call_at(deadline, lambda: expire_order(order_id), key=('expire', order_id))
+
+def expire_order(order_id):
+    """Échéance d'un ordre en attente : vérifié avec les autres ordres échus au même instant"""
+    expiry = position_manager.order_expiry(order_id, config.ORDER_EXPIRY_MINUTES)
+    if expiry is None:
+        return  # rempli ou annulé entre-temps
+    if time.time() < expiry:
+        schedule_order_expiry(order_id, expiry)
+        return
+    with expiring_orders_lock:
+        expiring_orders.add(order_id)
+    # Clé unique : le lot part après les autres échéances déjà dues du planificateur
+    task_scheduler.call_at(time.time(), expire_due_orders, key='expire_batch')
+
+def expire_due_orders():
+    """Un seul get_open_orders pour tous les ordres échus ; ceux encore ouverts sont remplacés"""
+    with expiring_orders_lock:
+        order_ids = list(expiring_orders)
+        expiring_orders.clear()
+    orders = [order for order in map(position_manager.pending_orders.get, order_ids) if order is not None]
+    if not orders:
+        return
+    with app.app_context():
+        try:
+            result = order_reconciler.reconcile(orders)
+            apply_reconciliation(result)
+            for order, exchange_order in result.open:
+                if exchange_order.get('status') == 'NEW':
+                    with symbol_locks.get(order['symbol']):
+                        replace_stale_order(order)
+        except Exception as e:
+            logger.error(f"Error in order expiry: {e}")
+    for order in orders:
+        if order['order_id'] in position_manager.pending_orders:
+            # Annulation refusée, exécution partielle ou statut inconnu : nouvel essai plus tard
+            schedule_order_expiry(order['order_id'], time.time() + config.MONITOR_INTERVAL)
+
+@timed
+def place_order(symbol, side, quantity, price, order_type='LIMIT', client_order_id=None):
+    """Wrapper pour placer des ordres et logger les transactions
+
+    L'ordre est aligné sur les filtres du symbole et refusé localement s'il
+    les enfreint encore : ni aller-retour ni poids consommé pour un rejet.
+    """
     try:
+        quantity, price = normalize_order(symbol, side, quantity, price, order_type)
+        rules = symbol_rules.get(symbol)
+        reason = rules.check(quantity, price, order_type) if rules else None
+        if reason:
+            logger.warning(f"Order rejected locally by {reason}: {symbol} {side} {quantity} @ {price}")
+            registry.counter('bot_orders_rejected_locally_total', 'Ordres refusés par les filtres du symbole',
+                             reason=reason).inc()
+            return None
+        
         if order_type == 'LIMIT':
-            order = binance.place_limit_order(symbol, side, quantity, price)
+            order = binance.place_limit_order(symbol, side, quantity, price, client_order_id=client_order_id)
         else:
-            order = binance.place_market_order(symbol, side, quantity)
+            order = binance.place_market_order(symbol, side, quantity, client_order_id=client_order_id)
         
         if order:
             log_trade(symbol, side, quantity, price, 'EXECUTED')
@@ -183,101 +725,204 @@ def place_order(symbol, side, quantity, price, order_type='LIMIT'):
     except Exception as e:
         logger.error(f"Order placement failed: {e}")
         log_trade(symbol, side, quantity, price, 'FAILED')
+    function_errors('place_order').inc()
     return None
 
+def normalize_order(symbol, side, quantity, price, order_type='LIMIT'):
+    """Quantité au pas du lot et prix au tick du symbole (inchangés sans règles connues)"""
+    rules = symbol_rules.get(symbol)
+    if rules is None:
+        return quantity, price
+    return rules.normalize(side, quantity, price, order_type)
+
+@timed
 def check_exit_conditions():
     """Vérifier les conditions de sortie selon la stratégie TradingView"""
-    for symbol in position_manager.get_symbols():
-        try:
-            positions = position_manager.get_positions(symbol)
-            if not positions:
-                continue
-                
-            current_price = binance.get_current_price(symbol)
-            unrealized_profit = position_manager.get_unrealized_profit(symbol, current_price)
-            avg_price = position_manager.calculate_avg_price(symbol)
-            profit_target = avg_price * (1 + config.PROFIT_PERCENT / 100)
-            
-            logger.info(f"Exit check for {symbol}: "
-                        f"Current: {current_price}, Target: {profit_target}, "
-                        f"Unrealized P&L: {unrealized_profit}")
+    symbols = [symbol for symbol in position_manager.get_symbols() if position_manager.get_position_count(symbol)]
+    if symbol_monitor:
+        # Mode concurrent : un symbole par worker, résultats attendus avec délai
+        symbol_monitor.run(symbols)
+        return
+    for symbol in symbols:
+        with symbol_locks.get(symbol):
+            check_symbol_exit(symbol)
+
+def check_symbol_exit(symbol):
+    """Sortie d'un symbole (à appeler sous son verrou)"""
+    try:
+        if not position_manager.get_position_count(symbol):
+            return
+        
+        current_price = binance.get_current_price(symbol)
+        unrealized_profit = position_manager.get_unrealized_profit(symbol, current_price)
+        avg_price = position_manager.calculate_avg_price(symbol)
+        profit_target = avg_price * (1 + config.PROFIT_PERCENT / 100)
+        
+        logger.info(f"Exit check for {symbol}: "
+                    f"Current: {current_price}, Target: {profit_target}, "
+                    f"Unrealized P&L: {unrealized_profit}")
+        
+        # Condition exacte de TradingView
+        if unrealized_profit > 0 and current_price >= profit_target:
+            total_quantity = position_manager.get_total_quantity(symbol)
+            order = place_order(
+                symbol=symbol,
+                side='SELL',
+                quantity=total_quantity,
+                price=current_price,
+                order_type='MARKET'
+            )
             
-            # Condition exacte de TradingView
-            if unrealized_profit > 0 and current_price >= profit_target:
-                total_quantity = sum(p['quantity'] for p in positions)
-                order = place_order(
-                    symbol=symbol,
-                    side='SELL',
-                    quantity=total_quantity,
-                    price=current_price,
-                    order_type='MARKET'
-                )
-                
-                if order:
-                    logger.info(f"Closed all positions for {symbol} at market price")
-                    position_manager.remove_all_positions(symbol)
-        except Exception as e:
-            logger.error(f"Error in exit check for {symbol}: {e}")
+            if order:
+                logger.info(f"Closed all positions for {symbol} at market price")
+                position_manager.remove_all_positions(symbol)
+    except Exception as e:
+        logger.error(f"Error in exit check for {symbol}: {e}")
 
+@timed
 def monitor_pending_orders():
     """Vérifier et mettre à jour les ordres en attente"""
     try:
-        orders = position_manager.get_pending_orders()
-        logger.info(f"Monitoring {len(orders)} pending orders")
+        result = order_reconciler.reconcile()
+        apply_reconciliation(result)
         
-        for order in orders:
-            symbol = order['symbol']
-            order_id = order['order_id']
-            status = binance.get_order_status(symbol, order_id)
-            logger.info(f"Order {order_id} status: {status}")
-            
-            if status == 'FILLED':
-                position_manager.add_position(
-                    symbol=symbol,
-                    entry_price=order['price'],
-                    quantity=order['quantity'],
-                    order_id=order_id
-                )
-                position_manager.remove_pending_order(order_id)
-                log_trade(symbol, order['side'], order['quantity'], order['price'], 'FILLED')
-            elif status in ['CANCELED', 'EXPIRED']:
-                position_manager.remove_pending_order(order_id)
-                log_trade(symbol, order['side'], order['quantity'], order['price'], status)
-            elif status == 'NEW' and position_manager.is_order_old(order_id, minutes=5):
-                binance.cancel_order(symbol, order_id)
-                position_manager.remove_pending_order(order_id)
-                log_trade(symbol, order['side'], order['quantity'], order['price'], 'CANCELED')
-                
-                # Recalculer le nouveau prix d'entrée
-                last_entry = position_manager.get_last_entry_price(symbol) or binance.get_current_price(symbol)
-                new_price = last_entry * (1 - config.BELOW_PERCENT / 100) * 0.998
-                
-                quantity = calculate_quantity(
-                    price=new_price,
-                    order_value=config.ORDER_VALUE,
-                    min_movement=config.MIN_MOVEMENT,
-                    decimals=config.ROUNDING
-                )
-                
-                # Replacer l'ordre
-                new_order = place_order(
-                    symbol=symbol,
-                    side='BUY',
-                    quantity=quantity,
-                    price=new_price
-                )
-                
-                if new_order:
-                    position_manager.add_pending_order(
-                        symbol=symbol,
-                        order_id=new_order['orderId'],
-                        side='BUY',
-                        price=new_price,
-                        quantity=quantity
-                    )
+        for order, exchange_order in result.open:
+            if exchange_order.get('status') == 'NEW' and position_manager.is_order_old(
+                    order['order_id'], minutes=config.ORDER_EXPIRY_MINUTES):
+                with symbol_locks.get(order['symbol']):
+                    replace_stale_order(order)
     except Exception as e:
         logger.error(f"Error in order monitoring: {e}")
 
+def apply_reconciliation(result):
+    """Applique les ordres remplis, annulés ou expirés d'un cycle de réconciliation"""
+    if result.filled:
+        binance.invalidate_account()
+    for order in result.filled:
+        apply_order_filled(order['order_id'])
+    for order in result.canceled:
+        apply_order_closed(order['order_id'], 'CANCELED')
+    for order in result.expired:
+        apply_order_closed(order['order_id'], 'EXPIRED')
+
+def apply_order_filled(order_id):
+    """Transforme un ordre en attente rempli en position (une seule fois par ordre)"""
+    order = position_manager.pending_orders.get(order_id)
+    if order is None:
+        return False
+    with symbol_locks.get(order['symbol']):
+        order = position_manager.pop_pending_order(order_id)
+        if order is None:
+            return False
+        position_manager.add_position(
+            symbol=order['symbol'],
+            entry_price=order['price'],
+            quantity=order['quantity'],
+            order_id=order_id
+        )
+    log_trade(order['symbol'], order['side'], order['quantity'], order['price'], 'FILLED')
+    return True
+
+def apply_order_closed(order_id, status):
+    """Retire un ordre en attente annulé ou expiré"""
+    order = position_manager.pending_orders.get(order_id)
+    if order is None:
+        return False
+    with symbol_locks.get(order['symbol']):
+        order = position_manager.pop_pending_order(order_id)
+    if order is None:
+        return False
+    log_trade(order['symbol'], order['side'], order['quantity'], order['price'], status)
+    return True
+
+def handle_execution_report(order_id, status, event):
+    """Applique un executionReport du flux utilisateur dès sa réception"""
+    if status == 'FILLED':
+        binance.invalidate_account()
+    with early_reports_lock:
+        if order_id not in position_manager.pending_orders:
+            # L'événement peut précéder l'enregistrement de l'ordre (exécution immédiate)
+            if status in ('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH'):
+                early_reports[order_id] = status
+                while len(early_reports) > 1000:
+                    early_reports.popitem(last=False)
+            return
+    apply_execution_status(order_id, status)
+
+def apply_execution_status(order_id, status):
+    if status == 'FILLED':
+        if apply_order_filled(order_id):
+            logger.info(f"Order {order_id} filled (user data stream)")
+    elif status in ('CANCELED', 'REJECTED'):
+        apply_order_closed(order_id, 'CANCELED')
+    elif status in ('EXPIRED', 'EXPIRED_IN_MATCH'):
+        apply_order_closed(order_id, 'EXPIRED')
+
+def track_pending_order(symbol, order_id, side, price, quantity):
+    """Enregistre un ordre placé et applique un événement arrivé avant lui"""
+    with early_reports_lock:
+        position_manager.add_pending_order(
+            symbol=symbol,
+            order_id=order_id,
+            side=side,
+            price=price,
+            quantity=quantity
+        )
+        status = early_reports.pop(order_id, None)
+    if status:
+        apply_execution_status(order_id, status)
+
+def replace_stale_order(order):
+    """Annule un ordre d'achat trop ancien et le replace sous le dernier prix d'entrée (sous le verrou du symbole)"""
+    symbol = order['symbol']
+    order_id = order['order_id']
+    
+    # Réserver l'ordre avant l'annulation : l'événement CANCELED du flux sera ignoré
+    order = position_manager.pop_pending_order(order_id)
+    if order is None:
+        return
+    if not binance.cancel_order(symbol, order_id):
+        # Probablement rempli entre-temps : un événement reçu pendant la réservation
+        # a été mis de côté comme pour un ordre pas encore enregistré
+        with early_reports_lock:
+            position_manager.restore_pending_order(order)
+            status = early_reports.pop(order_id, None)
+        if status:
+            apply_execution_status(order_id, status)
+        return
+    with early_reports_lock:
+        early_reports.pop(order_id, None)  # notre propre CANCELED
+    log_trade(symbol, order['side'], order['quantity'], order['price'], 'CANCELED')
+    
+    # Recalculer le nouveau prix d'entrée
+    last_entry = position_manager.get_last_entry_price(symbol) or binance.get_current_price(symbol)
+    new_price = last_entry * (1 - config.BELOW_PERCENT / 100) * 0.998
+    
+    quantity = calculate_quantity(
+        price=new_price,
+        order_value=config.ORDER_VALUE,
+        min_movement=config.MIN_MOVEMENT,
+        decimals=config.ROUNDING
+    )
+    quantity, new_price = normalize_order(symbol, 'BUY', quantity, new_price)
+    
+    # Replacer l'ordre
+    new_order = place_order(
+        symbol=symbol,
+        side='BUY',
+        quantity=quantity,
+        price=new_price
+    )
+    
+    if new_order:
+        track_pending_order(
+            symbol=symbol,
+            order_id=new_order['orderId'],
+            side='BUY',
+            price=new_price,
+            quantity=quantity
+        )
+
 def calculate_quantity(price, order_value, min_movement, decimals):
     """Calcule la quantité selon les règles de la stratégie"""
     try:
@@ -305,7 +950,7 @@ def can_open_new_position(symbol):
     """Vérifie si on peut ouvrir une nouvelle position"""
     try:
         pir = calculate_pir(symbol)
-        current_orders = len(position_manager.get_positions(symbol))
+        current_orders = position_manager.get_position_count(symbol)
         max_orders = min(pir, config.MAX_ORDERS)
         
         logger.info(f"Can open new position for {symbol}: "
@@ -335,6 +980,160 @@ def is_in_trading_window():
         logger.error(f"Error in is_in_trading_window: {e}")
         return False
 
+@timed
+def process_signal(data, signal_id=None):
+    """Exécute un signal webhook sous le verrou de son symbole (partagé avec les sorties)"""
+    symbol = data.get('symbol', 'UNKNOWN').upper()
+    client_order_id = SignalDeduplicator.client_order_id(signal_id) if signal_id else None
+    with symbol_locks.get(symbol):
+        return execute_signal(symbol, data.get('action'), data, client_order_id)
+
+def execute_signal(symbol, action, data, client_order_id=None):
+    """Exécute un signal webhook (achat en DCA ou vente de toutes les positions)"""
+    # Traitement des signaux d'achat
+    if action == 'buy' and is_in_trading_window():
+        signal_price = float(data['price'])
+        last_entry = position_manager.get_last_entry_price(symbol)
+        
+        # Calcul du prochain prix d'entrée
+        next_price = last_entry * (1 - config.BELOW_PERCENT / 100) if last_entry else signal_price
+        
+        can_open = can_open_new_position(symbol)
+        logger.info(f"Buy signal conditions: "
+                   f"Signal price: {signal_price}, "
+                   f"Next entry: {next_price}, "
+                   f"Can open: {can_open}")
+        
+        # Condition exacte de TradingView
+        if signal_price <= next_price and can_open:
+            quantity = calculate_quantity(
+                price=next_price,
+                order_value=config.ORDER_VALUE,
+                min_movement=config.MIN_MOVEMENT,
+                decimals=config.ROUNDING
+            )
+            quantity, next_price = normalize_order(symbol, 'BUY', quantity, next_price)
+            
+            # Valider et placer l'ordre
+            order = place_order(
+                symbol=symbol,
+                side='BUY',
+                quantity=quantity,
+                price=next_price,
+                client_order_id=client_order_id
+            )
+            
+            if order:
+                logger.info(f"Buy order placed: {order}")
+                track_pending_order(
+                    symbol=symbol,
+                    order_id=order['orderId'],
+                    side='BUY',
+                    price=next_price,
+                    quantity=quantity
+                )
+                return {"status": "success", "order_id": order['orderId']}
+    
+    # Traitement des signaux de vente
+    elif action == 'sell':
+        if position_manager.get_position_count(symbol):
+            current_price = binance.get_current_price(symbol)
+            unrealized_profit = position_manager.get_unrealized_profit(symbol, current_price)
+            
+            # Condition exacte de TradingView
+            if unrealized_profit > 0:
+                total_quantity = position_manager.get_total_quantity(symbol)
+                order = place_order(
+                    symbol=symbol,
+                    side='SELL',
+                    quantity=total_quantity,
+                    price=current_price,
+                    order_type='MARKET',
+                    client_order_id=client_order_id
+                )
+                
+                if order:
+                    logger.info(f"Sold all positions via webhook: {order}")
+                    position_manager.remove_all_positions(symbol)
+                    return {"status": "sold", "quantity": total_quantity}
+        else:
+            logger.info(f"No positions to sell for {symbol}")
+    
+    return {"status": "ignored"}
+
+def record_signal_latency(result, received, mode):
+    """Délai entre la réception du webhook et l'ordre passé"""
+    if result.get('status') in ('success', 'sold'):
+        registry.histogram('bot_signal_to_order_seconds', 'Délai entre réception du signal et ordre passé',
+                           mode=mode).observe(time.perf_counter() - received)
+
+def process_queued_signal(item):
+    """Traitement d'un signal par un worker de la file (mode asynchrone)"""
+    data, received, signal_id = item
+    try:
+        with app.app_context():
+            result = process_signal(data, signal_id)
+    except Exception:
+        signal_dedup.release(signal_id)
+        if shared_state:
+            shared_state.release_signal(signal_id)
+        raise
+    signal_dedup.complete(signal_id, result)
+    if shared_state:
+        shared_state.complete_signal(signal_id, result)
+    record_signal_latency(result, received, 'async')
+    logger.info(f"Queued {data.get('action')} signal for {data.get('symbol')} processed: {result}")
+
+# File de signaux webhook (mode asynchrone)
+# Vérifications de sortie concurrentes (verrous par symbole partagés avec le webhook)
+symbol_monitor = None
+if config.MONITOR_MODE == 'concurrent':
+    symbol_monitor = SymbolMonitor(check_symbol_exit, symbol_locks, workers=config.MONITOR_WORKERS,
+                                   timeout=config.EXIT_CHECK_TIMEOUT)
+
+# Index des signaux récents (retries et alertes en double)
+signal_dedup = SignalDeduplicator(window=config.SIGNAL_DEDUP_WINDOW, capacity=config.SIGNAL_DEDUP_CAPACITY,
+                                  path=config.SIGNAL_DEDUP_FILE or None)
+atexit.register(signal_dedup.close)
+duplicate_signals = registry.counter('bot_signal_duplicates_total', 'Signaux webhook ignorés car déjà reçus')
+
+signal_queue = None
+if config.WEBHOOK_MODE == 'async' or config.ROLE == 'engine':
+    signal_queue = SignalQueue(process_queued_signal, workers=config.SIGNAL_WORKERS, maxsize=config.SIGNAL_QUEUE_SIZE)
+    signal_queue.start()
+
+# Latence et erreurs par route
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if not app_ready:
+        # Application importée sans passer par create_app(), ou schéma pas encore migré par le moteur
+        create_app()
+        if not app_ready and request.endpoint in DATABASE_ENDPOINTS:
+            return jsonify({"status": "error", "message": "Database schema not ready"}), 503
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None and request.endpoint:
+        registry.histogram('bot_http_request_duration_seconds', 'Durée des requêtes HTTP par route',
+                           endpoint=request.endpoint).observe(time.perf_counter() - start)
+        if response.status_code >= 500:
+            registry.counter('bot_http_errors_total', 'Réponses HTTP 5xx par route', endpoint=request.endpoint).inc()
+    return response
+
+# Jauges lues à l'export
+registry.gauge('bot_open_positions', 'Positions ouvertes', lambda: sum(
+    position_manager.get_position_count(symbol) for symbol in position_manager.get_symbols()))
+registry.gauge('bot_pending_orders', 'Ordres en attente', lambda: len(position_manager.get_pending_orders()))
+registry.gauge('bot_db_write_queue', 'Écritures en attente en base', lambda: db_writer.items.qsize())
+registry.gauge('bot_sse_subscribers', 'Clients SSE connectés', event_publisher.subscriber_count)
+if signal_queue:
+    registry.gauge('bot_signal_queue_depth', 'Signaux en attente de traitement', signal_queue.depth)
+if getattr(binance, 'scheduler', None):
+    registry.gauge('bot_exchange_weight_used', 'Poids REST consommé sur la fenêtre glissante',
+                   lambda: binance.scheduler.stats()['window_weight'])
+
 # Routes
 @app.route('/')
 def home():
@@ -344,80 +1143,182 @@ def home():
 def dashboard():
     return render_template('dashboard.html')
 
+# Transactions et points de courbe par réponse du dashboard ; un delta plus long est remplacé par une réponse complète
+DASHBOARD_TRADES = 50
+DASHBOARD_HISTORY = 300
+
 @app.route('/api/dashboard/data')
 def dashboard_data():
+    """Données du dashboard ; avec ?since=<curseur> seules les nouveautés sont renvoyées
+
+    Le curseur identifie le dernier snapshot, la dernière transaction et l'état
+    des positions/ordres déjà reçus. L'ETag couvre curseur et prix courants :
+    un client à jour reçoit 304 sans corps.
+    """
     try:
         # Utiliser le contexte d'application pour toutes les opérations DB
         with app.app_context():
-            # Dernier snapshot
-            snapshot = TradingSnapshot.query.order_by(TradingSnapshot.timestamp.desc()).first()
+            last_snapshot_id = db.session.query(db.func.max(TradingSnapshot.id)).scalar() or 0
+            last_trade_id = db.session.query(db.func.max(TradeHistory.id)).scalar() or 0
+            cursor = f'{current_boot_id()}.{last_snapshot_id}.{last_trade_id}.{position_manager.version}'
             
-            # Positions ouvertes
-            positions = []
-            for symbol in position_manager.get_symbols():
-                symbol_positions = position_manager.get_positions(symbol)
-                if symbol_positions:
-                    current_price = binance.get_current_price(symbol)
-                    for position in symbol_positions:
-                        positions.append({
-                            'symbol': symbol,
-                            'quantity': position['quantity'],
-                            'entry_price': position['entry_price'],
-                            'current_price': current_price
-                        })
+            # Prix courants des symboles détenus (un seul appel par symbole)
+            prices = {symbol: binance.get_current_price(symbol) for symbol in position_manager.get_symbols()}
             
-            # Ordres en attente
-            orders = []
-            for order in position_manager.get_pending_orders():
-                orders.append({
-                    'symbol': order['symbol'],
-                    'side': order['side'],
-                    'quantity': order['quantity'],
-                    'price': order['price']
-                })
+            etag = hashlib.md5(f'{cursor}{sorted(prices.items())}'.encode()).hexdigest()
+            if etag in request.if_none_match:
+                return Response(status=304, headers={'ETag': f'"{etag}"'})
             
-            # Historique des transactions (7 derniers jours)
-            trades = TradeHistory.query.filter(
-                TradeHistory.timestamp > datetime.utcnow() - timedelta(days=7)
-            ).order_by(TradeHistory.timestamp.desc()).limit(50).all()
+            since = parse_cursor(request.args.get('since'))
+            if since is not None:
+                new_trades = TradeHistory.query.filter(
+                    TradeHistory.timestamp > datetime.utcnow() - timedelta(days=7),
+                    TradeHistory.id > since['trade']
+                ).order_by(TradeHistory.timestamp.desc()).limit(DASHBOARD_TRADES + 1).all()
+                new_snapshots = db.session.query(
+                    TradingSnapshot.timestamp, TradingSnapshot.equity, TradingSnapshot.net_profit
+                ).filter(TradingSnapshot.id > since['snapshot']).order_by(
+                    TradingSnapshot.id.asc()).limit(DASHBOARD_HISTORY + 1).all()
+                if len(new_trades) > DASHBOARD_TRADES or len(new_snapshots) > DASHBOARD_HISTORY:
+                    # Client trop en retard : un delta tronqué laisserait un trou derrière le curseur
+                    since = None
             
-            # Historique des performances (7 derniers jours)
-            history = TradingSnapshot.query.filter(
-                TradingSnapshot.timestamp > datetime.utcnow() - timedelta(days=7)
-            ).order_by(TradingSnapshot.timestamp.asc()).all()
+            # Dernier snapshot
+            snapshot = db.session.get(TradingSnapshot, last_snapshot_id) if last_snapshot_id else None
+            
+            payload = {
+                'cursor': cursor,
+                'delta': since is not None,
+                'snapshot': serialize_snapshot(snapshot),
+                'prices': prices,
+                'positions': None,
+                'orders': None
+            }
+            
+            # Positions et ordres : seulement s'ils ont changé depuis le curseur
+            if since is None or since['version'] != position_manager.version:
+                payload['positions'] = serialize_positions(prices)
+                payload['orders'] = serialize_orders()
+            
+            # Historique des transactions (7 derniers jours, ou nouvelles depuis le curseur)
+            # et des performances (série sous-échantillonnée, ou nouveaux snapshots)
+            if since is None:
+                trades = TradeHistory.query.filter(
+                    TradeHistory.timestamp > datetime.utcnow() - timedelta(days=7)
+                ).order_by(TradeHistory.timestamp.desc()).limit(DASHBOARD_TRADES).all()
+                now = datetime.utcnow()
+                _, payload['history'] = get_equity_history(now - timedelta(days=7), now, DASHBOARD_HISTORY)
+            else:
+                trades = new_trades
+                payload['history'] = [{
+                    'timestamp': h[0].isoformat(),
+                    'equity': h[1],
+                    'net_profit': h[2]
+                } for h in new_snapshots]
+            payload['trades'] = [serialize_trade(t) for t in trades]
             
-            return jsonify({
-                'snapshot': {
-                    'equity': snapshot.equity if snapshot else 0,
-                    'net_profit': snapshot.net_profit if snapshot else 0,
-                    'open_positions': snapshot.open_positions if snapshot else 0,
-                    'pending_orders': snapshot.pending_orders if snapshot else 0,
-                    'btc_price': snapshot.btc_price if snapshot else 0,
-                    'timestamp': snapshot.timestamp.isoformat() if snapshot else ''
-                },
-                'positions': positions,
-                'orders': orders,
-                'trades': [{
-                    'id': t.id,
-                    'timestamp': t.timestamp.isoformat(),
-                    'symbol': t.symbol,
-                    'side': t.side,
-                    'quantity': t.quantity,
-                    'price': t.price,
-                    'status': t.status
-                } for t in trades],
-                'history': [{
-                    'timestamp': h.timestamp.isoformat(),
-                    'equity': h.equity,
-                    'net_profit': h.net_profit
-                } for h in history]
-            })
+            response = jsonify(payload)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
     except Exception as e:
         logger.error(f"Error in dashboard data: {e}")
         return jsonify({"error": str(e)}), 500
 
+def parse_cursor(value):
+    """Curseur '<boot>.<snapshot>.<trade>.<version>' ; None s'il est absent ou d'un autre démarrage"""
+    if not value:
+        return None
+    try:
+        boot, snapshot_id, trade_id, version = value.split('.')
+        if boot != str(current_boot_id()):
+            return None
+        return {'snapshot': int(snapshot_id), 'trade': int(trade_id), 'version': int(version)}
+    except ValueError:
+        return None  # curseur mal formé : réponse complète
+
+def current_boot_id():
+    """Démarrage du processus qui détient les positions (le moteur, pour un worker web)"""
+    return position_manager.engine_boot() if config.ROLE == 'web' else BOOT_ID
+
+@app.route('/api/dashboard/stream')
+def dashboard_stream():
+    """Flux Server-Sent Events : snapshot, trade, positions, prices, resync
+
+    Chaque flux occupe un thread pendant toute la connexion : sous gunicorn, le
+    tier web tourne en `--worker-class gthread` (voir Procfile). Au-delà de
+    SSE_MAX_STREAMS flux par worker, la requête est refusée (503) et le
+    dashboard se rabat sur le polling par curseur `since`, ce qui garde des
+    threads libres pour /webhook.
+    """
+    if event_publisher.subscriber_count() >= config.SSE_MAX_STREAMS:
+        return jsonify({"status": "error", "message": "Too many event streams, poll /api/dashboard/data"}), 503
+    start_event_stream()
+    return Response(
+        event_publisher.stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/dashboard/history')
+def dashboard_history():
+    """Courbe de capital sur une plage (?start=&end= en ISO 8601, ?points=)"""
+    try:
+        end = parse_timestamp(request.args['end']) if 'end' in request.args else datetime.utcnow()
+        start = parse_timestamp(request.args['start']) if 'start' in request.args else end - timedelta(days=7)
+        points = min(max(int(request.args.get('points', 500)), 3), 5000)
+        with app.app_context():
+            resolution, history = get_equity_history(start, end, points)
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'resolution': resolution,
+            'history': history
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in dashboard history: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/trades')
+def trades_history():
+    """Transactions (?symbol=&start=&end=&limit=), les plus récentes d'abord"""
+    try:
+        start = parse_timestamp(request.args['start']) if 'start' in request.args else None
+        end = parse_timestamp(request.args['end']) if 'end' in request.args else None
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        with app.app_context():
+            trades = get_trades(request.args.get('symbol'), start, end, limit)
+        return jsonify({'trades': [serialize_trade(t) for t in trades]})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in trades history: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/pnl/daily')
+def daily_pnl():
+    """Résultat réalisé par jour (?start=&end= en ISO 8601, ?symbol=)"""
+    try:
+        end = parse_timestamp(request.args['end']) if 'end' in request.args else datetime.utcnow()
+        start = parse_timestamp(request.args['start']) if 'start' in request.args else end - timedelta(days=30)
+        with app.app_context():
+            days = get_daily_pnl(start, end, request.args.get('symbol'))
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': days
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in daily PnL: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
+    received = time.perf_counter()
     try:
         data = request.json
         
@@ -429,106 +1330,161 @@ def webhook():
         
         symbol = data.get('symbol', 'UNKNOWN').upper()
         action = data.get('action')
-        logger.info(f"Received {action} signal for {symbol}: {data}")
         
-        # Traitement des signaux d'achat
-        if action == 'buy' and is_in_trading_window():
-            signal_price = float(data['price'])
-            last_entry = position_manager.get_last_entry_price(symbol)
-            
-            # Calcul du prochain prix d'entrée
-            next_price = last_entry * (1 - config.BELOW_PERCENT / 100) if last_entry else signal_price
-            
-            logger.info(f"Buy signal conditions: "
-                       f"Signal price: {signal_price}, "
-                       f"Next entry: {next_price}, "
-                       f"Can open: {can_open_new_position(symbol)}")
-            
-            # Condition exacte de TradingView
-            if signal_price <= next_price and can_open_new_position(symbol):
-                quantity = calculate_quantity(
-                    price=next_price,
-                    order_value=config.ORDER_VALUE,
-                    min_movement=config.MIN_MOVEMENT,
-                    decimals=config.ROUNDING
-                )
-                
-                # Valider et placer l'ordre
-                order = place_order(
-                    symbol=symbol,
-                    side='BUY',
-                    quantity=quantity,
-                    price=next_price
-                )
-                
-                if order:
-                    logger.info(f"Buy order placed: {order}")
-                    position_manager.add_pending_order(
-                        symbol=symbol,
-                        order_id=order['orderId'],
-                        side='BUY',
-                        price=next_price,
-                        quantity=quantity
-                    )
-                    return jsonify({"status": "success", "order_id": order['orderId']})
+        if config.ROLE == 'web':
+            return enqueue_shared_signal(data, symbol, action)
         
-        # Traitement des signaux de vente
-        elif action == 'sell':
-            positions = position_manager.get_positions(symbol)
-            if positions:
-                current_price = binance.get_current_price(symbol)
-                unrealized_profit = position_manager.get_unrealized_profit(symbol, current_price)
-                
-                # Condition exacte de TradingView
-                if unrealized_profit > 0:
-                    total_quantity = sum(p['quantity'] for p in positions)
-                    order = place_order(
-                        symbol=symbol,
-                        side='SELL',
-                        quantity=total_quantity,
-                        price=current_price,
-                        order_type='MARKET'
-                    )
-                    
-                    if order:
-                        logger.info(f"Sold all positions via webhook: {order}")
-                        position_manager.remove_all_positions(symbol)
-                        return jsonify({"status": "sold", "quantity": total_quantity})
-            else:
-                logger.info(f"No positions to sell for {symbol}")
+        error = invalid_signal(data, action)
+        if error:
+            logger.warning(f"Rejected malformed {action} signal for {symbol}: {error}")
+            return jsonify({"status": "error", "message": error}), 400
         
-        return jsonify({"status": "ignored"})
+        # Retry ou alerte en double : répondre avec le résultat connu, sans appel à l'échange
+        signal_id = signal_dedup.fingerprint(data)
+        previous = signal_dedup.claim(signal_id)
+        if previous is not None:
+            duplicate_signals.inc()
+            logger.info(f"Duplicate {action} signal for {symbol} ignored ({signal_id[:12]})")
+            return jsonify({"status": "duplicate", "signal_id": signal_id, "original": previous})
+        logger.info(f"Received {action} signal for {symbol}: {data}")
+        
+        # Mode asynchrone : valider, mettre en file et répondre immédiatement
+        if signal_queue:
+            if action not in ('buy', 'sell'):
+                signal_dedup.complete(signal_id, {"status": "ignored"})
+                return jsonify({"status": "ignored"})
+            try:
+                queued = signal_queue.submit(symbol, (data, received, signal_id))
+            except Exception:
+                signal_dedup.release(signal_id)
+                raise
+            if not queued:
+                signal_dedup.release(signal_id)
+                return jsonify({"status": "error", "message": "Signal queue full"}), 503
+            return jsonify({"status": "queued", "signal_id": signal_id, "queue_depth": signal_queue.depth()}), 202
+        
+        try:
+            result = process_signal(data, signal_id)
+        except Exception:
+            signal_dedup.release(signal_id)
+            raise
+        signal_dedup.complete(signal_id, result)
+        record_signal_latency(result, received, 'sync')
+        return jsonify(result)
     
     except Exception as e:
         logger.exception("Webhook processing failed")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def invalid_signal(data, action):
+    """Motif de refus d'un signal mal formé (réponse 400), ou None"""
+    if action == 'buy':
+        try:
+            float(data['price'])
+        except (KeyError, TypeError, ValueError):
+            return "Missing or invalid price"
+    return None
+
+def enqueue_shared_signal(data, symbol, action):
+    """Worker web : dépose le signal dans la boîte partagée, exécutée par le moteur
+
+    L'unicité du signal_id dans la boîte dédoublonne entre tous les workers.
+    """
+    signal_id = SignalDeduplicator.fingerprint(data)
+    if action not in ('buy', 'sell'):
+        return jsonify({"status": "ignored"})
+    error = invalid_signal(data, action)
+    if error:
+        logger.warning(f"Rejected malformed {action} signal for {symbol}: {error}")
+        return jsonify({"status": "error", "message": error}), 400
+    if not shared_state.enqueue_signal(signal_id, symbol, data, time.time()):
+        duplicate_signals.inc()
+        logger.info(f"Duplicate {action} signal for {symbol} ignored ({signal_id[:12]})")
+        original = shared_state.get_signal(signal_id) or {'status': 'processing', 'result': None}
+        return jsonify({"status": "duplicate", "signal_id": signal_id,
+                        "original": original['result'] or {'status': original['status']}})
+    logger.info(f"Received {action} signal for {symbol}, queued for the engine: {data}")
+    return jsonify({"status": "queued", "signal_id": signal_id}), 202
+
+@app.route('/api/signals/stats')
+def signal_stats():
+    if config.ROLE == 'web':
+        return jsonify({"mode": "shared", "inbox": shared_state.signal_counts()})
+    if not signal_queue:
+        return jsonify({"mode": "sync", "dedup": signal_dedup.stats()})
+    stats = dict(signal_queue.stats(), mode="async", dedup=signal_dedup.stats())
+    if shared_state:
+        stats['inbox'] = shared_state.signal_counts()
+    return jsonify(stats)
+
+@app.route('/api/exchange/stats')
+def exchange_stats():
+    """Utilisation du budget de poids REST de l'échange"""
+    scheduler = getattr(binance, 'scheduler', None)
+    rules = symbol_rules.stats() if symbol_rules else None
+    if scheduler is None:
+        return jsonify({"exchange": config.EXCHANGE, "symbol_rules": rules})
+    return jsonify(dict(scheduler.stats(), exchange=config.EXCHANGE, symbol_rules=rules,
+                        transport=binance.transport_stats()))
+
+@app.route('/api/scheduler/stats')
+def scheduler_stats():
+    stats = task_scheduler.stats() if task_scheduler else {}
+    if symbol_monitor:
+        stats['symbol_monitor'] = symbol_monitor.stats()
+    return jsonify(dict(stats, running=task_scheduler is not None))
+
+@app.route('/metrics')
+def metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     try:
         price = binance.get_current_price('BTCUSDT')
-        positions = position_manager.get_positions('BTCUSDT')
+        heartbeat_age = position_manager.engine_heartbeat_age() if config.ROLE == 'web' else None
+        # Worker web : le moteur tourne hors supervision (Procfile), son arrêt doit faire échouer le health check
+        engine_down = config.ROLE == 'web' and (heartbeat_age is None or heartbeat_age > config.ENGINE_STALE_AFTER)
         return jsonify({
-            "status": "ok",
+            "status": "engine_down" if engine_down else "ok",
             "testnet": config.TESTNET,
             "btc_price": price,
-            "open_positions": len(positions),
-            "pending_orders": len(position_manager.get_pending_orders())
-        })
+            "open_positions": position_manager.get_position_count('BTCUSDT'),
+            "pending_orders": len(position_manager.get_pending_orders()),
+            "role": config.ROLE,
+            "startup_ms": startup_timings,
+            "engine_heartbeat_age": heartbeat_age
+        }), 503 if engine_down else 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+mark_startup('app')
+
 # Point d'entrée principal
 if __name__ == '__main__':
     logger.info(f"Starting bot in {'TESTNET' if config.TESTNET else 'LIVE'} mode")
+    if config.ROLE == 'web':
+        sys.exit("ROLE=web is served by gunicorn (wsgi:app); run the trading engine with ROLE=engine")
+    create_app()
+    # SIGTERM (arrêt du conteneur) doit passer par atexit : écritures différées et journal des positions
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     # Synchronisation initiale
     with app.app_context():
         position_manager.sync_with_exchange(binance)
     
-    # Démarrer les tâches périodiques
+    # Démarrer le flux d'exécution puis les tâches périodiques
+    start_order_events()
     start_periodic_tasks()
     
+    if config.ROLE == 'engine':
+        start_engine_sharing()
+        if not os.environ.get('ENGINE_PORT'):
+            # HTTP servi par les workers web
+            while True:
+                time.sleep(3600)
+    
     # Démarrer le serveur Flask
-    port = int(os.environ.get('PORT', 5000))
+    port = int(os.environ.get('ENGINE_PORT') or os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, use_reloader=False)
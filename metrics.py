@@ -0,0 +1,154 @@
+"""Métriques du bot (latences, compteurs) exportées au format texte Prometheus"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Bornes des histogrammes de latence, en secondes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """Compteur croissant
+
+    Les incréments se font sans verrou, sous le GIL : une préemption au milieu
+    de `+=` peut exceptionnellement perdre un incrément, ce qui est acceptable
+    pour des métriques et évite tout coût de synchronisation sur le chemin chaud.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """Histogramme à seaux préalloués (mêmes garanties que Counter)"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier seau : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimation (borne supérieure du seau) du quantile q"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """Familles de métriques nommées ; chaque série est identifiée par ses labels
+
+    La création d'une série prend un verrou, pas les observations : les
+    appelants gardent la série obtenue et l'incrémentent directement.
+    """
+
+    def __init__(self):
+        self.families = {}  # nom: (type, aide, {labels: série})
+        self._lock = threading.Lock()
+
+    def _series(self, kind, name, help, factory, labels):
+        key = tuple(sorted(labels.items()))
+        family = self.families.get(name)
+        if family is not None:
+            series = family[2].get(key)
+            if series is not None:
+                return series
+        with self._lock:
+            family = self.families.setdefault(name, (kind, help, {}))
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} already registered as {family[0]}")
+            return family[2].setdefault(key, factory())
+
+    def counter(self, name, help, **labels):
+        return self._series('counter', name, help, Counter, labels)
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS, **labels):
+        return self._series('histogram', name, help, lambda: Histogram(buckets), labels)
+
+    def gauge(self, name, help, read, **labels):
+        """Jauge lue au moment de l'export : `read()` retourne la valeur courante"""
+        return self._series('gauge', name, help, lambda: read, labels)
+
+    def render(self):
+        """Export au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        for name, (kind, help, series) in sorted(self.families.items()):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, metric in list(series.items()):
+                if kind == 'counter':
+                    lines.append(f'{name}{_labels(key)} {metric.value}')
+                elif kind == 'gauge':
+                    try:
+                        value = float(metric())
+                    except Exception:
+                        continue
+                    lines.append(f'{name}{_labels(key)} {value}')
+                else:
+                    counts = list(metric.counts)
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(key, le=repr(float(bound)))} {cumulative}')
+                    cumulative += counts[-1]
+                    lines.append(f'{name}_bucket{_labels(key, le="+Inf")} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(key)} {metric.sum}')
+                    lines.append(f'{name}_count{_labels(key)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(key, **extra):
+    items = list(key) + list(extra.items())
+    if not items:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + '}'
+
+
+# Registre du processus
+registry = MetricsRegistry()
+
+
+def function_latency(function):
+    return registry.histogram('bot_function_duration_seconds', 'Durée des fonctions du chemin critique',
+                              function=function)
+
+
+def function_errors(function):
+    return registry.counter('bot_function_errors_total', 'Erreurs des fonctions du chemin critique',
+                            function=function)
+
+
+def timed(func):
+    """Décorateur : latence, nombre d'appels et exceptions de `func`"""
+    latency = function_latency(func.__name__)
+    errors = function_errors(func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+    return wrapper
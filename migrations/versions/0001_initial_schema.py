@@ -0,0 +1,69 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les bases existantes ont été créées par db.create_all() : ne créer que les tables absentes
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'trading_snapshot' not in existing:
+        op.create_table(
+            'trading_snapshot',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('equity', sa.Float(), nullable=True),
+            sa.Column('net_profit', sa.Float(), nullable=True),
+            sa.Column('open_positions', sa.Integer(), nullable=True),
+            sa.Column('pending_orders', sa.Integer(), nullable=True),
+            sa.Column('btc_price', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'trade_history' not in existing:
+        op.create_table(
+            'trade_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('symbol', sa.String(length=10), nullable=True),
+            sa.Column('side', sa.String(length=10), nullable=True),
+            sa.Column('quantity', sa.Float(), nullable=True),
+            sa.Column('price', sa.Float(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'snapshot_rollup' not in existing:
+        op.create_table(
+            'snapshot_rollup',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('resolution', sa.String(length=5), nullable=True),
+            sa.Column('bucket', sa.DateTime(), nullable=True),
+            sa.Column('count', sa.Integer(), nullable=True),
+            sa.Column('equity_avg', sa.Float(), nullable=True),
+            sa.Column('equity_min', sa.Float(), nullable=True),
+            sa.Column('equity_max', sa.Float(), nullable=True),
+            sa.Column('equity_last', sa.Float(), nullable=True),
+            sa.Column('net_profit_last', sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('resolution', 'bucket')
+        )
+
+
+def downgrade():
+    op.drop_table('snapshot_rollup')
+    op.drop_table('trade_history')
+    op.drop_table('trading_snapshot')
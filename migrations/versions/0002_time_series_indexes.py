@@ -0,0 +1,30 @@
+"""time-series indexes on snapshots and trades
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plages de temps du dashboard et purge de rétention
+    op.create_index('ix_trading_snapshot_timestamp', 'trading_snapshot', ['timestamp'])
+    op.create_index('ix_trade_history_timestamp', 'trade_history', ['timestamp'])
+    # Historique par symbole, trié par date
+    op.create_index('ix_trade_history_symbol_timestamp', 'trade_history', ['symbol', 'timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_trade_history_symbol_timestamp', table_name='trade_history')
+    op.drop_index('ix_trade_history_timestamp', table_name='trade_history')
+    op.drop_index('ix_trading_snapshot_timestamp', table_name='trading_snapshot')
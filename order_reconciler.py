@@ -0,0 +1,68 @@
+import logging
+
+
+class ReconciliationResult:
+    """Transitions détectées lors d'un cycle de réconciliation"""
+
+    def __init__(self):
+        self.open = []      # ordres toujours ouverts : (pending, exchange_order)
+        self.filled = []    # ordres remplis
+        self.canceled = []  # ordres annulés (hors bot ou rejetés)
+        self.expired = []   # ordres expirés
+        self.unknown = []   # statut indéterminé, à revérifier au prochain cycle
+
+    def __repr__(self):
+        return (f'<Reconciliation open={len(self.open)} filled={len(self.filled)} '
+                f'canceled={len(self.canceled)} expired={len(self.expired)} '
+                f'unknown={len(self.unknown)}>')
+
+
+class OrderReconciler:
+    """Réconcilie les ordres en attente avec l'échange en un seul appel groupé
+
+    Un seul get_open_orders par cycle ; seuls les ordres sortis de l'ensemble
+    ouvert donnent lieu à un get_order_status individuel.
+    """
+
+    def __init__(self, binance, position_manager):
+        self.binance = binance
+        self.position_manager = position_manager
+        self.logger = logging.getLogger(__name__)
+
+    def reconcile(self, orders=None):
+        """Réconcilie `orders` (par défaut tous les ordres en attente)"""
+        result = ReconciliationResult()
+        pending = self.position_manager.get_pending_orders() if orders is None else orders
+        if not pending:
+            return result
+
+        open_orders = self.binance.get_open_orders()
+        if open_orders is None:
+            # Échec (budget de poids épuisé...) : pas de get_order_status par ordre, cycle suivant
+            result.unknown = list(pending)
+            self.logger.warning(f"Open orders unavailable, skipping reconciliation of {len(pending)} orders")
+            return result
+        open_orders = {o['orderId']: o for o in open_orders}
+
+        for order in pending:
+            order_id = order['order_id']
+            exchange_order = open_orders.get(order_id)
+            if exchange_order is not None:
+                result.open.append((order, exchange_order))
+                continue
+
+            status = self.binance.get_order_status(order['symbol'], order_id)
+            if status == 'FILLED':
+                result.filled.append(order)
+            elif status in ('CANCELED', 'REJECTED'):
+                result.canceled.append(order)
+            elif status in ('EXPIRED', 'EXPIRED_IN_MATCH'):
+                result.expired.append(order)
+            elif status in ('NEW', 'PARTIALLY_FILLED'):
+                # Absent de la liste mais encore ouvert (course avec l'échange)
+                result.open.append((order, {'status': status}))
+            else:
+                result.unknown.append(order)
+
+        self.logger.info(f"Reconciled {len(pending)} pending orders: {result}")
+        return result
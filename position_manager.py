@@ -1,28 +1,137 @@
 import os
 import logging
+import itertools
+import threading
 import time
 
-class PositionManager:
+
+class Position:
+    """Position ouverte (un palier de l'échelle DCA)"""
+    __slots__ = ('id', 'entry_price', 'quantity', 'order_id', 'timestamp')
+
+    def __init__(self, id, entry_price, quantity, order_id, timestamp):
+        self.id = id
+        self.entry_price = entry_price
+        self.quantity = quantity
+        self.order_id = order_id
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return f'<Position {self.quantity} @ {self.entry_price}>'
+
+
+class SymbolAggregate:
+    """Totaux courants d'un symbole, mis à jour à chaque ajout/retrait"""
+    __slots__ = ('total_quantity', 'total_cost', 'last_entry', 'count')
+
     def __init__(self):
-        self.positions = {}  # symbol: list of positions
+        self.total_quantity = 0.0
+        self.total_cost = 0.0
+        self.last_entry = None
+        self.count = 0
+
+
+class PositionManager:
+    def __init__(self, store=None):
+        self.positions = {}  # symbol: list of Position
+        self.aggregates = {}  # symbol: SymbolAggregate
+        self.balances = {}  # asset: {'free', 'locked'}
         self.pending_orders = {}  # order_id: order
+        self._position_ids = itertools.count(1)
+        self.version = 0  # incrémenté à chaque mutation (positions ou ordres)
+        self.listeners = []  # callback(op, fields) appelé après chaque mutation
+        self.store = store
+        # Une mutation et son enregistrement au journal sont atomiques vis-à-vis d'un point de reprise
+        self._lock = threading.RLock()
         self.logger = logging.getLogger(__name__)
-        self.logger.info("PositionManager initialized (in-memory)")
+        if self.store:
+            self._restore()
+            self.logger.info(f"PositionManager initialized (persistent: {self.store.path})")
+        else:
+            self.logger.info("PositionManager initialized (in-memory)")
+
+    def _restore(self):
+        """Recharge l'échelle de positions et les ordres depuis le store"""
+        start = time.time()
+        state, operations = self.store.load()
+        if state:
+            for symbol, positions in state['positions'].items():
+                for id, entry_price, quantity, order_id, timestamp in positions:
+                    self._apply_add_position(symbol, id, entry_price, quantity, order_id, timestamp)
+            for order in state['pending_orders']:
+                self.pending_orders[order['order_id']] = order
+        for record in operations:
+            op = record['op']
+            if op == 'add_position':
+                self._apply_add_position(record['symbol'], record['id'], record['entry_price'],
+                                         record['quantity'], record['order_id'], record['timestamp'])
+            elif op == 'remove_position':
+                self._apply_remove_position(record['symbol'], record['id'])
+            elif op == 'remove_all_positions':
+                self._apply_remove_all_positions(record['symbol'])
+            elif op == 'add_order':
+                self.pending_orders[record['order']['order_id']] = record['order']
+            elif op == 'remove_order':
+                self.pending_orders.pop(record['order_id'], None)
+        last_id = max((p.id for positions in self.positions.values() for p in positions), default=0)
+        self._position_ids = itertools.count(last_id + 1)
+        self.logger.info(f"Restored {sum(len(p) for p in self.positions.values())} positions and "
+                         f"{len(self.pending_orders)} orders in {(time.time() - start) * 1000:.1f} ms")
+
+    def _journal(self, op, **fields):
+        """Enregistre une mutation déjà appliquée (appelé sous self._lock)"""
+        self.version += 1
+        if self.store and self.store.append(op, **fields):
+            self.checkpoint()
+        return fields
+
+    def _notify(self, op, fields):
+        """Prévient les listeners, hors verrou"""
+        for listener in self.listeners:
+            try:
+                listener(op, fields)
+            except Exception as e:
+                self.logger.error(f"Position listener error: {e}")
+
+    def add_listener(self, callback):
+        """Enregistre un callback(op, fields) notifié de chaque mutation"""
+        self.listeners.append(callback)
+
+    def checkpoint(self):
+        """Écrit un point de reprise complet et tronque le journal"""
+        if not self.store:
+            return
+        # Sous le même verrou que les mutations : aucune opération ne peut être
+        # journalisée entre la copie de l'état et la troncature du journal
+        with self._lock:
+            self.store.checkpoint({
+                'positions': {
+                    symbol: [[p.id, p.entry_price, p.quantity, p.order_id, p.timestamp] for p in positions]
+                    for symbol, positions in self.positions.items()
+                },
+                'pending_orders': list(self.pending_orders.values())
+            })
+
+    def close(self):
+        """Rend durables les dernières écritures (arrêt propre)"""
+        if self.store:
+            self.store.close()
 
     def sync_with_exchange(self, binance):
-        """Synchronise les positions et ordres avec l'échange"""
+        """Synchronise les soldes et ordres avec l'échange"""
         try:
-            # Récupérer les positions ouvertes
-            positions = binance.get_positions()
-            for symbol, pos in positions.items():
-                self.positions[symbol] = pos
+            # Les soldes par actif ne remplacent pas l'échelle de positions (prix d'entrée)
+            self.balances = binance.get_positions()
             
             # Récupérer les ordres en attente
             orders = binance.get_open_orders()
+            if orders is None:
+                return False
             for order in orders:
-                self.pending_orders[order['orderId']] = order
+                if order['orderId'] not in self.pending_orders:
+                    self.add_exchange_order(order)
             
-            self.logger.info(f"Synchronized: {len(self.positions)} positions, {len(self.pending_orders)} orders")
+            self.logger.info(f"Synchronized: {len(self.balances)} balances, {len(self.pending_orders)} orders")
             return True
         except Exception as e:
             self.logger.error(f"Sync error: {e}")
@@ -30,24 +139,63 @@ class PositionManager:
 
     def add_position(self, symbol, entry_price, quantity, order_id):
         """Ajoute une position ouverte"""
-        if symbol not in self.positions:
-            self.positions[symbol] = []
-        self.positions[symbol].append({
-            'entry_price': entry_price,
-            'quantity': quantity,
-            'order_id': order_id,
-            'timestamp': time.time()
-        })
+        with self._lock:
+            position = self._apply_add_position(symbol, next(self._position_ids), entry_price, quantity, order_id,
+                                                time.time())
+            fields = self._journal('add_position', symbol=symbol, id=position.id, entry_price=entry_price,
+                                   quantity=quantity, order_id=order_id, timestamp=position.timestamp)
+        self._notify('add_position', fields)
+        return position
+
+    def _apply_add_position(self, symbol, id, entry_price, quantity, order_id, timestamp):
+        position = Position(id, entry_price, quantity, order_id, timestamp)
+        self.positions.setdefault(symbol, []).append(position)
+        aggregate = self.aggregates.setdefault(symbol, SymbolAggregate())
+        aggregate.total_quantity += quantity
+        aggregate.total_cost += entry_price * quantity
+        aggregate.last_entry = entry_price
+        aggregate.count += 1
+        return position
 
     def remove_position(self, symbol, position_id):
         """Supprime une position par son identifiant"""
-        if symbol in self.positions:
-            self.positions[symbol] = [p for p in self.positions[symbol] if p['id'] != position_id]
+        with self._lock:
+            if not self._apply_remove_position(symbol, position_id):
+                return
+            fields = self._journal('remove_position', symbol=symbol, id=position_id)
+        self._notify('remove_position', fields)
+
+    def _apply_remove_position(self, symbol, position_id):
+        positions = self.positions.get(symbol)
+        if not positions:
+            return False
+        for index, position in enumerate(positions):
+            if position.id == position_id:
+                del positions[index]
+                break
+        else:
+            return False
+        if not positions:
+            self._apply_remove_all_positions(symbol)
+            return True
+        aggregate = self.aggregates[symbol]
+        aggregate.total_quantity -= position.quantity
+        aggregate.total_cost -= position.entry_price * position.quantity
+        aggregate.last_entry = positions[-1].entry_price
+        aggregate.count -= 1
+        return True
 
     def remove_all_positions(self, symbol):
         """Supprime toutes les positions pour un symbole"""
-        if symbol in self.positions:
-            del self.positions[symbol]
+        with self._lock:
+            if not self._apply_remove_all_positions(symbol):
+                return
+            fields = self._journal('remove_all_positions', symbol=symbol)
+        self._notify('remove_all_positions', fields)
+
+    def _apply_remove_all_positions(self, symbol):
+        self.aggregates.pop(symbol, None)
+        return self.positions.pop(symbol, None) is not None
 
     def get_positions(self, symbol):
         """Retourne les positions pour un symbole"""
@@ -57,20 +205,62 @@ class PositionManager:
         """Retourne la liste des symboles ayant des positions"""
         return list(self.positions.keys())
 
-    def add_pending_order(self, symbol, order_id, side, price, quantity):
+    def get_position_count(self, symbol):
+        """Nombre de paliers ouverts pour un symbole"""
+        aggregate = self.aggregates.get(symbol)
+        return aggregate.count if aggregate else 0
+
+    def get_total_quantity(self, symbol):
+        """Quantité totale détenue pour un symbole"""
+        aggregate = self.aggregates.get(symbol)
+        return aggregate.total_quantity if aggregate else 0
+
+    def add_pending_order(self, symbol, order_id, side, price, quantity, timestamp=None):
         """Ajoute un ordre en attente"""
-        self.pending_orders[order_id] = {
+        order = {
+            'order_id': order_id,
             'symbol': symbol,
             'side': side,
             'price': price,
             'quantity': quantity,
-            'timestamp': time.time()
+            'timestamp': timestamp or time.time()
         }
+        with self._lock:
+            self.pending_orders[order_id] = order
+            fields = self._journal('add_order', order=order)
+        self._notify('add_order', fields)
+
+    def add_exchange_order(self, order):
+        """Ajoute un ordre tel que retourné par l'échange (get_open_orders)"""
+        self.add_pending_order(
+            symbol=order['symbol'],
+            order_id=order['orderId'],
+            side=order['side'],
+            price=float(order['price']),
+            quantity=float(order['origQty']),
+            timestamp=order['time'] / 1000 if 'time' in order else None
+        )
 
     def remove_pending_order(self, order_id):
         """Supprime un ordre en attente"""
-        if order_id in self.pending_orders:
-            del self.pending_orders[order_id]
+        self.pop_pending_order(order_id)
+
+    def pop_pending_order(self, order_id):
+        """Retire et retourne un ordre en attente (None s'il a déjà été traité)"""
+        with self._lock:
+            order = self.pending_orders.pop(order_id, None)
+            if order is None:
+                return None
+            fields = self._journal('remove_order', order_id=order_id)
+        self._notify('remove_order', fields)
+        return order
+
+    def restore_pending_order(self, order):
+        """Remet en attente un ordre retiré par pop_pending_order"""
+        with self._lock:
+            self.pending_orders[order['order_id']] = order
+            fields = self._journal('add_order', order=order)
+        self._notify('add_order', fields)
 
     def get_pending_orders(self):
         """Retourne tous les ordres en attente"""
@@ -78,35 +268,31 @@ class PositionManager:
 
     def is_order_old(self, order_id, minutes=5):
         """Vérifie si un ordre est ancien (plus de X minutes)"""
-        if order_id not in self.pending_orders:
-            return False
-        order = self.pending_orders[order_id]
-        return time.time() - order['timestamp'] > minutes * 60
+        expiry = self.order_expiry(order_id, minutes)
+        return expiry is not None and time.time() > expiry
+
+    def order_expiry(self, order_id, minutes=5):
+        """Instant (epoch) où un ordre en attente devient ancien ; None s'il n'est plus en attente"""
+        order = self.pending_orders.get(order_id)
+        if order is None:
+            return None
+        return order['timestamp'] + minutes * 60
 
     def get_last_entry_price(self, symbol):
         """Obtient le dernier prix d'entrée pour un symbole"""
-        positions = self.get_positions(symbol)
-        if not positions:
-            return None
-        return positions[-1]['entry_price']
+        aggregate = self.aggregates.get(symbol)
+        return aggregate.last_entry if aggregate else None
 
     def calculate_avg_price(self, symbol):
         """Calcule le prix moyen d'entrée pour un symbole"""
-        positions = self.get_positions(symbol)
-        if not positions:
+        aggregate = self.aggregates.get(symbol)
+        if not aggregate or not aggregate.total_quantity:
             return 0
-        total_cost = sum(p['entry_price'] * p['quantity'] for p in positions)
-        total_quantity = sum(p['quantity'] for p in positions)
-        return total_cost / total_quantity
+        return aggregate.total_cost / aggregate.total_quantity
 
     def get_unrealized_profit(self, symbol, current_price):
         """Calcule le profit non réalisé pour un symbole"""
-        positions = self.get_positions(symbol)
-        if not positions:
+        aggregate = self.aggregates.get(symbol)
+        if not aggregate:
             return 0
-        total_value = 0
-        total_cost = 0
-        for p in positions:
-            total_cost += p['entry_price'] * p['quantity']
-            total_value += current_price * p['quantity']
-        return total_value - total_cost
+        return current_price * aggregate.total_quantity - aggregate.total_cost
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+class PositionStore:
+    """Persistance des positions : journal en ajout seul + points de reprise compactés
+
+    Chaque mutation du PositionManager est ajoutée au journal (`<path>.journal`,
+    une ligne JSON par opération). Les écritures sont regroupées et un seul
+    fsync est fait par fenêtre de `commit_interval` secondes. Tous les
+    `checkpoint_every` enregistrements, l'état complet est réécrit dans `path`
+    et le journal est tronqué, ce qui borne le temps de relecture au démarrage.
+    """
+
+    def __init__(self, path='position.db', checkpoint_every=1000, commit_interval=0.05):
+        self.path = path
+        self.journal_path = f'{path}.journal'
+        self.checkpoint_every = checkpoint_every
+        self.commit_interval = commit_interval
+        self.seq = 0
+        self.records_since_checkpoint = 0
+        self._journal = None
+        self._dirty = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flusher = None
+        self.logger = logging.getLogger(__name__)
+
+    def load(self):
+        """Relit le point de reprise puis le journal ; retourne (état, opérations)"""
+        state = None
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                content = f.read().strip()
+            if content:
+                state = json.loads(content)
+                self.seq = state.get('seq', 0)
+
+        operations = []
+        valid_end = 0
+        newline_missing = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        self.logger.error("Ignoring truncated journal record")
+                        break
+                    valid_end += len(line)
+                    newline_missing = not line.endswith(b'\n')
+                    if record['seq'] > self.seq:
+                        operations.append(record)
+                        self.seq = record['seq']
+            if valid_end < os.path.getsize(self.journal_path):
+                # Sans troncature, les ajouts suivraient la ligne abîmée et seraient ignorés au prochain démarrage
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(valid_end)
+        self.records_since_checkpoint = len(operations)
+
+        self._journal = open(self.journal_path, 'a')
+        if newline_missing:
+            self._journal.write('\n')  # dernier enregistrement complet mais sans fin de ligne
+        self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+        self._flusher.start()
+        self.logger.info(f"Position store loaded: checkpoint={'yes' if state else 'no'}, "
+                         f"{len(operations)} journal records replayed")
+        return state, operations
+
+    def append(self, op, **fields):
+        """Ajoute une opération au journal ; retourne True si un point de reprise est dû"""
+        with self._lock:
+            self.seq += 1
+            fields['op'] = op
+            fields['seq'] = self.seq
+            self._journal.write(json.dumps(fields) + '\n')
+            self._dirty = True
+            self.records_since_checkpoint += 1
+            self._wakeup.notify()
+            return self.records_since_checkpoint >= self.checkpoint_every
+
+    def checkpoint(self, state):
+        """Écrit l'état complet de façon atomique puis tronque le journal"""
+        with self._lock:
+            state['seq'] = self.seq
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._journal.close()
+            self._journal = open(self.journal_path, 'w')
+            self._dirty = False
+            self.records_since_checkpoint = 0
+        self.logger.info(f"Position store checkpoint written (seq={state['seq']})")
+
+    def flush(self):
+        """Force l'écriture durable des enregistrements en attente"""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._sync()
+            self._wakeup.notify()
+        if self._journal:
+            self._journal.close()
+
+    def _sync(self):
+        if self._dirty and self._journal:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._dirty = False
+
+    def _run_flusher(self):
+        # Commit groupé : un fsync par fenêtre, quel que soit le nombre d'écritures
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            time.sleep(self.commit_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                self._sync()
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+
+
+class PriceCache:
+    """Cache thread-safe du dernier prix connu par symbole"""
+
+    def __init__(self):
+        self._prices = {}  # symbol: (price, timestamp)
+        self._lock = threading.Lock()
+
+    def update(self, symbol, price, timestamp=None):
+        """Met à jour le dernier prix d'un symbole"""
+        with self._lock:
+            self._prices[symbol] = (float(price), timestamp or time.time())
+
+    def get(self, symbol, max_age=None):
+        """Retourne le dernier prix, ou None s'il est absent ou trop ancien"""
+        with self._lock:
+            entry = self._prices.get(symbol)
+        if entry is None:
+            return None
+        price, timestamp = entry
+        if max_age is not None and time.time() - timestamp > max_age:
+            return None
+        return price
+
+    def age(self, symbol):
+        """Âge en secondes du dernier prix connu (None si absent)"""
+        with self._lock:
+            entry = self._prices.get(symbol)
+        return time.time() - entry[1] if entry else None
+
+    def symbols(self):
+        with self._lock:
+            return list(self._prices.keys())
+
+
+class PriceFeed:
+    """Source de prix en continu qui alimente un PriceCache"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or PriceCache()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def subscribe(self, symbol):
+        """Demande le suivi d'un symbole (sans effet si le flux couvre tout le marché)"""
+        pass
+
+    def get_price(self, symbol, max_age=None):
+        return self.cache.get(symbol, max_age)
+
+
+class BinanceStreamFeed(PriceFeed):
+    """Flux miniTicker de tout le marché via le websocket Binance"""
+
+    def __init__(self, api_key, api_secret, testnet=True, cache=None):
+        super().__init__(cache)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.manager = None
+
+    def start(self):
+        from binance import ThreadedWebsocketManager
+
+        self.manager = ThreadedWebsocketManager(
+            api_key=self.api_key,
+            api_secret=self.api_secret,
+            testnet=self.testnet
+        )
+        self.manager.start()
+        self.manager.start_miniticker_socket(callback=self._handle_message)
+        self.logger.info("Price stream started (all-market miniTicker)")
+
+    def stop(self):
+        if self.manager:
+            self.manager.stop()
+            self.manager = None
+            self.logger.info("Price stream stopped")
+
+    def _handle_message(self, message):
+        try:
+            if isinstance(message, dict):
+                if message.get('e') == 'error':
+                    self.logger.error(f"Price stream error: {message.get('m')}")
+                    return
+                message = [message]
+            for ticker in message:
+                # 'E' est l'heure d'événement en millisecondes
+                self.cache.update(ticker['s'], ticker['c'], ticker.get('E', time.time() * 1000) / 1000)
+        except Exception as e:
+            self.logger.error(f"Price stream message error: {e}")
+
+
+class ReplayPriceFeed(PriceFeed):
+    """Flux de remplacement local qui rejoue une série de prix (tests, hors ligne)
+
+    `ticks` est une liste de tuples (symbol, price) ou (symbol, price, delay) ;
+    `delay` est le temps d'attente en secondes avant d'appliquer le tick.
+    En boucle, un cycle dure au moins `min_interval` secondes (ticks sans délai).
+    """
+
+    def __init__(self, ticks=None, cache=None, loop=False, min_interval=1.0):
+        super().__init__(cache)
+        self.ticks = list(ticks or [])
+        self.loop = loop
+        self.min_interval = min_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """Charge des ticks depuis un CSV `symbol,price[,delay]`"""
+        ticks = []
+        with open(path) as f:
+            for line in f:
+                fields = line.strip().split(',')
+                if len(fields) < 2 or fields[0] == 'symbol':
+                    continue
+                tick = (fields[0], float(fields[1]))
+                if len(fields) > 2 and fields[2]:
+                    tick += (float(fields[2]),)
+                ticks.append(tick)
+        return cls(ticks, **kwargs)
+
+    def push(self, symbol, price):
+        """Injecte immédiatement un prix dans le cache"""
+        self.cache.update(symbol, price)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Replay price feed started ({len(self.ticks)} ticks)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        if not self.ticks:
+            self.logger.warning("Replay price feed has no ticks, nothing to replay")
+            return
+        while not self._stop.is_set():
+            waited = 0.0
+            for tick in self.ticks:
+                if len(tick) > 2:
+                    if self._stop.wait(tick[2]):
+                        return
+                    waited += tick[2]
+                if self._stop.is_set():
+                    return
+                self.cache.update(tick[0], tick[1])
+            if not self.loop:
+                return
+            # Sans délais dans le fichier, le cycle suivant attendrait 0 s : boucle à 100 % CPU
+            if waited < self.min_interval and self._stop.wait(self.min_interval - waited):
+                return
+
+
+def create_price_feed(config):
+    """Construit le flux de prix choisi par `config.PRICE_FEED` (None = REST seul)"""
+    if config.PRICE_FEED == 'stream':
+        return BinanceStreamFeed(config.API_KEY, config.SECRET_KEY, testnet=config.TESTNET)
+    if config.PRICE_FEED == 'replay':
+        return ReplayPriceFeed.from_csv(config.PRICE_REPLAY_FILE, loop=True)
+    return None
@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from metrics import registry
+
+
+class _Task:
+    __slots__ = ('name', 'interval', 'func', 'jitter', 'base', 'runs', 'overruns', 'last_duration',
+                 'max_lateness', 'duration', 'lateness', 'overrun_count')
+
+    def __init__(self, name, interval, func, jitter):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.jitter = jitter
+        self.base = 0.0  # échéance théorique, sans gigue
+        self.runs = 0
+        self.overruns = 0
+        self.last_duration = 0.0
+        self.max_lateness = 0.0
+        self.duration = registry.histogram('bot_scheduler_task_seconds', 'Durée d\'exécution des tâches planifiées',
+                                           task=name)
+        self.lateness = registry.histogram('bot_scheduler_lateness_seconds', 'Retard des tâches sur leur échéance',
+                                           task=name)
+        self.overrun_count = registry.counter('bot_scheduler_overruns_total',
+                                              'Tâches plus longues que leur période', task=name)
+
+    def period(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+
+class _Timer:
+    __slots__ = ('func', 'key', 'canceled')
+
+    def __init__(self, func, key):
+        self.func = func
+        self.key = key
+        self.canceled = False
+
+
+class TaskScheduler:
+    """Planificateur à tas d'échéances : tâches périodiques et minuteries ponctuelles
+
+    Un seul thread dort jusqu'à la prochaine échéance du tas : rien ne tourne
+    tant que rien n'est dû. Les tâches périodiques gardent une cadence fixe
+    (échéance précédente + période, plus une gigue aléatoire) ; une tâche plus
+    longue que sa période est signalée et repart de l'instant présent au lieu
+    de rattraper les exécutions manquées. Les minuteries à clé remplacent la
+    précédente de même clé (suppression paresseuse dans le tas).
+    """
+
+    def __init__(self, name='scheduler'):
+        self.name = name
+        self.tasks = {}  # nom: _Task
+        self._heap = []  # (échéance, séquence, tâche ou minuterie)
+        self._timers = {}  # clé: _Timer
+        self._sequence = itertools.count()
+        self._random = random.Random()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.logger = logging.getLogger(__name__)
+
+    def _push(self, deadline, entry):
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._sequence), entry))
+            if self._heap[0][2] is entry:
+                self._condition.notify()
+
+    def every(self, name, interval, func, jitter=0.0, delay=0.0):
+        """Exécute `func` toutes les `interval` secondes (nombre ou callable)"""
+        task = _Task(name, interval, func, jitter)
+        task.base = time.time() + delay
+        self.tasks[name] = task
+        self._push(task.base, task)
+        return task
+
+    def call_at(self, deadline, func, key=None):
+        """Exécute `func` une fois à l'instant `deadline` (epoch)"""
+        timer = _Timer(func, key)
+        if key is not None:
+            with self._condition:
+                previous = self._timers.get(key)
+                if previous is not None:
+                    previous.canceled = True
+                self._timers[key] = timer
+        self._push(deadline, timer)
+        return timer
+
+    def call_later(self, delay, func, key=None):
+        return self.call_at(time.time() + delay, func, key)
+
+    def cancel(self, key):
+        with self._condition:
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.canceled = True
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Task scheduler started with {len(self.tasks)} tasks")
+
+    def stop(self, timeout=5):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _next(self):
+        """Attend et retire la prochaine entrée due (None à l'arrêt)"""
+        with self._condition:
+            while self._running:
+                if self._heap:
+                    deadline, _, entry = self._heap[0]
+                    now = time.time()
+                    if deadline <= now:
+                        heapq.heappop(self._heap)
+                        if isinstance(entry, _Timer):
+                            if entry.canceled:
+                                continue
+                            if entry.key is not None and self._timers.get(entry.key) is entry:
+                                del self._timers[entry.key]
+                        return deadline, entry
+                    self._condition.wait(deadline - now)
+                else:
+                    self._condition.wait()
+            return None
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            deadline, entry = item
+            if isinstance(entry, _Timer):
+                try:
+                    entry.func()
+                except Exception as e:
+                    self.logger.error(f"Scheduled timer failed: {e}")
+            else:
+                self._run_task(entry, deadline)
+
+    def _run_task(self, task, deadline):
+        start = time.time()
+        lateness = start - deadline
+        task.lateness.observe(max(lateness, 0.0))
+        task.max_lateness = max(task.max_lateness, lateness)
+        try:
+            task.func()
+        except Exception as e:
+            self.logger.error(f"Scheduled task {task.name} failed: {e}")
+        finished = time.time()
+        task.runs += 1
+        task.last_duration = finished - start
+        task.duration.observe(task.last_duration)
+
+        period = task.period()
+        task.base += period
+        if task.base < finished:
+            # Dépassement : ne pas enchaîner les exécutions manquées
+            task.overruns += 1
+            task.overrun_count.inc()
+            self.logger.warning(f"Task {task.name} overran its {period}s period "
+                                f"(took {task.last_duration:.2f}s, {lateness:.2f}s late)")
+            task.base = finished + period
+        jitter = self._random.uniform(0, task.jitter) if task.jitter else 0.0
+        self._push(task.base + jitter, task)
+
+    def stats(self):
+        with self._condition:
+            pending = len(self._heap)
+            timers = len(self._timers)
+        return {
+            'pending': pending,
+            'timers': timers,
+            'tasks': {name: {
+                'interval': task.period(),
+                'runs': task.runs,
+                'overruns': task.overruns,
+                'last_duration': round(task.last_duration, 4),
+                'max_lateness': round(task.max_lateness, 4),
+                'next_run': task.base
+            } for name, task in self.tasks.items()}
+        }
@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from position_manager import Position
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    signal_id TEXT NOT NULL UNIQUE,
+    symbol TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    received REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_signals_status ON signals (status, id);
+"""
+
+
+class SharedStateStore:
+    """État partagé entre le moteur de trading et les workers web (SQLite en mode WAL)
+
+    - `state` : dernière valeur publiée par clé (positions, prix, moteur), versionnée ;
+    - `events` : journal des événements du moteur, relayé par chaque worker à ses clients SSE ;
+    - `signals` : boîte de réception des webhooks, dédoublonnée par signal_id.
+
+    Le moteur est le seul écrivain de `state` et `events` ; les workers web n'y
+    font que des lectures, concurrentes des écritures grâce au WAL. Les
+    changements sont détectés par les compteurs de version et d'identifiant.
+    """
+
+    def __init__(self, path='shared_state.db', event_retention=1000):
+        self.path = path
+        self.event_retention = event_retention
+        self._local = threading.local()
+        self.logger = logging.getLogger(__name__)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    # État versionné
+
+    def put_state(self, key, value):
+        self._connection().execute(
+            "INSERT INTO state (key, version, value, updated) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET version = version + 1, value = excluded.value, updated = excluded.updated",
+            (key, json.dumps(value, default=str), time.time())
+        )
+
+    def get_state(self, key):
+        """(version, valeur, date de mise à jour) ; (0, None, 0) si la clé n'a jamais été publiée"""
+        row = self._connection().execute("SELECT version, value, updated FROM state WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return 0, None, 0
+        return row[0], json.loads(row[1]), row[2]
+
+    def state_versions(self):
+        return dict(self._connection().execute("SELECT key, version FROM state").fetchall())
+
+    # Journal d'événements
+
+    def append_event(self, event_type, data):
+        self._connection().execute(
+            "INSERT INTO events (type, data, created) VALUES (?, ?, ?)",
+            (event_type, json.dumps(data, default=str), time.time())
+        )
+
+    def last_event_id(self):
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def events_since(self, last_id, limit=500):
+        rows = self._connection().execute(
+            "SELECT id, type, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        ).fetchall()
+        return [(event_id, event_type, json.loads(data)) for event_id, event_type, data in rows]
+
+    def trim_events(self):
+        """Ne garde que les `event_retention` derniers événements"""
+        self._connection().execute(
+            "DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - ?", (self.event_retention,)
+        )
+
+    # Boîte de réception des signaux
+
+    def enqueue_signal(self, signal_id, symbol, payload, received):
+        """Dépose un signal ; False s'il a déjà été déposé (par n'importe quel worker)"""
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO signals (signal_id, symbol, payload, received) VALUES (?, ?, ?, ?)",
+            (signal_id, symbol, json.dumps(payload, default=str), received)
+        )
+        return cursor.rowcount == 1
+
+    def get_signal(self, signal_id):
+        row = self._connection().execute(
+            "SELECT status, result FROM signals WHERE signal_id = ?", (signal_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'result': json.loads(row[1]) if row[1] else None}
+
+    def claim_signals(self, limit=100):
+        """Moteur : passe les signaux en attente à 'processing' et les retourne dans l'ordre d'arrivée"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, signal_id, symbol, payload, received FROM signals WHERE status = 'queued' "
+                "ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            if rows:
+                connection.execute(
+                    f"UPDATE signals SET status = 'processing' WHERE id IN ({','.join('?' * len(rows))})",
+                    [row[0] for row in rows]
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return [(signal_id, symbol, json.loads(payload), received) for _, signal_id, symbol, payload, received in rows]
+
+    def complete_signal(self, signal_id, result):
+        self._connection().execute(
+            "UPDATE signals SET status = 'done', result = ? WHERE signal_id = ?",
+            (json.dumps(result, default=str), signal_id)
+        )
+
+    def release_signal(self, signal_id):
+        """Supprime un signal en échec : un nouvel envoi du même signal sera accepté"""
+        self._connection().execute("DELETE FROM signals WHERE signal_id = ?", (signal_id,))
+
+    def requeue_processing(self):
+        """Au démarrage du moteur : reprendre les signaux interrompus par un arrêt"""
+        count = self._connection().execute(
+            "UPDATE signals SET status = 'queued' WHERE status = 'processing'"
+        ).rowcount
+        if count:
+            self.logger.warning(f"Requeued {count} signals interrupted by the previous engine")
+
+    def prune_signals(self, older_than):
+        self._connection().execute(
+            "DELETE FROM signals WHERE status = 'done' AND received < ?", (time.time() - older_than,)
+        )
+
+    def signal_counts(self):
+        return dict(self._connection().execute("SELECT status, COUNT(*) FROM signals GROUP BY status").fetchall())
+
+
+class SharedStateView:
+    """Vue en lecture seule de l'état publié par le moteur, pour les workers web
+
+    Expose le sous-ensemble de PositionManager (et `get_current_price`) utilisé
+    par les routes du dashboard. L'état est relu au plus toutes les
+    `refresh_interval` secondes, et seulement pour les clés dont la version a changé.
+    """
+
+    def __init__(self, store, refresh_interval=0.05):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.versions = {}
+        self.positions = {}  # symbole: [Position]
+        self.pending_orders = {}
+        self.prices = {}
+        self.engine = {}
+        self._version = 0
+        self.listeners = []
+        self._prices_updated = 0
+        self._refreshed = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def refresh(self, force=False):
+        """Relit les clés modifiées ; retourne True si les positions ont changé"""
+        if not force and time.time() - self._refreshed < self.refresh_interval:
+            return False
+        with self._lock:
+            self._refreshed = time.time()
+            versions = self.store.state_versions()
+            changed = {key for key, version in versions.items() if self.versions.get(key) != version}
+            if 'positions' in changed:
+                _, state, updated = self.store.get_state('positions')
+                self.positions = {}
+                for item in state['positions']:
+                    self.positions.setdefault(item['symbol'], []).append(
+                        Position(item['id'], item['entry_price'], item['quantity'], None, None))
+                self.pending_orders = {order['id']: {
+                    'order_id': order['id'],
+                    'symbol': order['symbol'],
+                    'side': order['side'],
+                    'quantity': order['quantity'],
+                    'price': order['price']
+                } for order in state['orders']}
+                self._version = state.get('version', 0)
+                if updated >= self._prices_updated:
+                    self.prices, self._prices_updated = dict(state['prices']), updated
+            if 'prices' in changed:
+                _, prices, updated = self.store.get_state('prices')
+                if updated >= self._prices_updated:
+                    self.prices, self._prices_updated = dict(prices), updated
+            if 'engine' in changed:
+                self.engine = self.store.get_state('engine')[1]
+            self.versions = versions
+        if 'positions' in changed:
+            for listener in self.listeners:
+                listener('sync', {})
+        return 'positions' in changed
+
+    @property
+    def version(self):
+        self.refresh()
+        return self._version
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def engine_boot(self):
+        self.refresh()
+        return self.engine.get('boot', 0)
+
+    def engine_heartbeat_age(self):
+        self.refresh()
+        heartbeat = self.engine.get('heartbeat')
+        return time.time() - heartbeat if heartbeat else None
+
+    def get_symbols(self):
+        self.refresh()
+        return list(self.positions.keys())
+
+    def get_positions(self, symbol):
+        self.refresh()
+        return self.positions.get(symbol, [])
+
+    def get_position_count(self, symbol):
+        return len(self.get_positions(symbol))
+
+    def get_total_quantity(self, symbol):
+        return sum(position.quantity for position in self.get_positions(symbol))
+
+    def get_pending_orders(self):
+        self.refresh()
+        return list(self.pending_orders.values())
+
+    def get_current_price(self, symbol):
+        self.refresh()
+        return self.prices.get(symbol, 0.0)
+
+    def close(self):
+        pass
+
+
+class SharedEventFollower:
+    """Worker web : relaie les événements du moteur aux clients SSE locaux"""
+
+    def __init__(self, store, publisher, interval=0.1):
+        self.store = store
+        self.publisher = publisher
+        self.interval = interval
+        self.last_id = None
+        self.relayed = 0
+        self._thread = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        self.last_id = self.store.last_event_id()
+        self._thread = threading.Thread(target=self._run, name='shared-events', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Following engine events from #{self.last_id} (pid {os.getpid()})")
+        return self._thread
+
+    def _run(self):
+        while True:
+            try:
+                events = self.store.events_since(self.last_id)
+                for event_id, event_type, data in events:
+                    self.publisher.publish(event_type, data)
+                    self.last_id = event_id
+                    self.relayed += 1
+                if events:
+                    continue
+            except Exception as e:
+                self.logger.error(f"Shared event follower error: {e}")
+            time.sleep(self.interval)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Champs ignorés dans l'empreinte d'un signal
+IGNORED_FIELDS = ('token',)
+
+# Préfixe des newClientOrderId dérivés d'un signal (36 caractères au plus chez Binance)
+CLIENT_ORDER_PREFIX = 'sig'
+
+
+class SignalDeduplicator:
+    """Index borné des signaux webhook récents, pour ignorer retries et alertes en double
+
+    Une table de hachage (empreinte -> résultat) donne la réponse en O(1) ;
+    un anneau d'expiration, dans l'ordre d'arrivée, retire les entrées plus
+    vieilles que `window` secondes ou au-delà de `capacity`. Avec `path`,
+    chaque signal traité est aussi ajouté à un fichier relu au démarrage.
+    """
+
+    def __init__(self, window=300.0, capacity=10000, path=None):
+        self.window = window
+        self.capacity = capacity
+        self.path = path
+        self.entries = {}  # empreinte: (expiration, résultat)
+        self.ring = deque()  # (expiration, empreinte)
+        self.hits = 0
+        self.misses = 0
+        self._file = None
+        self._records = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        if path:
+            self._load()
+
+    @staticmethod
+    def fingerprint(data):
+        """Identifiant fourni par le client (signal_id / id), sinon hachage du contenu
+
+        Le hachage porte sur tous les champs, horodatage compris : une alerte
+        qui envoie `{{timenow}}` (champ `time`, `timestamp`...) n'est jamais
+        confondue avec la précédente. Sans id ni horodatage, deux alertes
+        identiques à moins de SIGNAL_DEDUP_WINDOW secondes d'intervalle sont
+        un doublon : la seconde est ignorée.
+        """
+        client_id = data.get('signal_id') or data.get('id')
+        if client_id:
+            source = f'id:{client_id}'
+        else:
+            payload = {k: v for k, v in data.items() if k not in IGNORED_FIELDS}
+            source = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    @staticmethod
+    def client_order_id(key):
+        """newClientOrderId déterministe : un doublon est refusé par l'échange"""
+        return f'{CLIENT_ORDER_PREFIX}{key[:32]}'
+
+    def _expire(self, now):
+        while self.ring and (self.ring[0][0] <= now or len(self.ring) > self.capacity):
+            expires, key = self.ring.popleft()
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == expires:
+                del self.entries[key]
+
+    def claim(self, key):
+        """Réserve un signal ; retourne None s'il est nouveau, sinon le résultat déjà connu"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            expires = now + self.window
+            self.entries[key] = (expires, {'status': 'processing'})
+            self.ring.append((expires, key))
+            return None
+
+    def complete(self, key, result):
+        """Enregistre le résultat d'un signal réservé (et le persiste)"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            self.entries[key] = (entry[0], result)
+            if self._file:
+                self._append(key, entry[0], result)
+
+    def release(self, key):
+        """Oublie un signal dont le traitement a échoué : un nouvel envoi sera traité"""
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self.entries),
+                'capacity': self.capacity,
+                'window': self.window,
+                'duplicates': self.hits,
+                'unique': self.misses,
+                'persistent': bool(self.path)
+            }
+
+    # Persistance
+
+    def _load(self):
+        now = time.time()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # ligne tronquée par un arrêt brutal
+                    if record['expires'] > now:
+                        self.entries[record['key']] = (record['expires'], record['result'])
+                        self.ring.append((record['expires'], record['key']))
+            self._expire(now)
+            self.logger.info(f"Loaded {len(self.entries)} recent signals from {self.path}")
+        self._compact()
+
+    def _append(self, key, expires, result):
+        self._file.write(json.dumps({'key': key, 'expires': expires, 'result': result}, default=str) + '\n')
+        self._file.flush()
+        self._records += 1
+        if self._records > 2 * max(len(self.entries), self.capacity // 10):
+            self._compact()
+
+    def _compact(self):
+        """Réécrit le fichier avec les seules entrées vivantes"""
+        if self._file:
+            self._file.close()
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            for key, (expires, result) in self.entries.items():
+                if result.get('status') != 'processing':
+                    f.write(json.dumps({'key': key, 'expires': expires, 'result': result}, default=str) + '\n')
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a')
+        self._records = len(self.entries)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
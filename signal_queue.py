@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+
+
+class SignalQueue:
+    """File bornée de signaux webhook traitée par un pool de workers
+
+    Chaque symbole est toujours routé vers le même worker : les signaux d'un
+    symbole sont traités dans l'ordre et jamais en parallèle, alors que des
+    symboles différents avancent en même temps.
+    """
+
+    def __init__(self, handler, workers=4, maxsize=1000):
+        self.handler = handler
+        self.workers = workers
+        # Capacité totale répartie entre les workers
+        shard_size = max(1, maxsize // workers)
+        self.queues = [queue.Queue(maxsize=shard_size) for _ in range(workers)]
+        self.threads = []
+        self.submitted = 0
+        self.processed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        for index, shard in enumerate(self.queues):
+            thread = threading.Thread(target=self._run, args=(shard,), name=f'signal-worker-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"Signal queue started with {self.workers} workers")
+
+    def stop(self, timeout=5):
+        """Arrête les workers après avoir vidé les files"""
+        for shard in self.queues:
+            shard.put(None)
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+        self.threads = []
+
+    def _shard(self, symbol):
+        return self.queues[zlib.crc32(symbol.encode()) % self.workers]
+
+    def submit(self, symbol, signal):
+        """Met un signal en file ; retourne False si la file est pleine"""
+        try:
+            self._shard(symbol).put_nowait((time.time(), signal))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            self.logger.error(f"Signal queue full, rejecting signal for {symbol}")
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Attend que tous les signaux en file soient traités"""
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            with self._lock:
+                if self.processed >= self.submitted:
+                    return True
+            if deadline and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def depth(self):
+        return sum(shard.qsize() for shard in self.queues)
+
+    def stats(self):
+        with self._lock:
+            processed = self.processed
+            return {
+                'workers': self.workers,
+                'depth': self.depth(),
+                'shard_depths': [shard.qsize() for shard in self.queues],
+                'capacity': sum(shard.maxsize for shard in self.queues),
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'processed': processed,
+                'rejected': self.rejected,
+                'failed': self.failed,
+                'avg_wait_ms': round(self.total_wait / processed * 1000, 2) if processed else 0
+            }
+
+    def _run(self, shard):
+        while True:
+            item = shard.get()
+            if item is None:
+                return
+            enqueued_at, signal = item
+            with self._lock:
+                self.in_flight += 1
+                self.total_wait += time.time() - enqueued_at
+            try:
+                self.handler(signal)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                self.logger.error(f"Signal processing failed: {e}")
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.processed += 1
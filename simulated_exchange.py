@@ -0,0 +1,313 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from price_feed import PriceCache, ReplayPriceFeed
+
+
+class SimulatedError(Exception):
+    """Erreur injectée par l'échange simulé"""
+
+
+class _MatchingPriceCache(PriceCache):
+    """Cache de prix qui déclenche l'appariement des ordres à chaque mise à jour"""
+
+    def __init__(self, exchange):
+        super().__init__()
+        self.exchange = exchange
+
+    def update(self, symbol, price, timestamp=None):
+        super().update(symbol, price, timestamp)
+        self.exchange._match(symbol, float(price))
+
+
+class SimulatedExchange:
+    """Échange local qui expose les mêmes méthodes que BinanceAPI
+
+    Les ordres limites reposent dans un carnet par symbole (tas par prix) et
+    sont exécutés quand le prix rejoué les croise. Latence et taux d'erreur
+    sont injectables pour les tests de charge.
+    """
+
+    def __init__(self, initial_balance=10000.0, quote_asset='USDT', latency_ms=(0, 0), error_rate=0.0,
+                 ticks=None, user_stream=None, seed=None):
+        self.testnet = True
+        self.api_url = 'simulated://local'
+        self.price_feed = None
+        self.quote_asset = quote_asset
+        self.initial_balance = initial_balance
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.user_stream = user_stream
+        self.balances = {quote_asset: {'free': initial_balance, 'locked': 0.0}}
+        self.orders = {}  # orderId: order
+        self.open_orders = {}  # orderId: order (status NEW)
+        self.books = {}  # symbol: {'BUY': heap, 'SELL': heap}
+        self.prices = _MatchingPriceCache(self)
+        self.replay = ReplayPriceFeed(ticks, cache=self.prices) if ticks else None
+        self.calls = 0
+        self.errors = 0
+        self._order_ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f"Simulated exchange initialized (balance={initial_balance} {quote_asset}, "
+                         f"latency={latency_ms} ms, error_rate={error_rate})")
+        if self.replay:
+            self.replay.start()
+
+    @classmethod
+    def from_config(cls, config, user_stream=None):
+        ticks = ReplayPriceFeed.from_csv(config.SIM_PRICE_FILE).ticks if config.SIM_PRICE_FILE else None
+        return cls(
+            initial_balance=config.SIM_INITIAL_BALANCE,
+            latency_ms=(config.SIM_LATENCY_MIN_MS, config.SIM_LATENCY_MAX_MS),
+            error_rate=config.SIM_ERROR_RATE,
+            ticks=ticks,
+            user_stream=user_stream
+        )
+
+    # Contrôle de la simulation
+
+    def set_price(self, symbol, price):
+        """Publie un prix et exécute les ordres qu'il croise"""
+        self.prices.update(symbol, price)
+
+    def _simulate_call(self):
+        self.calls += 1
+        low, high = self.latency_ms
+        if high > 0:
+            time.sleep(self._random.uniform(low, high) / 1000)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise SimulatedError("Injected exchange error")
+
+    def _assets(self, symbol):
+        return symbol[:-len(self.quote_asset)], self.quote_asset
+
+    def _balance(self, asset):
+        return self.balances.setdefault(asset, {'free': 0.0, 'locked': 0.0})
+
+    # Appariement
+
+    def _match(self, symbol, price):
+        with self._lock:
+            book = self.books.get(symbol)
+            if not book:
+                return
+            buys, sells = book['BUY'], book['SELL']
+            while buys and -buys[0][0] >= price:
+                self._fill_resting(heapq.heappop(buys)[2])
+            while sells and sells[0][0] <= price:
+                self._fill_resting(heapq.heappop(sells)[2])
+
+    def _fill_resting(self, order_id):
+        order = self.orders[order_id]
+        if order['status'] != 'NEW':
+            return  # annulé entre-temps (suppression paresseuse)
+        self._settle(order, float(order['price']))
+
+    def _settle(self, order, price):
+        base, quote = self._assets(order['symbol'])
+        quantity = float(order['origQty'])
+        notional = price * quantity
+        if order['side'] == 'BUY':
+            if order['type'] == 'LIMIT':
+                self._balance(quote)['locked'] -= float(order['price']) * quantity
+            else:
+                self._balance(quote)['free'] -= notional
+            self._balance(base)['free'] += quantity
+        else:
+            if order['type'] == 'LIMIT':
+                self._balance(base)['locked'] -= quantity
+            else:
+                self._balance(base)['free'] -= quantity
+            self._balance(quote)['free'] += notional
+        order['status'] = 'FILLED'
+        self.open_orders.pop(order['orderId'], None)
+        order['executedQty'] = order['origQty']
+        order['cummulativeQuoteQty'] = str(notional)
+        order['updateTime'] = int(time.time() * 1000)
+        self._report(order)
+
+    def _report(self, order):
+        if self.user_stream:
+            self.user_stream.execution_report(order['symbol'], order['orderId'], order['status'],
+                                              side=order['side'], price=float(order['price']),
+                                              quantity=float(order['origQty']))
+
+    def _new_order(self, symbol, side, order_type, quantity, price, client_order_id=None):
+        if client_order_id and any(o['clientOrderId'] == client_order_id for o in self.open_orders.values()):
+            raise SimulatedError("Duplicate order sent.")
+        order = {
+            'symbol': symbol,
+            'orderId': next(self._order_ids),
+            'clientOrderId': client_order_id or f'sim{int(time.time() * 1000)}',
+            'price': str(price),
+            'origQty': str(quantity),
+            'executedQty': '0',
+            'cummulativeQuoteQty': '0',
+            'status': 'NEW',
+            'timeInForce': 'GTC',
+            'type': order_type,
+            'side': side,
+            'time': int(time.time() * 1000),
+            'updateTime': int(time.time() * 1000)
+        }
+        self.orders[order['orderId']] = order
+        return order
+
+    # Surface BinanceAPI
+
+    def place_limit_order(self, symbol, side, quantity, price, client_order_id=None):
+        try:
+            self._simulate_call()
+            side = side.upper()
+            quantity, price = float(quantity), float(price)
+            base, quote = self._assets(symbol)
+            with self._lock:
+                if side == 'BUY':
+                    balance, amount = self._balance(quote), price * quantity
+                else:
+                    balance, amount = self._balance(base), quantity
+                if balance['free'] < amount:
+                    raise SimulatedError("Account has insufficient balance for requested action.")
+                order = self._new_order(symbol, side, 'LIMIT', quantity, price, client_order_id)
+                balance['free'] -= amount
+                balance['locked'] += amount
+                self.open_orders[order['orderId']] = order
+                book = self.books.setdefault(symbol, {'BUY': [], 'SELL': []})
+                key = -price if side == 'BUY' else price
+                heapq.heappush(book[side], (key, order['orderId'], order['orderId']))
+                current = self.prices.get(symbol)
+                if current is not None:
+                    self._match(symbol, current)
+            self.logger.info(f"Limit order placed: {symbol} {side} {quantity} @ {price}")
+            return dict(order)
+        except Exception as e:
+            self.logger.error(f"Limit order failed: {e}")
+            return None
+
+    def place_market_order(self, symbol, side, quantity, client_order_id=None):
+        try:
+            self._simulate_call()
+            side = side.upper()
+            quantity = float(quantity)
+            price = self.prices.get(symbol)
+            if price is None:
+                raise SimulatedError(f"No price for {symbol}")
+            base, quote = self._assets(symbol)
+            with self._lock:
+                if side == 'BUY' and self._balance(quote)['free'] < price * quantity:
+                    raise SimulatedError("Account has insufficient balance for requested action.")
+                if side == 'SELL' and self._balance(base)['free'] < quantity:
+                    raise SimulatedError("Account has insufficient balance for requested action.")
+                order = self._new_order(symbol, side, 'MARKET', quantity, price, client_order_id)
+                self._settle(order, price)
+            self.logger.info(f"Market order placed: {symbol} {side} {quantity}")
+            return dict(order)
+        except Exception as e:
+            self.logger.error(f"Market order failed: {e}")
+            return None
+
+    def get_order_status(self, symbol, order_id):
+        try:
+            self._simulate_call()
+            return self.orders[order_id]['status']
+        except Exception as e:
+            self.logger.error(f"Order status check failed: {e}")
+            return 'UNKNOWN'
+
+    def cancel_order(self, symbol, order_id):
+        try:
+            self._simulate_call()
+            with self._lock:
+                order = self.orders[order_id]
+                if order['status'] != 'NEW':
+                    raise SimulatedError("Unknown order sent.")
+                base, quote = self._assets(symbol)
+                if order['side'] == 'BUY':
+                    balance, amount = self._balance(quote), float(order['price']) * float(order['origQty'])
+                else:
+                    balance, amount = self._balance(base), float(order['origQty'])
+                balance['locked'] -= amount
+                balance['free'] += amount
+                order['status'] = 'CANCELED'
+                del self.open_orders[order_id]
+                self._report(order)
+            self.logger.info(f"Order canceled: {order_id}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Order cancel failed: {e}")
+            return False
+
+    def get_current_price(self, symbol):
+        try:
+            self._simulate_call()
+            price = self.prices.get(symbol)
+            if price is None:
+                raise SimulatedError(f"No price for {symbol}")
+            return price
+        except Exception as e:
+            self.logger.error(f"Price check failed: {e}")
+            return 0.0
+
+    def _wallet_value(self):
+        total = 0.0
+        for asset, balance in self.balances.items():
+            amount = balance['free'] + balance['locked']
+            if asset == self.quote_asset:
+                total += amount
+            elif amount:
+                total += amount * (self.prices.get(asset + self.quote_asset) or 0.0)
+        return total
+
+    def get_exchange_info(self):
+        """Aucun filtre simulé : les ordres ne sont pas normalisés"""
+        self._simulate_call()
+        return {'symbols': []}
+
+    def get_equity(self):
+        try:
+            self._simulate_call()
+            with self._lock:
+                return self._wallet_value()
+        except Exception as e:
+            self.logger.error(f"Error getting equity: {e}")
+            return 0.0
+
+    def get_net_profit(self):
+        try:
+            self._simulate_call()
+            with self._lock:
+                return self._wallet_value() - self.initial_balance
+        except Exception as e:
+            self.logger.error(f"Error getting net profit: {e}")
+            return 0.0
+
+    def get_positions(self):
+        try:
+            self._simulate_call()
+            with self._lock:
+                return {asset: dict(balance) for asset, balance in self.balances.items()
+                        if balance['free'] > 0 or balance['locked'] > 0}
+        except Exception as e:
+            self.logger.error(f"Error getting positions: {e}")
+            return {}
+
+    def get_open_orders(self, symbol=None):
+        try:
+            self._simulate_call()
+            with self._lock:
+                return [dict(o) for o in self.open_orders.values()
+                        if symbol is None or o['symbol'] == symbol]
+        except Exception as e:
+            self.logger.error(f"Error getting open orders: {e}")
+            # None et non [] : une liste vide ferait croire que tous les ordres ont quitté le carnet
+            return None
+
+    def invalidate_account(self):
+        pass
@@ -0,0 +1,178 @@
+"""Recherche de paramètres (grille ou aléatoire) sur le backtest DCA/PIR
+
+Les bougies sont écrites une seule fois dans un fichier .npy partagé, ouvert en
+mémoire mappée par chaque worker : rien n'est sérialisé par tâche hormis les
+paramètres. Les combinaisons sont réparties par lots sur un pool de processus.
+
+Usage :
+    python sweep.py candles.csv --param PROFIT_PERCENT=1,1.5,2 --param BELOW_PERCENT=0.5,1
+    python sweep.py candles.csv --random 200 --param PROFIT_PERCENT=0.5:3 --param MAX_ORDERS=2:10
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backtest import BacktestParams, load_candles, load_signals, run_backtest, BUY
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Paramètres de stratégie modifiables et leur type dans Config
+SWEEP_PARAMS = {
+    'PROFIT_PERCENT': float,
+    'BELOW_PERCENT': float,
+    'ORDER_VALUE': float,
+    'MAX_ORDERS': int
+}
+
+_worker_data = None
+
+
+def parse_param(spec):
+    """'NAME=1,2,3' (valeurs) ou 'NAME=lo:hi' (intervalle, recherche aléatoire)"""
+    name, values = spec.split('=', 1)
+    name = name.strip().upper()
+    if name not in SWEEP_PARAMS:
+        raise ValueError(f"Unknown parameter {name} (expected one of {', '.join(SWEEP_PARAMS)})")
+    cast = SWEEP_PARAMS[name]
+    if ':' in values:
+        low, high = values.split(':')
+        return name, (cast(low), cast(high))
+    return name, [cast(v) for v in values.split(',')]
+
+
+def grid_combinations(space):
+    """Produit cartésien des listes de valeurs"""
+    names = list(space)
+    for name in names:
+        if isinstance(space[name], tuple):
+            raise ValueError(f"Range given for {name}: use --random for interval sampling")
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_combinations(space, count, seed=None):
+    """Tirage uniforme : choix dans les listes, valeur dans les intervalles"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        combination = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if SWEEP_PARAMS[name] is int:
+                    combination[name] = rng.randint(low, high)
+                else:
+                    combination[name] = round(rng.uniform(low, high), 4)
+            else:
+                combination[name] = rng.choice(values)
+        yield combination
+
+
+def _init_worker(path):
+    global _worker_data
+    _worker_data = np.load(path, mmap_mode='r')
+
+
+def _run_batch(base, batch):
+    close, signals = _worker_data[0], _worker_data[1]
+    results = []
+    for overrides in batch:
+        params = BacktestParams(**dict(base, **overrides))
+        summary = run_backtest({'close': close}, signals, params).summary()
+        results.append({
+            'params': overrides,
+            'return_percent': summary['return_percent'],
+            'max_drawdown_percent': summary['max_drawdown_percent'],
+            'cycles': summary['cycles'],
+            'buys': summary['buys']
+        })
+    return results
+
+
+def run_sweep(candles, combinations, signals=None, base_params=None, workers=None, batch_size=8):
+    """Exécute les backtests en parallèle ; retourne les résultats classés"""
+    base = (base_params or BacktestParams()).to_dict()
+    close = np.asarray(candles['close'], dtype=np.float64)
+    if signals is None:
+        signals = candles.get('signal', np.full(len(close), BUY))
+    combinations = list(combinations)
+
+    fd, path = tempfile.mkstemp(suffix='.npy')
+    os.close(fd)
+    try:
+        np.save(path, np.vstack([close, np.asarray(signals, dtype=np.float64)]))
+        batches = [combinations[i:i + batch_size] for i in range(0, len(combinations), batch_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+            for batch_results in pool.map(_run_batch, itertools.repeat(base), batches):
+                results.extend(batch_results)
+    finally:
+        os.remove(path)
+    return rank_results(results)
+
+
+def rank_results(results):
+    """Classement : meilleur rendement d'abord, drawdown le plus faible à égalité"""
+    return sorted(results, key=lambda r: (-r['return_percent'], r['max_drawdown_percent']))
+
+
+def write_env_file(path, params):
+    """Écrit les paramètres retenus au format des variables lues par Config"""
+    with open(path, 'w') as f:
+        f.write('# Strategy Parameters (sweep result)\n')
+        for name, value in params.items():
+            f.write(f'{name}={value}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recherche de paramètres pour la stratégie DCA/PIR')
+    parser.add_argument('candles', help='Fichier de bougies (.csv ou .npz)')
+    parser.add_argument('--signals', help='Série de signaux (.csv ou .npz)')
+    parser.add_argument('--param', action='append', default=[], help='NAME=v1,v2,... ou NAME=lo:hi')
+    parser.add_argument('--random', type=int, help='Nombre de tirages aléatoires (grille complète sinon)')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int, help='Nombre de processus (tous les coeurs par défaut)')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', help='Fichier JSON avec tous les résultats classés')
+    parser.add_argument('--env-out', default='sweep.env', help='Fichier env des meilleurs paramètres')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    space = dict(parse_param(spec) for spec in args.param)
+    if not space:
+        parser.error('at least one --param is required')
+    if args.random:
+        combinations = list(random_combinations(space, args.random, args.seed))
+    else:
+        combinations = list(grid_combinations(space))
+
+    candles = load_candles(args.candles)
+    signals = load_signals(args.signals) if args.signals else None
+    base = BacktestParams.from_config(Config())
+
+    start = time.time()
+    results = run_sweep(candles, combinations, signals, base, workers=args.workers)
+    logger.info(f"Sweep of {len(combinations)} combinations done in {time.time() - start:.2f}s")
+
+    for rank, result in enumerate(results[:args.top], 1):
+        logger.info(f"#{rank} return={result['return_percent']:.2f}% "
+                    f"drawdown={result['max_drawdown_percent']:.2f}% {result['params']}")
+
+    if results:
+        write_env_file(args.env_out, results[0]['params'])
+        logger.info(f"Best parameters written to {args.env_out}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from metrics import registry
+
+
+class SymbolLocks:
+    """Un verrou par symbole, partagé entre le webhook et la surveillance
+
+    Un signal et une vérification de sortie sur le même symbole ne s'exécutent
+    jamais en même temps ; des symboles différents restent indépendants.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        lock = self._locks.get(symbol)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(symbol, threading.RLock())
+        return lock
+
+
+class SymbolMonitor:
+    """Vérifications par symbole en parallèle sur un pool de threads
+
+    Chaque symbole est vérifié sous son verrou ; les résultats sont attendus au
+    plus `timeout` secondes. Un symbole lent est signalé sans retarder les
+    autres, et n'est pas relancé tant que sa vérification précédente tourne.
+    """
+
+    def __init__(self, check, locks, workers=100, timeout=10.0):
+        self.check = check
+        self.locks = locks
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='symbol-monitor')
+        self.running = set()  # symboles dont la vérification n'est pas terminée
+        self.cycles = 0
+        self.checked = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._timeouts = registry.counter('bot_symbol_check_timeouts_total',
+                                          'Vérifications de symbole non terminées dans le délai')
+        self.logger = logging.getLogger(__name__)
+
+    def _run_check(self, symbol):
+        try:
+            lock = self.locks.get(symbol)
+            if not lock.acquire(timeout=self.timeout):
+                raise TimeoutError(f"{symbol} is locked by another operation")
+            try:
+                self.check(symbol)
+            finally:
+                lock.release()
+        finally:
+            with self._lock:
+                self.running.discard(symbol)
+
+    def run(self, symbols):
+        """Vérifie tous les symboles ; retourne ceux qui ont échoué ou dépassé le délai"""
+        futures = {}
+        with self._lock:
+            self.cycles += 1
+            for symbol in symbols:
+                if symbol in self.running:
+                    self.skipped += 1
+                    continue
+                self.running.add(symbol)
+                futures[self.executor.submit(self._run_check, symbol)] = symbol
+        done, not_done = wait(futures, timeout=self.timeout)
+
+        failed = []
+        for future in done:
+            error = future.exception()
+            if error is not None:
+                failed.append(futures[future])
+                self.logger.error(f"Exit check failed for {futures[future]}: {error}")
+        late = [futures[future] for future in not_done]
+        if late:
+            self._timeouts.inc(len(late))
+            self.logger.warning(f"Exit checks still running after {self.timeout}s: {', '.join(late)}")
+        with self._lock:
+            self.checked += len(done) - len(failed)
+            self.failed += len(failed)
+            self.timed_out += len(late)
+        return {'checked': len(done) - len(failed), 'failed': failed, 'timed_out': late}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'timeout': self.timeout,
+                'cycles': self.cycles,
+                'running': sorted(self.running),
+                'checked': self.checked,
+                'failed': self.failed,
+                'timed_out': self.timed_out,
+                'skipped': self.skipped
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+# Écart (en pas) en deçà duquel une valeur est considérée comme un multiple exact du pas
+ALIGN_TOLERANCE = Decimal('1e-6')
+
+
+class SymbolRules:
+    """Filtres d'un symbole (LOT_SIZE, MARKET_LOT_SIZE, PRICE_FILTER, MIN_NOTIONAL / NOTIONAL)"""
+
+    __slots__ = ('symbol', 'step_size', 'min_qty', 'max_qty', 'market_step_size', 'market_min_qty',
+                 'market_max_qty', 'tick_size', 'min_price', 'max_price', 'min_notional', 'notional_on_market')
+
+    def __init__(self, symbol, step_size=None, min_qty=None, max_qty=None, market_step_size=None,
+                 market_min_qty=None, market_max_qty=None, tick_size=None, min_price=None, max_price=None,
+                 min_notional=None, notional_on_market=True):
+        self.symbol = symbol
+        self.step_size = step_size
+        self.min_qty = min_qty
+        self.max_qty = max_qty
+        self.market_step_size = market_step_size
+        self.market_min_qty = market_min_qty
+        self.market_max_qty = market_max_qty
+        self.tick_size = tick_size
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_notional = min_notional
+        self.notional_on_market = notional_on_market
+
+    @classmethod
+    def from_exchange_info(cls, info):
+        """Règles d'une entrée `symbols` de /api/v3/exchangeInfo"""
+        def value(f, key):
+            number = Decimal(f.get(key, '0'))
+            return number if number > 0 else None
+
+        rules = cls(info['symbol'])
+        for f in info.get('filters', []):
+            kind = f.get('filterType')
+            if kind == 'LOT_SIZE':
+                rules.step_size, rules.min_qty, rules.max_qty = (value(f, 'stepSize'), value(f, 'minQty'),
+                                                                 value(f, 'maxQty'))
+            elif kind == 'MARKET_LOT_SIZE':
+                rules.market_step_size, rules.market_min_qty, rules.market_max_qty = (
+                    value(f, 'stepSize'), value(f, 'minQty'), value(f, 'maxQty'))
+            elif kind == 'PRICE_FILTER':
+                rules.tick_size, rules.min_price, rules.max_price = (value(f, 'tickSize'), value(f, 'minPrice'),
+                                                                     value(f, 'maxPrice'))
+            elif kind == 'MIN_NOTIONAL':
+                rules.min_notional = value(f, 'minNotional')
+                rules.notional_on_market = f.get('applyToMarket', True)
+            elif kind == 'NOTIONAL':
+                rules.min_notional = value(f, 'minNotional')
+                rules.notional_on_market = f.get('applyMinToMarket', True)
+        return rules
+
+    def to_dict(self):
+        return {name: str(getattr(self, name)) if isinstance(getattr(self, name), Decimal) else getattr(self, name)
+                for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: Decimal(v) if isinstance(v, str) and name != 'symbol' else v for name, v in data.items()})
+
+    @staticmethod
+    def _align(value, step, rounding):
+        steps = value / step
+        nearest = steps.to_integral_value()
+        # Somme de flottants (0.7 + 0.1 = 0.7999999999999999) : un multiple du pas à l'erreur d'arrondi près
+        if abs(steps - nearest) < ALIGN_TOLERANCE:
+            steps = nearest
+        return steps.to_integral_value(rounding=rounding) * step
+
+    def normalize(self, side, quantity, price=None, order_type='LIMIT'):
+        """Quantité arrondie au pas inférieur ; prix au tick (inférieur à l'achat, supérieur à la vente)"""
+        market = order_type == 'MARKET'
+        step = (self.market_step_size or self.step_size) if market else self.step_size
+        quantity = Decimal(str(quantity))
+        if step:
+            quantity = self._align(quantity, step, ROUND_FLOOR)
+        if price is not None and self.tick_size:
+            rounding = ROUND_FLOOR if side.upper() == 'BUY' else ROUND_CEILING
+            price = float(self._align(Decimal(str(price)), self.tick_size, rounding))
+        return float(quantity), price
+
+    def check(self, quantity, price, order_type='LIMIT'):
+        """Motif de rejet de l'ordre par l'échange, ou None s'il respecte les filtres"""
+        market = order_type == 'MARKET'
+        quantity = Decimal(str(quantity))
+        min_qty = (self.market_min_qty or self.min_qty) if market else self.min_qty
+        max_qty = (self.market_max_qty or self.max_qty) if market else self.max_qty
+        if quantity <= 0 or (min_qty and quantity < min_qty):
+            return 'LOT_SIZE'
+        if max_qty and quantity > max_qty:
+            return 'LOT_SIZE'
+        if price:
+            price = Decimal(str(price))
+            if not market and ((self.min_price and price < self.min_price) or
+                               (self.max_price and price > self.max_price)):
+                return 'PRICE_FILTER'
+            if self.min_notional and (not market or self.notional_on_market) and quantity * price < self.min_notional:
+                return 'MIN_NOTIONAL'
+        return None
+
+
+class SymbolRulesCache:
+    """Règles de tous les symboles, chargées une fois et rafraîchies en arrière-plan
+
+    La source est `loader()` (exchangeInfo) ; chaque chargement réussi est
+    écrit dans `path`, relu au démarrage tant qu'il a moins de
+    `refresh_interval` secondes, et en repli si l'échange est injoignable.
+    Le premier accès déclenche le chargement : l'import reste sans réseau.
+    """
+
+    def __init__(self, loader=None, path=None, refresh_interval=3600.0, miss_reload_interval=60.0):
+        self.loader = loader
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.miss_reload_interval = miss_reload_interval
+        self.rules = {}  # symbole: SymbolRules
+        self.loaded_at = 0
+        self.source = None
+        self.loads = 0
+        self.failures = 0
+        self._attempted = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, symbol):
+        """Règles du symbole ; un symbole inconnu provoque un rechargement (au plus une fois par minute)"""
+        if not self.loaded_at and not self._attempted:
+            self.load()
+        rules = self.rules.get(symbol)
+        if rules is None and time.time() - self._attempted > self.miss_reload_interval:
+            self.refresh()
+            rules = self.rules.get(symbol)
+        return rules
+
+    def load(self):
+        """Snapshot récent si disponible, sinon échange, sinon snapshot périmé"""
+        with self._lock:
+            if self.loaded_at and time.time() - self.loaded_at < self.refresh_interval:
+                return
+            snapshot = self._read_snapshot()
+            if snapshot and time.time() - snapshot[0] < self.refresh_interval:
+                self._install(snapshot[1], snapshot[0], 'snapshot')
+                return
+            if not self._fetch() and snapshot:
+                self._install(snapshot[1], snapshot[0], 'snapshot')
+
+    def refresh(self):
+        """Recharge depuis l'échange (tâche périodique) ; garde les règles actuelles en cas d'échec"""
+        with self._lock:
+            self._fetch()
+
+    def _fetch(self):
+        self._attempted = time.time()
+        if self.loader is None:
+            return False
+        try:
+            info = self.loader()
+            rules = {s['symbol']: SymbolRules.from_exchange_info(s) for s in info.get('symbols', [])}
+        except Exception as e:
+            self.failures += 1
+            self.logger.error(f"Failed to load symbol rules: {e}")
+            return False
+        self._install(rules, time.time(), 'exchange')
+        self._write_snapshot()
+        return True
+
+    def _install(self, rules, loaded_at, source):
+        self.rules = rules
+        self.loaded_at = loaded_at
+        self.source = source
+        self.loads += 1
+        self.logger.info(f"Loaded rules for {len(rules)} symbols from {source}")
+
+    def _read_snapshot(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data['loaded_at'], {s['symbol']: SymbolRules.from_dict(s) for s in data['symbols']}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable symbol rules snapshot {self.path}: {e}")
+            return None
+
+    def _write_snapshot(self):
+        if not self.path:
+            return
+        try:
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'loaded_at': self.loaded_at,
+                           'symbols': [rules.to_dict() for rules in self.rules.values()]}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.error(f"Failed to write symbol rules snapshot: {e}")
+
+    def stats(self):
+        return {
+            'symbols': len(self.rules),
+            'source': self.source,
+            'age': round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            'loads': self.loads,
+            'failures': self.failures
+        }
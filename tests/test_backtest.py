@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from backtest import BUY, SELL, BacktestParams, run_backtest, run_reference_backtest
+
+
+def random_market(seed, n=3000):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    signals = rng.choice([BUY, 0, SELL], size=n, p=[0.3, 0.6, 0.1])
+    return {'timestamp': np.arange(n) * 60000.0, 'close': close}, signals
+
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('window', [16, 4096])
+def test_vectorized_backtest_matches_reference_loop(seed, window):
+    candles, signals = random_market(seed)
+    params = BacktestParams(PROFIT_PERCENT=1.0, BELOW_PERCENT=0.4, MAX_ORDERS=4)
+    fast = run_backtest(candles, signals, params, window=window)
+    slow = run_reference_backtest(candles, signals, params)
+
+    assert len(fast.trades) == len(slow.trades) >= 4
+    for a, b in zip(fast.trades, slow.trades):
+        assert (a['timestamp'], a['side']) == (b['timestamp'], b['side'])
+        assert a['price'] == pytest.approx(b['price'])
+        assert a['quantity'] == pytest.approx(b['quantity'])
+    np.testing.assert_allclose(fast.equity, slow.equity)
+    np.testing.assert_array_equal(fast.open_positions, slow.open_positions)
+
+
+def test_capital_exhaustion_stops_both_engines():
+    candles, signals = random_market(1, n=500)
+    candles['close'] = np.linspace(100, 50, 500)  # baisse continue : aucune sortie
+    params = BacktestParams(INITIAL_CAPITAL=250, ORDER_VALUE=100, MAX_ORDERS=5)
+    fast = run_backtest(candles, signals, params)
+    slow = run_reference_backtest(candles, signals, params)
+    assert [t['timestamp'] for t in fast.trades] == [t['timestamp'] for t in slow.trades]
+    assert all(t['side'] == 'BUY' for t in fast.trades)
+
+
+def webhook_buys(close, signals, params):
+    """Achats selon la condition de /webhook : signal_price <= dernier prix d'entrée * (1 - BELOW_PERCENT/100)"""
+    buys, last_entry = [], None
+    for t, (price, signal) in enumerate(zip(close, signals)):
+        if signal != BUY or len(buys) >= params.MAX_ORDERS:
+            continue
+        next_price = last_entry * (1 - params.BELOW_PERCENT / 100) if last_entry else price
+        if price <= next_price:
+            buys.append((t, next_price))
+            last_entry = next_price
+    return buys
+
+
+def test_ladder_fills_only_on_signals_at_or_below_the_level():
+    close = np.array([100, 98, 99.9, 99.9, 99.9, 97.9, 99.9, 97.0])
+    candles = {'timestamp': np.arange(len(close), dtype=float), 'close': close}
+    signals = np.full(len(close), BUY)
+    params = BacktestParams(PROFIT_PERCENT=50, BELOW_PERCENT=0.5, MAX_ORDERS=5, INITIAL_CAPITAL=10000)
+
+    expected = webhook_buys(close, signals, params)
+    assert [t for t, _ in expected] == [0, 1, 5, 7]
+    for result in (run_backtest(candles, signals, params), run_reference_backtest(candles, signals, params)):
+        buys = [(int(t['timestamp']), t['price']) for t in result.trades if t['side'] == 'BUY']
+        assert [t for t, _ in buys] == [t for t, _ in expected]
+        assert [price for _, price in buys] == pytest.approx([price for _, price in expected])
@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+
+import pytest
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+from binance_api import BinanceAPI, RequestScheduler
+
+
+class FakeAdapter(BaseAdapter):
+    """Transport local : chaque appel répond avec son propre poids utilisé, après `delays[path]` s"""
+
+    def __init__(self, delays=None, errors=None):
+        super().__init__()
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        path = request.path_url.split('?')[0]
+        with self._lock:
+            self.calls.append(path)
+            weight = len(self.calls) * 10
+        time.sleep(self.delays.get(path, 0))
+        response = Response()
+        response.request = request
+        response.url = request.url
+        error = self.errors.get(path)
+        response.status_code = 400 if error else 200
+        response.headers['x-mbx-used-weight-1m'] = str(weight)
+        response.headers['Content-Type'] = 'application/json'
+        body = error or ({'symbol': 'BTCUSDT', 'price': '100.0'} if 'ticker' in path else {'orderId': 1})
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def make_api(adapter, hedge_delay=0):
+    api = BinanceAPI('key', 'secret', scheduler=RequestScheduler(), hedge_delay=hedge_delay)
+    client = Client('key', 'secret', testnet=True, ping=False)
+    client.session.mount('https://', adapter)
+    api._client = client
+    return api
+
+
+def test_used_weight_comes_from_the_calls_own_response():
+    adapter = FakeAdapter()
+    api = make_api(adapter)
+    handle_response = api.client._handle_response
+
+    def slow_handle_response(response):
+        # Un autre appel se termine pendant le décodage de la réponse du ticker
+        if 'ticker' in response.url:
+            time.sleep(0.2)
+        return handle_response(response)
+
+    api.client._handle_response = slow_handle_response
+    slow = threading.Thread(target=api._request, args=('get_symbol_ticker', 1), kwargs={'symbol': 'BTCUSDT'})
+    slow.start()
+    time.sleep(0.05)
+    api._request('get_order', 1, symbol='BTCUSDT', orderId=1)
+    assert api.scheduler.server_used == 20
+    slow.join()
+    # La réponse lente porte le poids de sa propre requête, pas celui de la dernière réponse du client
+    assert api.scheduler.server_used == 10
+
+
+def test_timestamp_rejection_is_not_waited_on_or_retried_hedged():
+    error = {'code': -1021, 'msg': 'Timestamp for this request is outside of the recvWindow.'}
+    adapter = FakeAdapter(delays={'/api/v3/order': 0.1}, errors={'/api/v3/order': error})
+    api = make_api(adapter, hedge_delay=0.05)
+    with pytest.raises(BinanceAPIException):
+        api._request('get_order', 1, symbol='BTCUSDT', orderId=1)
+    orders = [path for path in adapter.calls if path == '/api/v3/order']
+    # Première requête + doublon, puis une seule reprise après resynchronisation
+    assert len(orders) == 3
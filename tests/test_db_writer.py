@@ -0,0 +1,14 @@
+from sqlalchemy import create_engine
+
+from db_writer import enable_sqlite_wal
+
+
+def test_wal_listener_is_registered_once(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "bot.db"}')
+    listeners = len(engine.pool.dispatch.connect)
+    for _ in range(5):
+        enable_sqlite_wal(engine)
+    assert len(engine.pool.dispatch.connect) == listeners + 1
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+    engine.dispose()
@@ -0,0 +1,40 @@
+from order_reconciler import OrderReconciler
+from position_manager import PositionManager
+
+
+class FakeExchange:
+    def __init__(self, open_orders, statuses=None):
+        self.open_orders = open_orders
+        self.statuses = statuses or {}
+        self.status_calls = 0
+
+    def get_open_orders(self, symbol=None):
+        return self.open_orders
+
+    def get_order_status(self, symbol, order_id):
+        self.status_calls += 1
+        return self.statuses.get(order_id)
+
+
+def manager_with_orders(*order_ids):
+    manager = PositionManager()
+    for order_id in order_ids:
+        manager.add_pending_order('BTCUSDT', order_id, 'BUY', 100.0, 1.0)
+    return manager
+
+
+def test_only_orders_missing_from_the_open_set_are_queried():
+    exchange = FakeExchange([{'orderId': 1, 'status': 'NEW'}], {2: 'FILLED', 3: 'CANCELED'})
+    result = OrderReconciler(exchange, manager_with_orders(1, 2, 3)).reconcile()
+    assert [order['order_id'] for order, _ in result.open] == [1]
+    assert [order['order_id'] for order in result.filled] == [2]
+    assert [order['order_id'] for order in result.canceled] == [3]
+    assert exchange.status_calls == 2
+
+
+def test_open_orders_failure_skips_the_cycle():
+    exchange = FakeExchange(None)
+    result = OrderReconciler(exchange, manager_with_orders(1, 2, 3)).reconcile()
+    assert exchange.status_calls == 0
+    assert not result.open and not result.filled and not result.canceled
+    assert len(result.unknown) == 3
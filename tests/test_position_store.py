@@ -0,0 +1,90 @@
+import random
+import threading
+
+from position_manager import PositionManager
+from position_store import PositionStore
+
+
+def snapshot(manager):
+    return (
+        {symbol: sorted((p.id, p.entry_price, p.quantity) for p in positions)
+         for symbol, positions in manager.positions.items() if positions},
+        sorted(manager.pending_orders)
+    )
+
+
+def test_concurrent_mutations_and_checkpoints_survive_replay(tmp_path):
+    path = str(tmp_path / 'position.db')
+    manager = PositionManager(store=PositionStore(path, checkpoint_every=7, commit_interval=0.001))
+    stop = threading.Event()
+
+    def mutate(worker):
+        rng = random.Random(worker)
+        symbol = f'SYM{worker}USDT'
+        for i in range(150):
+            position = manager.add_position(symbol, rng.uniform(90, 110), 1.0, None)
+            order_id = worker * 10000 + i
+            manager.add_pending_order(symbol, order_id, 'BUY', 100.0, 1.0)
+            if rng.random() < 0.3:
+                manager.remove_position(symbol, position.id)
+            if rng.random() < 0.5:
+                manager.pop_pending_order(order_id)
+
+    def checkpoints():
+        while not stop.is_set():
+            manager.checkpoint()
+
+    checkpointer = threading.Thread(target=checkpoints)
+    checkpointer.start()
+    workers = [threading.Thread(target=mutate, args=(w,)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop.set()
+    checkpointer.join()
+    expected = snapshot(manager)
+    manager.close()
+
+    restored = PositionManager(store=PositionStore(path))
+    assert snapshot(restored) == expected
+    restored.close()
+
+
+def test_torn_journal_tail_is_dropped_and_later_records_survive(tmp_path):
+    path = str(tmp_path / 'position.db')
+    manager = PositionManager(store=PositionStore(path))
+    manager.add_position('BTCUSDT', 100.0, 1.0, None)
+    manager.close()
+    # Arrêt brutal au milieu de l'écriture d'un enregistrement
+    with open(f'{path}.journal', 'a') as f:
+        f.write('{"op": "add_position", "sym')
+
+    manager = PositionManager(store=PositionStore(path))
+    manager.add_position('BTCUSDT', 90.0, 1.0, None)
+    manager.add_position('BTCUSDT', 80.0, 1.0, None)
+    manager.close()
+
+    manager = PositionManager(store=PositionStore(path))
+    assert [p.entry_price for p in manager.get_positions('BTCUSDT')] == [100.0, 90.0, 80.0]
+    manager.close()
+
+
+def test_last_record_without_newline_is_kept(tmp_path):
+    path = str(tmp_path / 'position.db')
+    manager = PositionManager(store=PositionStore(path))
+    manager.add_position('BTCUSDT', 100.0, 1.0, None)
+    manager.close()
+    journal = f'{path}.journal'
+    with open(journal, 'rb') as f:
+        content = f.read()
+    with open(journal, 'wb') as f:
+        f.write(content.rstrip(b'\n'))
+
+    manager = PositionManager(store=PositionStore(path))
+    manager.add_position('BTCUSDT', 90.0, 1.0, None)
+    manager.close()
+
+    manager = PositionManager(store=PositionStore(path))
+    assert [p.entry_price for p in manager.get_positions('BTCUSDT')] == [100.0, 90.0]
+    manager.close()
@@ -0,0 +1,22 @@
+import time
+
+from price_feed import ReplayPriceFeed
+
+
+def test_looping_replay_without_delays_waits_between_cycles():
+    feed = ReplayPriceFeed([('BTCUSDT', 100.0), ('ETHUSDT', 10.0)], loop=True, min_interval=0.1)
+    updates = []
+    feed.cache.update = lambda symbol, price, *args: updates.append(symbol)
+    feed.start()
+    time.sleep(0.35)
+    feed.stop()
+    # 4 cycles au plus en 0,35 s, et non des milliers
+    assert 2 <= len(updates) <= 8
+
+
+def test_looping_replay_without_ticks_stops():
+    feed = ReplayPriceFeed([], loop=True)
+    feed.start()
+    feed._thread.join(timeout=1)
+    assert not feed._thread.is_alive()
+    feed.stop()
@@ -0,0 +1,95 @@
+import json
+
+from signal_dedup import SignalDeduplicator
+
+
+def test_duplicate_returns_the_first_result():
+    dedup = SignalDeduplicator()
+    key = dedup.fingerprint({'action': 'buy', 'symbol': 'BTCUSDT', 'price': '100'})
+    assert dedup.claim(key) is None
+    assert dedup.claim(key) == {'status': 'processing'}
+    dedup.complete(key, {'status': 'success', 'order_id': 1})
+    assert dedup.claim(key) == {'status': 'success', 'order_id': 1}
+    assert dedup.stats()['duplicates'] == 2
+
+
+def test_fingerprint_prefers_client_id_and_ignores_token():
+    fingerprint = SignalDeduplicator.fingerprint
+    assert fingerprint({'signal_id': 'a', 'price': 1}) == fingerprint({'signal_id': 'a', 'price': 2})
+    assert fingerprint({'action': 'buy', 'token': 'x'}) == fingerprint({'action': 'buy', 'token': 'y'})
+    # Une alerte horodatée n'est pas un doublon de la précédente
+    assert fingerprint({'action': 'buy', 'time': '1'}) != fingerprint({'action': 'buy', 'time': '2'})
+
+
+def test_released_signal_can_be_retried():
+    dedup = SignalDeduplicator()
+    assert dedup.claim('k') is None
+    dedup.release('k')
+    assert dedup.claim('k') is None
+
+
+def test_entries_expire_after_the_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('signal_dedup.time.time', lambda: now[0])
+    dedup = SignalDeduplicator(window=10)
+    assert dedup.claim('k') is None
+    now[0] += 9
+    assert dedup.claim('k') is not None
+    now[0] += 2
+    assert dedup.claim('k') is None
+
+
+def test_capacity_evicts_the_oldest_entries():
+    dedup = SignalDeduplicator(capacity=3)
+    for key in 'abcd':
+        assert dedup.claim(key) is None
+    assert dedup.claim('e') is None  # l'expiration de claim() borne la table
+    assert dedup.claim('a') is None
+    assert dedup.claim('e') is not None
+    assert len(dedup.entries) <= 4
+
+
+def test_persisted_results_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'signals.jsonl')
+    dedup = SignalDeduplicator(path=path)
+    dedup.claim('done')
+    dedup.complete('done', {'status': 'success'})
+    dedup.claim('pending')
+    dedup.close()
+
+    reloaded = SignalDeduplicator(path=path)
+    assert reloaded.claim('done') == {'status': 'success'}
+    # Un signal interrompu en cours de traitement n'est pas persisté : il sera traité à nouveau
+    assert reloaded.claim('pending') is None
+    reloaded.close()
+
+
+def test_reload_drops_expired_and_truncated_records_and_compacts(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('signal_dedup.time.time', lambda: now[0])
+    path = tmp_path / 'signals.jsonl'
+    path.write_text(
+        json.dumps({'key': 'old', 'expires': 900.0, 'result': {'status': 'success'}}) + '\n' +
+        json.dumps({'key': 'live', 'expires': 1100.0, 'result': {'status': 'success'}}) + '\n' +
+        '{"key": "cut'
+    )
+    dedup = SignalDeduplicator(path=str(path))
+    assert set(dedup.entries) == {'live'}
+    dedup.close()
+    assert [json.loads(line)['key'] for line in path.read_text().splitlines()] == ['live']
+
+
+def test_append_log_is_compacted_when_it_grows(tmp_path):
+    path = tmp_path / 'signals.jsonl'
+    dedup = SignalDeduplicator(capacity=10, path=str(path))
+    for i in range(50):
+        key = f'k{i % 3}'
+        dedup.release(key)
+        dedup.claim(key)
+        dedup.complete(key, {'status': 'success', 'n': i})
+    dedup.close()
+    lines = path.read_text().splitlines()
+    assert len(lines) <= 2 * 3 + 1
+    reloaded = SignalDeduplicator(path=str(path))
+    assert reloaded.claim('k2')['n'] == 47
+    reloaded.close()
@@ -0,0 +1,26 @@
+from decimal import Decimal
+
+from symbol_rules import SymbolRules
+
+
+def rules():
+    return SymbolRules('BTCUSDT', step_size=Decimal('0.001'), min_qty=Decimal('0.001'),
+                       tick_size=Decimal('0.01'), min_notional=Decimal('5'))
+
+
+def test_float_sum_of_holdings_is_not_floored_a_step_below():
+    total = 0.7 + 0.1
+    assert total == 0.7999999999999999
+    quantity, _ = rules().normalize('SELL', total, order_type='MARKET')
+    assert quantity == 0.8
+
+
+def test_quantities_between_steps_are_still_floored():
+    assert rules().normalize('SELL', 0.7996, order_type='MARKET')[0] == 0.799
+    assert rules().normalize('BUY', 0.0019, 100.004)[0] == 0.001
+
+
+def test_prices_round_down_for_buys_and_up_for_sells():
+    assert rules().normalize('BUY', 1, 100.019)[1] == 100.01
+    assert rules().normalize('SELL', 1, 100.011)[1] == 100.02
+    assert rules().normalize('SELL', 1, 0.1 + 0.2)[1] == 0.3
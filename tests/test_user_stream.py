@@ -0,0 +1,40 @@
+import time
+
+from user_stream import ExecutionReportPipeline, SimulatedUserDataSource
+
+
+def make_pipeline(**kwargs):
+    source = SimulatedUserDataSource()
+    reports = []
+    pipeline = ExecutionReportPipeline(source, lambda order_id, status, event: reports.append((order_id, status)),
+                                       **kwargs)
+    pipeline.start()
+    return source, pipeline, reports
+
+
+def test_pipeline_delivers_reports_and_stays_alive():
+    source, pipeline, reports = make_pipeline()
+    source.execution_report('BTCUSDT', 1, 'FILLED')
+    deadline = time.time() + 1
+    while not reports and time.time() < deadline:
+        time.sleep(0.01)
+    assert reports == [(1, 'FILLED')]
+    assert pipeline.is_alive()
+    pipeline.stop()
+
+
+def test_stream_error_marks_pipeline_down_until_next_message():
+    source, pipeline, _ = make_pipeline()
+    source.emit({'e': 'error', 'm': 'connection closed'})
+    assert not pipeline.is_alive()
+    source.emit({'e': 'outboundAccountPosition', 'E': int(time.time() * 1000)})
+    assert pipeline.is_alive()
+    pipeline.stop()
+
+
+def test_silent_stream_falls_back_to_polling():
+    source, pipeline, _ = make_pipeline(max_silence=0.05)
+    assert pipeline.is_alive()
+    time.sleep(0.1)
+    assert not pipeline.is_alive()
+    pipeline.stop()
@@ -0,0 +1,153 @@
+import logging
+import queue
+import threading
+import time
+
+
+class UserDataSource:
+    """Source d'événements du compte (executionReport) ; appelle `callback(event)`"""
+
+    def __init__(self):
+        self.callback = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        pass
+
+    def is_connected(self):
+        return self.callback is not None
+
+
+class BinanceUserDataSource(UserDataSource):
+    """Flux utilisateur Binance (listenKey géré par python-binance)"""
+
+    def __init__(self, api_key, api_secret, testnet=True):
+        super().__init__()
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.manager = None
+
+    def start(self, callback):
+        from binance import ThreadedWebsocketManager
+
+        super().start(callback)
+        self.manager = ThreadedWebsocketManager(
+            api_key=self.api_key,
+            api_secret=self.api_secret,
+            testnet=self.testnet
+        )
+        self.manager.start()
+        self.manager.start_user_socket(callback=callback)
+        self.logger.info("User data stream started")
+
+    def stop(self):
+        if self.manager:
+            self.manager.stop()
+            self.manager = None
+            self.logger.info("User data stream stopped")
+
+    def is_connected(self):
+        return self.manager is not None and self.manager.is_alive()
+
+
+class SimulatedUserDataSource(UserDataSource):
+    """Source locale pour les tests : les événements sont injectés à la main"""
+
+    def emit(self, event):
+        if self.callback:
+            self.callback(event)
+
+    def execution_report(self, symbol, order_id, status, side='BUY', price=0.0, quantity=0.0):
+        """Émet un executionReport au format Binance"""
+        self.emit({
+            'e': 'executionReport',
+            'E': int(time.time() * 1000),
+            's': symbol,
+            'i': order_id,
+            'S': side,
+            'X': status,
+            'p': str(price),
+            'q': str(quantity),
+            'L': str(price),
+            'z': str(quantity if status == 'FILLED' else 0)
+        })
+
+
+class ExecutionReportPipeline:
+    """Transmet les executionReport à un gestionnaire, hors du thread websocket
+
+    `handler(order_id, status, event)` est appelé dans l'ordre d'arrivée par un
+    thread consommateur unique, pour que le flux ne soit jamais bloqué par un
+    accès base de données ou un appel à l'échange.
+
+    Le flux est considéré vivant tant que la connexion est ouverte, qu'aucune
+    erreur n'a suivi le dernier message et que le compte a émis un message
+    (exécution, solde) depuis moins de `max_silence` secondes.
+    """
+
+    def __init__(self, source, handler, maxsize=10000, max_silence=900.0):
+        self.source = source
+        self.handler = handler
+        self.events = queue.Queue(maxsize=maxsize)
+        self.max_silence = max_silence
+        self.last_event_time = 0
+        self.last_message_time = 0
+        self.last_error_time = 0
+        self.logger = logging.getLogger(__name__)
+        self._thread = None
+
+    def start(self):
+        self.last_message_time = time.time()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.source.start(self._on_message)
+        self.logger.info("Execution report pipeline started")
+
+    def stop(self):
+        self.source.stop()
+        self.events.put(None)
+
+    def is_alive(self):
+        if self._thread is None or not self._thread.is_alive() or not self.source.is_connected():
+            return False
+        if self.last_error_time >= self.last_message_time:
+            return False
+        return time.time() - max(self.last_message_time, self.last_event_time) < self.max_silence
+
+    def _on_message(self, message):
+        if message.get('e') == 'error':
+            self.last_error_time = time.time()
+            self.logger.error(f"User data stream error: {message.get('m')}")
+            return
+        self.last_message_time = time.time()
+        if message.get('e') != 'executionReport':
+            return
+        try:
+            self.events.put_nowait(message)
+        except queue.Full:
+            # La réconciliation périodique rattrapera l'événement perdu
+            self.logger.error(f"Execution report queue full, dropping order {message.get('i')}")
+
+    def _run(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            self.last_event_time = time.time()
+            try:
+                self.handler(event['i'], event['X'], event)
+            except Exception as e:
+                self.logger.error(f"Execution report handling error: {e}")
+
+
+def create_user_data_source(config):
+    """Construit la source choisie par `config.ORDER_EVENTS` (None = polling seul)"""
+    if config.ORDER_EVENTS == 'stream':
+        return BinanceUserDataSource(config.API_KEY, config.SECRET_KEY, testnet=config.TESTNET)
+    if config.ORDER_EVENTS == 'simulated':
+        return SimulatedUserDataSource()
+    return None
@@ -1,4 +1,11 @@
-from main import app
+import os
+
+# Sous gunicorn, plusieurs workers : l'état de trading appartient au moteur (ROLE=engine)
+os.environ.setdefault('ROLE', 'web')
+
+from main import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run()